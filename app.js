@@ -234,9 +234,11 @@ const COMMODITY_SYMBOLS = {
 
 let liveRefreshInterval = null;
 let lastLiveUpdate = null;
+let liveStream = null;         // SSE connection (see connectLiveStream)
+let streamConnected = false;
 
 async function fetchBatchQuotes(symbols) {
-  // Try Python backend FIRST (port 5000) — has saved_closes.json for accurate gain/loss
+  // Try Python backend FIRST (port 5000) — has the close ledger for accurate gain/loss
   try {
     const r = await fetch('http://localhost:5000/api/quote?symbols=' + encodeURIComponent(symbols.join(',')));
     if (r.ok) {
@@ -273,6 +275,9 @@ function isMarketOpen() {
 async function fetchLiveData() {
   const badge = document.getElementById('data-source-badge');
 
+  // Push stream is delivering deltas — no need to poll
+  if (streamConnected && liveDataEnabled) return;
+
   // Skip fetching when market is closed — use cached data
   if (!isMarketOpen()) {
     if (!liveDataEnabled) {
@@ -441,6 +446,7 @@ startSmartRefresh();
 
 /* ── LIVE NEWS FETCHER ── */
 async function fetchLiveNews() {
+  if (streamConnected) return;  // news arrives over the push stream
   // Try primary (same origin), then Python backend
   const urls = ['/api/news', 'http://localhost:5000/api/news'];
   for (const url of urls) {
@@ -468,40 +474,134 @@ async function fetchLiveNews() {
 fetchLiveNews();
 setInterval(fetchLiveNews, 3 * 60 * 1000);
 
+/* ── LIVE PUSH STREAM (SSE) — replaces polling while connected ── */
+function applyStreamQuotes(quotes) {
+  const idxBySym = {};
+  Object.entries(YF_INDEX_SYMBOLS).forEach(([id, sym]) => { idxBySym[sym] = id; });
+
+  quotes.forEach(q => {
+    const idxId = idxBySym[q.symbol];
+    if (idxId) {
+      const idx = indexData.find(i => i.id === idxId);
+      if (idx) {
+        idx.val = q.regularMarketPrice || idx.val;
+        idx.base = q.regularMarketPreviousClose || idx.base;
+      }
+      return;
+    }
+    const s = marketStocks.find(m => m.yfSym === q.symbol);
+    if (!s) return;
+    s.ltp = q.regularMarketPrice || s.ltp;
+    s.chg = q.regularMarketChange ?? s.chg;
+    s.chgP = q.regularMarketChangePercent ?? s.chgP;
+    const h = holdings.find(x => x.symbol === s.sym);
+    if (h) { h.ltp = s.ltp; h.daychg = s.chgP; }
+  });
+
+  liveDataEnabled = true;
+  lastLiveUpdate = new Date();
+  const badge = document.getElementById('data-source-badge');
+  badge.textContent = 'LIVE';
+  badge.className = 'data-source-badge dsb-live';
+  badge.title = `Live push · Updated ${lastLiveUpdate.toLocaleTimeString('en-IN')}`;
+}
+
+function connectLiveStream() {
+  if (!window.EventSource || liveStream) return;
+  const syms = [...Object.values(YF_INDEX_SYMBOLS), ...marketStocks.map(s => s.yfSym).filter(Boolean)];
+  liveStream = new EventSource('http://localhost:5000/api/stream?topics=quotes,news&symbols=' + encodeURIComponent(syms.join(',')));
+
+  liveStream.addEventListener('open', () => { streamConnected = true; });
+  liveStream.addEventListener('error', () => { streamConnected = false; });  // EventSource retries; polling resumes meanwhile
+
+  liveStream.addEventListener('quotes', e => {
+    const d = JSON.parse(e.data);
+    applyStreamQuotes(d.result || []);
+    renderIndexStrip();
+    renderTicker();
+    rerenderActivePanel();
+  });
+
+  liveStream.addEventListener('news', e => {
+    const d = JSON.parse(e.data);
+    if (!d.articles || !d.articles.length) return;
+    const known = new Set(NEWS_DATA.map(n => n.link || n.title));
+    const fresh = d.articles.filter(n => !known.has(n.link || n.title));
+    NEWS_DATA = [...fresh, ...NEWS_DATA].slice(0, 60);
+    const active = document.querySelector('.panel.active');
+    if (active && active.id === 'panel-news') renderNews();
+    if (active && active.id === 'panel-dashboard') {
+      renderMiniNews();
+      renderSentiment();
+    }
+  });
+}
+connectLiveStream();
+
 /* ── GLOBAL SEARCH ── */
+// Offline fallback only — the backend searches every listed instrument (/api/search)
 function buildSearchIndex() {
   return NIFTY50_STOCKS.map(s => ({
-    sym: s.sym, name: s.name, sector: s.sector, ltp: s.ltp, chgP: s.chgP,
+    sym: s.sym, name: s.name, sector: s.sector, ltp: s.ltp, chgP: s.chgP, yfSym: s.yfSym,
     _search: (s.sym + ' ' + s.name + ' ' + s.sector).toLowerCase()
   }));
 }
 
+async function searchSymbols(q) {
+  try {
+    const r = await fetch('http://localhost:5000/api/search?q=' + encodeURIComponent(q) + '&limit=10');
+    if (r.ok) {
+      const d = await r.json();
+      return (d.results || []).map(h => ({
+        sym: h.code, name: h.name, yfSym: h.symbol, exchange: h.exchange,
+        sector: (NIFTY50_STOCKS.find(s => s.yfSym === h.symbol) || {}).sector || '',
+        ltp: h.ltp, chgP: h.chgP,
+      }));
+    }
+  } catch (e) { /* backend down — search what the page already knows */ }
+  const lq = q.toLowerCase();
+  return buildSearchIndex().filter(s => s._search.includes(lq)).slice(0, 10);
+}
+
+const escapeHtml = (v) => String(v ?? '').replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+
 function setupGlobalSearch() {
   const input = document.getElementById('global-search');
   const results = document.getElementById('global-search-results');
   if (!input) return;
+  let debounce = null, seq = 0;
 
   input.addEventListener('input', () => {
-    const q = input.value.trim().toLowerCase();
+    clearTimeout(debounce);
+    const q = input.value.trim();
     if (!q) { results.style.display = 'none'; return; }
-    const idx = buildSearchIndex();
-    const hits = idx.filter(s => s._search.includes(q)).slice(0, 10);
-    if (!hits.length) {
-      results.innerHTML = `<div class="search-result-empty">No results for "${input.value}"</div>`;
-    } else {
-      results.innerHTML = hits.map(s => {
-        const mkt = marketStocks.find(m => m.sym === s.sym) || s;
-        const chg = mkt.chgP || 0;
-        return `<div class="search-result-item" onclick="onSearchSelect('${s.sym}','${s.sector}')">
-          <div class="sr-left"><span class="sr-sym">${s.sym}</span><span class="sr-name">${s.name}</span></div>
-          <div class="sr-right">
-            <span class="sr-price">₹${fmt(mkt.ltp)}</span>
-            <span class="sr-chg ${chg >= 0 ? 'up' : 'dn'}">${sign(chg)}${chg.toFixed(2)}%</span>
-          </div>
-        </div>`;
-      }).join('');
-    }
-    results.style.display = 'block';
+    debounce = setTimeout(async () => {
+      const mine = ++seq;
+      const hits = await searchSymbols(q);
+      if (mine !== seq) return;  // a newer keystroke already answered
+      if (!hits.length) {
+        results.innerHTML = `<div class="search-result-empty">No results for "${escapeHtml(q)}"</div>`;
+      } else {
+        results.innerHTML = hits.map(s => {
+          const mkt = marketStocks.find(m => m.yfSym === s.yfSym) || s;
+          const chg = mkt.chgP || 0;
+          const price = mkt.ltp ? `₹${fmt(mkt.ltp)}` : '—';
+          return `<div class="search-result-item" data-sym="${escapeHtml(s.sym)}" data-yf="${escapeHtml(s.yfSym || '')}" data-sector="${escapeHtml(s.sector || '')}">
+            <div class="sr-left"><span class="sr-sym">${escapeHtml(s.sym)}</span><span class="sr-name">${escapeHtml(s.name)}${s.exchange === 'BSE' ? ' · BSE' : ''}</span></div>
+            <div class="sr-right">
+              <span class="sr-price">${price}</span>
+              <span class="sr-chg ${chg >= 0 ? 'up' : 'dn'}">${sign(chg)}${chg.toFixed(2)}%</span>
+            </div>
+          </div>`;
+        }).join('');
+      }
+      results.style.display = 'block';
+    }, 120);
+  });
+
+  results.addEventListener('click', e => {
+    const item = e.target.closest('.search-result-item');
+    if (item) onSearchSelect(item.dataset.sym, item.dataset.sector, item.dataset.yf);
   });
 
   input.addEventListener('keydown', e => {
@@ -514,11 +614,23 @@ function setupGlobalSearch() {
   });
 }
 
-function onSearchSelect(sym, sector) {
+async function onSearchSelect(sym, sector, yfSym) {
   const input = document.getElementById('global-search');
   const results = document.getElementById('global-search-results');
   results.style.display = 'none';
   input.value = '';
+  if (yfSym && !marketStocks.some(m => m.yfSym === yfSym)) {
+    // Outside the tracked list: the backend fetches it on demand
+    const quotes = await fetchBatchQuotes([yfSym]);
+    const q = quotes && quotes[0];
+    if (q && q.regularMarketPrice) {
+      const chg = q.regularMarketChangePercent || 0;
+      showToast(`${sym}: ₹${fmt(q.regularMarketPrice)} (${sign(chg)}${chg.toFixed(2)}%)`);
+    } else {
+      showToast(`No quote available for ${sym}`);
+    }
+    return;
+  }
   // navigate to markets and highlight
   document.querySelectorAll('.nav-btn').forEach(b => b.classList.remove('active'));
   document.querySelectorAll('.panel').forEach(p => p.classList.remove('active'));
@@ -672,6 +784,25 @@ function renderPortfolioSummary() {
   drawPortfolioSparkline(totalCurrent);
 }
 
+/* ── INTRADAY PORTFOLIO SERIES (from /api/history/portfolio) ── */
+let portfolioSeries = [];
+
+async function fetchPortfolioSeries() {
+  try {
+    const r = await fetch('http://localhost:5000/api/history/portfolio?resolution=5m');
+    if (!r.ok) return;
+    const d = await r.json();
+    portfolioSeries = d.value || [];
+  } catch (e) { /* backend offline — sparklines stay flat */ }
+}
+fetchPortfolioSeries();
+setInterval(fetchPortfolioSeries, 60 * 1000);
+
+// Real intraday values ending at the live total; flat line when there's no history yet
+function intradaySeries(total) {
+  return [...(portfolioSeries.length ? portfolioSeries : [total]), total];
+}
+
 function drawPortfolioSparkline(total) {
   const canvas = document.getElementById('portfolio-sparkline');
   if (!canvas) return;
@@ -680,14 +811,8 @@ function drawPortfolioSparkline(total) {
   canvas.width = w; canvas.height = h;
   ctx.clearRect(0, 0, w, h);
 
-  const pts = 40;
-  const data = [];
-  let v = total * 0.92;
-  for (let i = 0; i < pts; i++) {
-    v += (Math.random() - 0.45) * total * 0.004;
-    data.push(v);
-  }
-  data[pts - 1] = total;
+  const data = intradaySeries(total);
+  const pts = data.length;
 
   const mn = Math.min(...data), mx = Math.max(...data);
   const range = mx - mn || 1;
@@ -905,17 +1030,11 @@ function drawPnlTrend() {
   canvas.width = w; canvas.height = h;
   ctx.clearRect(0, 0, w, h);
 
-  const pts = 30;
   const total = holdings.reduce((a, h) => a + h.qty * h.ltp, 0);
   const inv = holdings.reduce((a, h) => a + h.qty * h.avg, 0);
   if (!total) return;
-  const data = [];
-  let v = inv * 0.98;
-  for (let i = 0; i < pts; i++) {
-    v += (Math.random() - 0.44) * inv * 0.005;
-    data.push(v);
-  }
-  data[pts - 1] = total;
+  const data = intradaySeries(total);
+  const pts = data.length;
 
   const mn = Math.min(inv * 0.95, ...data), mx = Math.max(...data);
   const range = mx - mn || 1;
@@ -1129,7 +1248,7 @@ function renderNews() {
       <div class="news-item-top">
         <span class="news-category cat-${n.cat}">${n.cat}</span>
         <span class="news-impact impact-${n.impact}">${n.impact.toUpperCase()}</span>
-        <span style="font-size:10px;color:var(--text-muted);margin-left:auto">${n.source} · ${n.time}</span>
+        <span style="font-size:10px;color:var(--text-muted);margin-left:auto">${[...new Set((n.sources || [n]).map(s => s.source))].join(', ')} · ${n.time}</span>
       </div>
       <div class="news-headline">${n.title}</div>
       <div class="news-summary">${n.summary}</div>
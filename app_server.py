@@ -1,29 +1,53 @@
 """
 BHARAT TERMINAL — Python Backend Server
-Entry point: creates Flask app, registers routes, starts background threads.
+Entry point: creates Flask app, registers routes, schedules background jobs.
 
 Structure:
   backend/
-    config.py       — All constants, env vars, symbol maps, shared state
+    config.py       — All constants, env vars, symbol maps
+    snapshot.py     — Copy-on-write, versioned market data cache
     groww_api.py    — Groww API integration
     upstox_api.py   — Upstox API integration
+    upstox_feed.py  — Upstox WebSocket market-data feed (push source)
     stock_data.py   — Stock fetching pipeline + saved closes
     news_scraper.py — News RSS + web scraping
     routes.py       — Flask API routes
 """
 
-import time
+import os
+import sys
+import atexit
 import threading
-from datetime import datetime
+from datetime import timedelta
+
+# Installed before the imports below so that they are timed too
+from backend import startup_profile
+if '--profile-startup' in sys.argv:
+    startup_profile.install()
 
 from flask import Flask
 from flask_cors import CORS
 
-from backend.config import cache_lock, cache
-from backend.stock_data import fetch_stock_data, save_market_close, _load_saved_closes, prefill_cache_from_saved_closes
+from backend.stock_data import save_market_close, prefill_cache_from_saved_closes
+from backend.close_ledger import latest_closes
 from backend.news_scraper import fetch_news_data
+from backend.news_impact import refresh_impacts
 from backend.groww_api import groww_is_configured
 from backend.upstox_api import upstox_is_configured
+from backend.upstox_feed import start_upstox_feed
+from backend.tick_store import start_tick_store
+from backend.instruments import load_instruments
+from backend.search import ensure_search_index
+from backend.refresh_scheduler import refresh_due
+from backend.market_calendar import (
+    now_ist, next_session, next_transition, market_phase, holiday, load_calendar,
+)
+from backend.job_scheduler import add_job, start_scheduler
+from backend.warm_start import restore_warm_snapshot, save_warm_snapshot
+from backend.config import (
+    UPSTOX_FEED_ENABLED, UPSTOX_FEED_URL, REFRESH_BASE, NEWS_REFRESH_INTERVAL, CLOSE_SAVE_DELAY,
+    WARM_SNAPSHOT_INTERVAL, NEWS_IMPACT_INTERVAL,
+)
 from backend.routes import register_routes
 
 
@@ -31,62 +55,57 @@ from backend.routes import register_routes
 #  FLASK APP
 # ═══════════════════════════════════════════
 
-app = Flask(__name__, static_folder='.', static_url_path='')
-CORS(app)
-register_routes(app)
+with startup_profile.phase('flask app + routes'):
+    app = Flask(__name__, static_folder='.', static_url_path='')
+    CORS(app)
+    register_routes(app)
+
 
+def save_close_and_exit():
+    """Save the session's closing prices, then shut the server down"""
+    save_market_close()
+    save_warm_snapshot(force=True)
+    now = now_ist()
+    print(f"[{now.strftime('%H:%M:%S')}] 🔔 Market closed — saved today's closing prices")
+    print(f"[{now.strftime('%H:%M:%S')}] 🛑 Auto-shutting down server...")
+    os._exit(0)
 
-def is_market_open():
-    """Check if Indian stock market is currently open (9:15 AM - 3:30 PM, Mon-Fri)"""
-    now = datetime.now()
-    weekday = now.weekday()  # 0=Mon, 6=Sun
-    if weekday >= 5:
-        return False
-    market_start = now.replace(hour=9, minute=15, second=0)
-    market_end = now.replace(hour=15, minute=30, second=0)
-    return market_start <= now <= market_end
 
+def after_close(now):
+    """CLOSE_SAVE_DELAY seconds after the current (or next) session ends"""
+    session = next_session(now - timedelta(seconds=CLOSE_SAVE_DELAY))
+    return session.close + timedelta(seconds=CLOSE_SAVE_DELAY) if session else None
 
-def stock_refresh_loop():
-    """Refresh stocks every 30 seconds — only during market hours"""
-    while True:
-        if is_market_open():
-            fetch_stock_data()
-            time.sleep(30)
-        else:
-            time.sleep(60)  # Check every minute when market is closed
 
+def next_phase_change(now):
+    transition = next_transition(now)
+    return transition[0] if transition else None
 
-def news_refresh_loop():
-    """Refresh news every 5 minutes — only during market hours"""
-    while True:
-        if is_market_open():
-            fetch_news_data()
-            time.sleep(300)
-        else:
-            time.sleep(300)
 
+def log_phase():
+    phase = market_phase()
+    icon = {'pre-open': '🟡', 'open': '🟢', 'closed': '🔴'}[phase]
+    print(f"[{now_ist().strftime('%H:%M:%S')}] {icon} Market {phase}")
 
-def market_close_saver_loop():
-    """Auto-save closing prices at 3:31 PM IST every weekday"""
-    saved_today = False
-    while True:
-        now = datetime.now()
-        hour, minute = now.hour, now.minute
-        weekday = now.weekday()
 
-        if weekday < 5 and hour == 15 and minute == 31 and not saved_today:
-            save_market_close()
-            saved_today = True
-            print(f"[{now.strftime('%H:%M:%S')}] 🔔 Market closed — saved today's closing prices")
-            print(f"[{now.strftime('%H:%M:%S')}] 🛑 Auto-shutting down server...")
-            import os as _os
-            _os._exit(0)
+def load_reference_data():
+    """Instrument master + search index; requests that need them wait for the load"""
+    with startup_profile.phase('instrument master (bg)'):
+        load_instruments()
+    with startup_profile.phase('search index (bg)'):
+        ensure_search_index()
 
-        if hour == 0:
-            saved_today = False
 
-        time.sleep(30)
+def schedule_jobs():
+    """Every background job, on one scheduler driven by the market calendar"""
+    # Each symbol on its own adaptive cadence; refresh_due() says when to come back
+    add_job('stocks', refresh_due, every=REFRESH_BASE, session='open', jitter=0)
+    add_job('news', fetch_news_data, every=NEWS_REFRESH_INTERVAL, session='open')
+    add_job('news-impact', refresh_impacts, every=NEWS_IMPACT_INTERVAL, session='open')
+    add_job('market-phase', log_phase, at=next_phase_change)
+    add_job('close-saver', save_close_and_exit, at=after_close)
+    add_job('warm-snapshot', save_warm_snapshot, every=WARM_SNAPSHOT_INTERVAL)
+    start_scheduler()
 
 
 # ═══════════════════════════════════════════
@@ -98,15 +117,22 @@ if __name__ == '__main__':
     print("  ═══════════════════════════════════")
     print("  ✓ Data sources: Groww → Upstox → Google Finance → yfinance")
     print("  ✓ News: ET, Moneycontrol, Livemint RSS + scraping")
-    print("  ✓ Day-over-day tracking via saved_closes.json")
-    print("  ✓ Auto-save & shutdown at 3:31 PM IST")
-
-    market_status = "🟢 OPEN" if is_market_open() else "🔴 CLOSED"
+    print("  ✓ Day-over-day tracking via the close ledger (closes.db)")
+    print(f"  ✓ Auto-save & shutdown {CLOSE_SAVE_DELAY // 60} min after the close (IST exchange calendar)")
+
+    with startup_profile.phase('market calendar'):
+        load_calendar()
+    now = now_ist()
+    phase = market_phase(now)
+    market_status = {'open': "🟢 OPEN", 'pre-open': "🟡 PRE-OPEN"}.get(phase, "🔴 CLOSED")
+    if holiday(now.date()):
+        market_status += f" — {holiday(now.date())}"
     print(f"  ✓ Market status: {market_status}")
 
-    saved = _load_saved_closes()
+    with startup_profile.phase('close ledger'):
+        saved_date, saved = latest_closes()
     if saved:
-        print(f"  ✓ Loaded {len(saved)} saved closing prices")
+        print(f"  ✓ Loaded {len(saved)} closing prices from {saved_date}")
     else:
         print("  ⚠ No saved closes yet — will use API values for first day")
         print("    → Or manually save: http://localhost:5000/api/save-closes")
@@ -116,29 +142,51 @@ if __name__ == '__main__':
     if upstox_is_configured():
         print("  ✓ Upstox API: configured")
 
-    # Pre-fill cache from saved_closes.json so API returns data instantly
-    prefill_cache_from_saved_closes()
+    # Instrument master: every vendor's symbol for every listed share, and
+    # the search index over it. Loaded in the background so the server can
+    # answer from the warm snapshot straight away.
+    threading.Thread(target=load_reference_data, name='reference-data', daemon=True).start()
+
+    # Seal earlier days' tick logs and reload today's ticks into the history rings
+    with startup_profile.phase('tick store'):
+        sealed, loaded = start_tick_store()
+    if sealed or loaded:
+        print(f"  ✓ Tick store: sealed {sealed} past day(s), reloaded {loaded} ticks from today")
+
+    # Restore the last full snapshot so every endpoint answers instantly;
+    # without one, pre-fill bare prices from the latest ledger closes
+    with startup_profile.phase('warm snapshot'):
+        restored = restore_warm_snapshot()
+    if not restored:
+        with startup_profile.phase('ledger pre-fill'):
+            prefill_cache_from_saved_closes()
+    atexit.register(save_warm_snapshot)
 
     # Load cached portfolio (no auto-sync — user triggers via button)
     from backend.portfolio import load_portfolio
-    if load_portfolio():
+    with startup_profile.phase('portfolio'):
+        portfolio = load_portfolio()
+    if portfolio:
         print("  ✓ Portfolio loaded from cache")
     else:
         print("  ⚠ No portfolio yet → sync via http://localhost:5000/api/portfolio/sync")
 
     print(f"  ✓ Starting at http://localhost:5000\n")
 
-    # Fetch data once at startup, then let refresh loops handle it
-    if is_market_open():
+    # Stocks and news fetch right away when the market is open, otherwise
+    # from the next session's open
+    if phase == 'open':
         print("  ⏳ Market is open — fetching live data...\n")
-        threading.Thread(target=fetch_stock_data, daemon=True).start()
-        threading.Thread(target=fetch_news_data, daemon=True).start()
     else:
-        print("  💤 Market is closed — using cached data. Live fetch starts when market opens.\n")
+        session = next_session(now)
+        when = f"{session.open.strftime('%a %d %b %H:%M')} IST" if session else "the market opens"
+        print(f"  💤 Market is closed — using cached data. Live fetch starts {when}.\n")
 
-    # Start background threads
-    threading.Thread(target=stock_refresh_loop, daemon=True).start()
-    threading.Thread(target=news_refresh_loop, daemon=True).start()
-    threading.Thread(target=market_close_saver_loop, daemon=True).start()
+    with startup_profile.phase('scheduler'):
+        schedule_jobs()
+    if UPSTOX_FEED_ENABLED and (upstox_is_configured() or UPSTOX_FEED_URL.startswith('ws://')):
+        start_upstox_feed()
 
+    if startup_profile.enabled():
+        startup_profile.report_after_first_response()
     app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
@@ -0,0 +1,132 @@
+"""
+BHARAT TERMINAL — End-of-Day Close Ledger
+Closing prices keyed by (date, symbol) in SQLite (WAL journal), mirrored in
+memory. The mirror is loaded once and only changes when closes are recorded,
+so previous-day lookups are dict reads, not file parses. Each save is one
+transaction — a crash leaves either the old or the new day, never half.
+
+Replaces the single-day saved_closes.json; an existing file is imported on
+first open.
+"""
+
+import os
+import json
+import bisect
+import sqlite3
+import threading
+from types import MappingProxyType
+
+from .config import CLOSE_LEDGER_DB, SAVED_CLOSES_FILE
+from .market_calendar import today_ist
+
+
+_lock = threading.Lock()
+_state = {'conn': None, 'dates': [], 'closes': {}}  # closes: date → read-only {symbol: price}
+
+
+def _today():
+    """IST trading date — the key tick_store and the market calendar use too"""
+    return today_ist().isoformat()
+
+
+def _connect():
+    conn = sqlite3.connect(CLOSE_LEDGER_DB, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS closes ('
+        ' date TEXT NOT NULL, symbol TEXT NOT NULL, price REAL NOT NULL,'
+        ' PRIMARY KEY (date, symbol)) WITHOUT ROWID'
+    )
+    return conn
+
+
+def _open():
+    """Connect and load the in-memory mirror (once)"""
+    if _state['conn'] is not None:
+        return
+    conn = _connect()
+    closes = {}
+    for date, symbol, price in conn.execute('SELECT date, symbol, price FROM closes'):
+        closes.setdefault(date, {})[symbol] = price
+    _state['conn'] = conn
+    _state['closes'] = {d: MappingProxyType(p) for d, p in closes.items()}
+    _state['dates'] = sorted(closes)
+    _import_legacy_json()
+
+
+def _import_legacy_json():
+    """One-time import of saved_closes.json (kept on disk untouched)"""
+    if not os.path.exists(SAVED_CLOSES_FILE):
+        return
+    try:
+        with open(SAVED_CLOSES_FILE, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"  ⚠ Error reading saved_closes.json: {e}")
+        return
+    date, prices = data.get('date'), data.get('prices') or {}
+    if date and prices and date not in _state['closes']:
+        n = _write(date, prices)
+        print(f"  ✓ Imported {n} closes for {date} from saved_closes.json")
+
+
+def _write(date, prices):
+    rows = [(date, sym, float(p)) for sym, p in prices.items() if p and p > 0]
+    with _state['conn']:  # one transaction
+        _state['conn'].executemany(
+            'INSERT INTO closes (date, symbol, price) VALUES (?, ?, ?) '
+            'ON CONFLICT (date, symbol) DO UPDATE SET price = excluded.price',
+            rows,
+        )
+    merged = dict(_state['closes'].get(date, {}))
+    merged.update((sym, price) for _, sym, price in rows)
+    _state['closes'][date] = MappingProxyType(merged)
+    if date not in _state['dates']:
+        bisect.insort(_state['dates'], date)
+    return len(rows)
+
+
+def record_closes(prices, date=None):
+    """Upsert {symbol: price} as the close for `date` (default today) → rows written"""
+    with _lock:
+        _open()
+        return _write(date or _today(), prices)
+
+
+def closes_on(date):
+    """Closes recorded for exactly `date` (read-only, may be empty)"""
+    with _lock:
+        _open()
+        return _state['closes'].get(date, MappingProxyType({}))
+
+
+def previous_close_date(date=None):
+    """Latest recorded trading day strictly before `date` (default today), or None"""
+    with _lock:
+        _open()
+        dates = _state['dates']
+        i = bisect.bisect_left(dates, date or _today())
+        return dates[i - 1] if i else None
+
+
+def previous_closes(date=None):
+    """Closes from the last trading day before `date` (default today)"""
+    prev = previous_close_date(date)
+    return closes_on(prev) if prev else MappingProxyType({})
+
+
+def latest_closes():
+    """(date, closes) for the most recent recorded day, or (None, {})"""
+    with _lock:
+        _open()
+        if not _state['dates']:
+            return None, MappingProxyType({})
+        date = _state['dates'][-1]
+        return date, _state['closes'][date]
+
+
+def ledger_dates():
+    with _lock:
+        _open()
+        return list(_state['dates'])
@@ -5,7 +5,6 @@ All constants, environment variables, symbol maps, and shared state.
 
 import os
 import json
-import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -25,6 +24,12 @@ UPSTOX_REDIRECT_URI = os.getenv('UPSTOX_REDIRECT_URI', 'http://localhost:5000/ca
 UPSTOX_ACCESS_TOKEN = os.getenv('UPSTOX_ACCESS_TOKEN', '')
 UPSTOX_BASE_URL = 'https://api.upstox.com/v2'
 
+# Market-data feed (WebSocket push). Point UPSTOX_FEED_URL at
+# ws://127.0.0.1:8765 to use the offline fake feed (backend/upstox_fake_feed.py).
+UPSTOX_FEED_URL = os.getenv('UPSTOX_FEED_URL') or 'wss://api.upstox.com/v3/feed/market-data-feed'
+UPSTOX_FEED_MODE = 'ltpc'
+UPSTOX_FEED_ENABLED = os.getenv('UPSTOX_FEED_ENABLED', 'true').lower() != 'false'
+
 UPSTOX_INDEX_KEYS = {
     'nifty': 'NSE_INDEX|Nifty 50',
     'sensex': 'BSE_INDEX|SENSEX',
@@ -32,6 +37,7 @@ UPSTOX_INDEX_KEYS = {
     'vix': 'NSE_INDEX|India VIX',
 }
 
+# ISINs used only when no instrument dump is on disk (see INSTRUMENT MASTER)
 UPSTOX_STOCK_MAP = {
     'RELIANCE.NS': 'NSE_EQ|INE002A01018',
     'TCS.NS': 'NSE_EQ|INE467B01029',
@@ -54,35 +60,21 @@ GROWW_API_KEY = os.getenv('GROWW_API_KEY', '')
 GROWW_API_SECRET = os.getenv('GROWW_API_SECRET', '')
 GROWW_CLIENT = None  # Will hold the GrowwAPI instance
 
-GROWW_STOCK_MAP = {
-    'RELIANCE.NS': 'RELIANCE',
-    'TCS.NS': 'TCS',
-    'HDFCBANK.NS': 'HDFCBANK',
-    'ICICIBANK.NS': 'ICICIBANK',
-    'INFY.NS': 'INFY',
-    'ITC.NS': 'ITC',
-    'SBIN.NS': 'SBIN',
-    'BHARTIARTL.NS': 'BHARTIARTL',
-    'LT.NS': 'LT',
-    'KOTAKBANK.NS': 'KOTAKBANK',
-    'HINDUNILVR.NS': 'HINDUNILVR',
-    'BAJFINANCE.NS': 'BAJFINANCE',
-    'WIPRO.NS': 'WIPRO',
-    'AXISBANK.NS': 'AXISBANK',
-    'SUNPHARMA.NS': 'SUNPHARMA',
-    'MARUTI.NS': 'MARUTI',
-    'TATAMOTORS.NS': 'TATAMOTORS',
-    'TITAN.NS': 'TITAN',
-    'ADANIENT.NS': 'ADANIENT',
-    'NTPC.NS': 'NTPC',
-}
-
+# Groww addresses equities by their NSE trading symbol (from the instrument
+# master); indices need their Groww names spelled out.
 GROWW_INDEX_MAP = {
     '^NSEI': 'NIFTY',
     '^BSESN': 'SENSEX',
     '^NSEBANK': 'BANKNIFTY',
 }
 
+# Groww quotes fan out over a small pool (rate-limited to Groww's 10 req/s
+# live-data limit via SOURCE_RATE_LIMITS). Batch LTP takes up to 50 symbols.
+GROWW_WORKERS = 8
+GROWW_LTP_BATCH = 50
+GROWW_TIMEOUT = 5   # seconds per SDK call (its default waits forever); a quote + one
+                    # retry after reconnect stays well inside FETCH_CYCLE_DEADLINE
+
 
 # ═══════════════════════════════════════════
 #  SYMBOL MAPS
@@ -120,6 +112,56 @@ COMMODITY_SYMBOLS = {
     'NG=F': 'NATURAL GAS',
 }
 
+# Yahoo spark endpoint: one request returns daily closes + chart meta for up
+# to 20 symbols, so the whole universe needs only a handful of round trips.
+YAHOO_SPARK_URL = 'https://query1.finance.yahoo.com/v7/finance/spark'
+YAHOO_BATCH_SIZE = 20
+YAHOO_BATCH_MODE = True  # False → legacy per-ticker yf.Ticker fan-out
+
+# All source tiers start together; the cycle publishes whatever is settled
+# once this many seconds have passed.
+FETCH_CYCLE_DEADLINE = 20
+
+# Source health (backend/source_health.py): requests/second per upstream (news
+# limits apply per host), and circuit breaker settings. After
+# CB_FAILURE_THRESHOLD consecutive failures a source is skipped for
+# CB_COOLDOWN seconds, doubling up to CB_COOLDOWN_MAX while probes keep failing.
+SOURCE_RATE_LIMITS = {
+    'groww': 10,
+    'upstox': 25,
+    'google_finance': 5,
+    'yahoo': 5,
+    'news': 2,
+}
+SOURCE_RATE_WAIT = 2          # max seconds a call waits for a rate-limit token
+CB_FAILURE_THRESHOLD = 3
+CB_COOLDOWN = 30
+CB_COOLDOWN_MAX = 300
+HEALTH_WINDOW = 50            # calls kept for success rate / latency stats
+HEALTH_LATENCY_TARGET = 2.0   # seconds; slower p90 lowers the health score
+
+# Adaptive refresh (backend/refresh_scheduler.py): each symbol gets its own
+# interval between REFRESH_MIN and REFRESH_MAX seconds — shorter for movers,
+# holdings and symbols clients are watching. The sum over all symbols is held
+# under REFRESH_BUDGET symbol-refreshes per minute. That is a proxy for the
+# upstream request budget, and an upper bound on it per tier: every request
+# (a Yahoo spark chunk of 20, an Upstox batch of 500, one Google page)
+# carries at least one symbol. How many requests a cycle actually takes
+# depends on which tiers are live and how due symbols coalesce, which the
+# scheduler does not know in advance; /api/refresh-schedule reports the
+# measured rate as quote_requests_per_min.
+REFRESH_BASE = 30
+REFRESH_MIN = 10
+REFRESH_MAX = 120
+REFRESH_BUDGET = 120
+REFRESH_INTEREST_TTL = 300    # seconds a /api/quote request keeps a symbol "watched"
+
+# On-demand quotes (backend/on_demand.py): symbols outside the lists above are
+# fetched the first time a client asks, then kept warm in an LRU "hot set".
+HOT_SET_SIZE = 64
+ON_DEMAND_TIMEOUT = 8         # seconds /api/quote waits for a cold symbol
+ON_DEMAND_NEGATIVE_TTL = 300  # seconds an unknown/invalid symbol is not retried
+
 GOOGLE_FINANCE_MAP = {
     '^NSEI': 'NIFTY_50:INDEXNSE',
     '^BSESN': 'SENSEX:INDEXBOM',
@@ -127,6 +169,96 @@ GOOGLE_FINANCE_MAP = {
     '^INDIAVIX': 'INDIAVIX:INDEXNSE',
 }
 
+# Google Finance verification: every symbol is fetched concurrently over the
+# shared client; whatever has not answered by the deadline is dropped.
+GOOGLE_FINANCE_URL = 'https://www.google.com/finance/quote/'
+GF_POOL_SIZE = 10             # concurrent requests to www.google.com
+GF_DEADLINE = 6
+
+# Ingestion engine (backend/ingest.py): every HTTP source runs as coroutines
+# on one asyncio loop, through one pooled client (keep-alive; HTTP/2 when
+# the h2 package is installed). Requests beyond a host's limit queue.
+INGEST_MAX_CONNECTIONS = 100
+INGEST_MAX_KEEPALIVE = 40
+INGEST_PER_HOST = 8
+INGEST_HOST_LIMITS = {'www.google.com': GF_POOL_SIZE}
+INGEST_CONNECT_TIMEOUT = 3
+INGEST_TIMEOUT = 10
+
+
+# ═══════════════════════════════════════════
+#  INSTRUMENT MASTER
+# ═══════════════════════════════════════════
+
+# Local copy of the Upstox instrument dumps (backend/instruments.py). Refresh
+# with `python -m backend.instruments --download`; without the files the
+# master is built from the maps above and covers the configured universe only.
+INSTRUMENTS_DIR = os.getenv('INSTRUMENTS_DIR') or os.path.join(BASE_DIR, 'instruments')
+INSTRUMENTS_URL = 'https://assets.upstox.com/market-quote/instruments/exchange/{exchange}.json.gz'
+INSTRUMENTS_EXCHANGES = ('NSE', 'BSE')
+UPSTOX_QUOTE_BATCH = 500  # instrument keys per /market-quote/quotes call
+
+
+# ═══════════════════════════════════════════
+#  MARKET CALENDAR & JOBS
+# ═══════════════════════════════════════════
+
+# NSE/BSE equity session, IST (backend/market_calendar.py)
+MARKET_PRE_OPEN = '09:00'
+MARKET_OPEN = '09:15'
+MARKET_CLOSE = '15:30'
+
+# Trading holidays from the exchange circulars. Dates announced later (or
+# corrections) go in MARKET_CALENDAR_FILE — no code change needed:
+#   {"holidays": {"2027-01-26": "Republic Day"},
+#    "sessions": {"2027-10-29": ["18:00", "19:00", "Muhurat trading"]}}
+NSE_HOLIDAYS = {
+    '2025-02-26': 'Mahashivratri',
+    '2025-03-14': 'Holi',
+    '2025-03-31': 'Id-Ul-Fitr',
+    '2025-04-10': 'Shri Mahavir Jayanti',
+    '2025-04-14': 'Dr. Baba Saheb Ambedkar Jayanti',
+    '2025-04-18': 'Good Friday',
+    '2025-05-01': 'Maharashtra Day',
+    '2025-08-15': 'Independence Day',
+    '2025-08-27': 'Ganesh Chaturthi',
+    '2025-10-02': 'Mahatma Gandhi Jayanti / Dussehra',
+    '2025-10-21': 'Diwali Laxmi Pujan',
+    '2025-10-22': 'Diwali Balipratipada',
+    '2025-11-05': 'Prakash Gurpurb Sri Guru Nanak Dev',
+    '2025-12-25': 'Christmas',
+    '2026-01-15': 'Municipal Corporation Elections (Maharashtra)',
+    '2026-01-26': 'Republic Day',
+    '2026-03-03': 'Holi',
+    '2026-03-26': 'Shri Ram Navami',
+    '2026-03-31': 'Shri Mahavir Jayanti',
+    '2026-04-03': 'Good Friday',
+    '2026-04-14': 'Dr. Baba Saheb Ambedkar Jayanti',
+    '2026-05-01': 'Maharashtra Day',
+    '2026-05-28': 'Bakri Id',
+    '2026-06-26': 'Muharram',
+    '2026-09-14': 'Ganesh Chaturthi',
+    '2026-10-02': 'Mahatma Gandhi Jayanti',
+    '2026-10-20': 'Dussehra',
+    '2026-11-10': 'Diwali Balipratipada',
+    '2026-11-24': 'Prakash Gurpurb Sri Guru Nanak Dev',
+    '2026-12-25': 'Christmas',
+}
+
+# Sessions outside the normal pattern (muhurat trading, weekend budget days):
+# date → (open, close, label). Their pre-open is as long as the regular one.
+SPECIAL_SESSIONS = {
+    '2025-10-21': ('13:45', '14:45', 'Muhurat trading'),
+    '2026-02-01': ('09:15', '15:30', 'Union Budget (Sunday)'),
+}
+MARKET_CALENDAR_FILE = os.path.join(BASE_DIR, 'market_calendar.json')
+
+# Job scheduler (backend/job_scheduler.py)
+JOB_WORKERS = 4
+JOB_JITTER = 0.1              # interval jobs run up to 10% of their interval late, spreading load
+NEWS_REFRESH_INTERVAL = 300
+CLOSE_SAVE_DELAY = 60         # seconds after the session ends: save closes, then shut down
+
 
 # ═══════════════════════════════════════════
 #  NEWS CONFIG
@@ -180,6 +312,60 @@ SCRAPE_NEWS_URLS = [
     },
 ]
 
+# Every feed and page is fetched at once; each must answer (and parse) within
+# NEWS_SOURCE_TIMEOUT seconds — a 'timeout' key on an entry above overrides it —
+# or it keeps its last articles for this cycle. ETag / Last-Modified, a hash of
+# the body and the parsed articles are kept per URL in NEWS_FEED_STATE_FILE, so
+# a feed that has not changed is neither downloaded (304) nor re-parsed, even
+# right after a restart.
+NEWS_SOURCE_TIMEOUT = 6
+NEWS_FEED_STATE_FILE = os.path.join(BASE_DIR, 'news_feeds.json')
+
+# Every article seen is archived (SQLite) for NEWS_RETENTION_DAYS and searchable
+# through /api/news/search; /api/news and the stream carry the newest NEWS_LATEST.
+NEWS_ARCHIVE_DB = os.path.join(BASE_DIR, 'news.db')
+NEWS_RETENTION_DAYS = 14
+NEWS_LATEST = 30
+
+# Near-duplicates (backend/news_dedup.py): an article whose SimHash is within
+# NEWS_DUP_DISTANCE bits (of 64) of a story from the last NEWS_DUP_WINDOW_HOURS,
+# and shares NEWS_DUP_MIN_OVERLAP of its headline words, is folded into that
+# story as one more source.
+NEWS_DUP_DISTANCE = 18
+NEWS_DUP_MIN_OVERLAP = 0.5
+NEWS_DUP_WINDOW_HOURS = 48
+
+# News → price reaction (backend/news_impact.py): each article's affected stocks'
+# returns over these windows after it was published (None = to that session's
+# close), also in excess of NEWS_IMPACT_BENCHMARK. Sources are scored on
+# NEWS_IMPACT_SCORE_WINDOW.
+NEWS_IMPACT_WINDOWS = {'5m': 300, '30m': 1800, 'eod': None}
+NEWS_IMPACT_BENCHMARK = '^NSEI'
+NEWS_IMPACT_SCORE_WINDOW = '30m'
+NEWS_IMPACT_INTERVAL = 300    # job: update reactions to the last day's news
+
+# News tagging (backend/news_tagger.py) recognises every NSE share by its
+# trading symbol (written in capitals) and by its company name from the
+# instrument master. These are the short names headlines use instead.
+NEWS_ENTITY_ALIASES = {
+    'Reliance': 'RELIANCE', 'RIL': 'RELIANCE', 'Infosys': 'INFY', 'HDFC': 'HDFCBANK',
+    'ICICI': 'ICICIBANK', 'Kotak': 'KOTAKBANK', 'Axis Bank': 'AXISBANK', 'SBI': 'SBIN',
+    'State Bank': 'SBIN', 'L&T': 'LT', 'Larsen': 'LT', 'HUL': 'HINDUNILVR',
+    'Hindustan Unilever': 'HINDUNILVR', 'Bajaj Finance': 'BAJFINANCE', 'Bajaj Finserv': 'BAJAJFINSV',
+    'Sun Pharma': 'SUNPHARMA', 'Maruti': 'MARUTI', 'Asian Paints': 'ASIANPAINT',
+    'Tata Motors': 'TATAMOTORS', 'M&M': 'M&M', 'Mahindra': 'M&M', 'Tata Steel': 'TATASTEEL',
+    'JSW Steel': 'JSWSTEEL', 'Power Grid': 'POWERGRID', 'Airtel': 'BHARTIARTL',
+    'Bharti Airtel': 'BHARTIARTL', 'HCL Tech': 'HCLTECH', 'Adani Ports': 'ADANIPORTS',
+    'Adani Enterprises': 'ADANIENT', 'Adani Power': 'ADANIPOWER', "Dr Reddy's": 'DRREDDY',
+    'Eicher': 'EICHERMOT', 'Hero MotoCorp': 'HEROMOTOCO', 'Coal India': 'COALINDIA',
+    'Tech Mahindra': 'TECHM', 'UltraTech': 'ULTRACEMCO', 'IndusInd': 'INDUSINDBK',
+    'Tata Consumer': 'TATACONSUM', 'Vedanta': 'VEDL', 'Zomato': 'ZOMATO', 'Eternal': 'ZOMATO',
+    'Paytm': 'PAYTM', 'HAL': 'HAL', 'Hindustan Aeronautics': 'HAL', 'DMart': 'DMART',
+    'Avenue Supermarts': 'DMART', 'SBI Life': 'SBILIFE', 'Apollo Hospitals': 'APOLLOHOSP',
+    'Punjab National Bank': 'PNB', 'Bank of Baroda': 'BANKBARODA', 'Canara Bank': 'CANBK',
+    "Divi's": 'DIVISLAB', 'Titan': 'TITAN', 'Wipro': 'WIPRO', 'Cipla': 'CIPLA',
+}
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -191,16 +377,11 @@ HEADERS = {
 #  SHARED STATE
 # ═══════════════════════════════════════════
 
-cache = {
-    'quotes': {},
-    'indices': {},
-    'commodities': {},
-    'news': [],
-    'macro': {},
-    'last_stock_update': None,
-    'last_news_update': None,
-    '_live_prices': {},
-}
-cache_lock = threading.Lock()
+# Market data lives in backend/snapshot.py (copy-on-write, versioned). The
+# whole snapshot is written to WARM_SNAPSHOT_FILE every WARM_SNAPSHOT_INTERVAL
+# seconds (when it changed) and at shutdown, and restored at the next boot.
+WARM_SNAPSHOT_FILE = os.path.join(BASE_DIR, 'warm_snapshot.bin')
+WARM_SNAPSHOT_INTERVAL = 60
 
-SAVED_CLOSES_FILE = os.path.join(BASE_DIR, 'saved_closes.json')
+CLOSE_LEDGER_DB = os.path.join(BASE_DIR, 'closes.db')
+SAVED_CLOSES_FILE = os.path.join(BASE_DIR, 'saved_closes.json')  # legacy, imported into the ledger
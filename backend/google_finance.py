@@ -0,0 +1,118 @@
+"""
+BHARAT TERMINAL — Google Finance Verifier
+Cross-checks indices + key stocks against Google Finance. All symbols are
+fetched at once as coroutines on the ingest loop (shared client, at most
+GF_POOL_SIZE requests to Google at a time) and the step is bounded by
+GF_DEADLINE. Instead of parsing the whole quote page into a DOM, the
+response is streamed and scanning stops at the first element carrying
+data-last-price (its data-previous-close sits on the same tag).
+"""
+
+import re
+import asyncio
+
+from .config import GOOGLE_FINANCE_URL, GF_DEADLINE
+from . import source_health
+from . import ingest
+from .instruments import vendor_symbol, short_name
+
+
+GF_CHUNK_SIZE = 16384
+GF_DRAIN_LIMIT = 262144  # read at most this much past the price to keep the connection reusable
+
+_PRICE_RE = re.compile(rb'data-last-price="([0-9.]+)"')
+_PREV_RE = re.compile(rb'data-previous-close="([0-9.]+)"')
+
+
+def gf_symbol(symbol):
+    """Yahoo symbol → Google Finance 'TICKER:EXCHANGE' (None if unsupported)"""
+    return vendor_symbol(symbol, 'google_finance')
+
+
+async def extract_price(chunks):
+    """Scan an async iterator of byte chunks → (price, prev close) from the first
+    data-last-price tag, or None. Stops consuming as soon as that tag closes."""
+    buf = b''
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        buf += chunk
+        m = _PRICE_RE.search(buf)
+        if not m:
+            buf = buf[-256:]  # keep enough tail for an attribute split across chunks
+            continue
+        tag_start = buf.rfind(b'<', 0, m.start())
+        tag_end = buf.find(b'>', m.end())
+        if tag_end == -1:
+            continue  # the rest of the tag is in the next chunk
+        tag = buf[tag_start + 1 if tag_start != -1 else 0:tag_end]
+        prev = _PREV_RE.search(tag)
+        return float(m.group(1)), float(prev.group(1)) if prev else None
+    return None
+
+
+async def _drain(chunks, limit=GF_DRAIN_LIMIT):
+    """Read a short remainder to EOF so an HTTP/1.1 connection goes back to the
+    pool; give up past `limit` bytes (the response is then closed, not reused)"""
+    read = 0
+    try:
+        async for chunk in chunks:
+            read += len(chunk)
+            if read > limit:
+                return
+    except Exception:
+        pass
+
+
+async def fetch_quote(symbol):
+    """One Google Finance quote → quote dict, or None"""
+    gf_sym = gf_symbol(symbol)
+    if not gf_sym:
+        return None
+
+    try:
+        async with ingest.stream('google_finance', GOOGLE_FINANCE_URL + gf_sym, timeout=GF_DEADLINE) as r:
+            if r.status_code != 200:
+                return None
+            chunks = r.aiter_bytes(GF_CHUNK_SIZE)
+            found = await extract_price(chunks)
+            if found:
+                await _drain(chunks)
+    except Exception as e:
+        print(f"  ⚠ Google Finance error ({symbol}): {e}")
+        return None
+
+    if not found:
+        return None
+    price, prev_close = found
+    if price and prev_close:
+        chg = round(price - prev_close, 2)
+        chgP = round((chg / prev_close * 100), 2)
+        return {
+            'symbol': symbol,
+            'shortName': short_name(symbol),
+            'regularMarketPrice': round(price, 2),
+            'regularMarketPreviousClose': round(prev_close, 2),
+            'regularMarketChange': chg,
+            'regularMarketChangePercent': chgP,
+        }
+    return None
+
+
+async def verify(symbols, deadline=GF_DEADLINE):
+    """Fetch all symbols concurrently → {symbol: quote} for those back within `deadline`"""
+    if not symbols or not source_health.is_available('google_finance'):
+        return {}
+    tasks = {asyncio.ensure_future(fetch_quote(sym)): sym for sym in symbols}
+    done, late = await asyncio.wait(tasks, timeout=deadline)
+    for task in late:
+        task.cancel()
+
+    results = {}
+    for task in done:
+        q = task.result()
+        if q:
+            results[tasks[task]] = q
+    if late:
+        print(f"  ⚠ Google Finance: {len(late)} symbol(s) missed the {deadline}s deadline")
+    return results
@@ -1,12 +1,35 @@
 """
 BHARAT TERMINAL — Groww API Integration
+Quotes are fetched concurrently on a small worker pool, all going through
+the 'groww' source (rate limit sized to Groww's live-data limit + breaker). The first cycle of the day
+pulls full quotes (to learn each symbol's previous close); later cycles use
+batch LTP — one call per exchange. Groww symbols come from the instrument
+master, so any listed NSE/BSE share can be quoted. A token error triggers ONE reconnect that
+every in-flight request waits on and then retries with. Every SDK call is
+bounded by GROWW_TIMEOUT, and the tier as a whole by FETCH_CYCLE_DEADLINE:
+a hung connection is a recorded 'groww' failure, not a stuck tier.
 """
 
+import time
+import threading
+import concurrent.futures
 from datetime import datetime
-from .config import GROWW_API_KEY, GROWW_API_SECRET, GROWW_INDEX_MAP, GROWW_STOCK_MAP
+
+from .config import (
+    GROWW_API_KEY, GROWW_API_SECRET, INDEX_SYMBOLS,
+    GROWW_WORKERS, GROWW_LTP_BATCH, GROWW_TIMEOUT, FETCH_CYCLE_DEADLINE,
+)
+from . import source_health
+from .instruments import vendor_keys
 import backend.config as cfg
 
 
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=GROWW_WORKERS, thread_name_prefix='groww')
+_group_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='groww-group')  # waits on _executor
+_connect_lock = threading.Lock()
+_prev_closes = {'day': None, 'closes': {}}  # yahoo symbol → previous close, learned from full quotes
+
+
 def groww_is_configured():
     """Check if Groww API credentials are set up"""
     return bool(GROWW_API_KEY and GROWW_API_KEY != 'your_groww_api_key_here')
@@ -19,7 +42,8 @@ def groww_connect():
 
     try:
         from growwapi import GrowwAPI
-        access_token = GrowwAPI.get_access_token(
+        access_token = source_health.call(
+            'groww', GrowwAPI.get_access_token,
             api_key=GROWW_API_KEY,
             secret=GROWW_API_SECRET
         )
@@ -32,74 +56,177 @@ def groww_connect():
         return False
 
 
-def groww_fetch_quotes(symbols, exchange='NSE', segment='CASH'):
-    """Fetch real-time quotes from Groww API for given trading symbols"""
-    if not cfg.GROWW_CLIENT:
-        if not groww_connect():
-            return {}
+# ═══════════════════════════════════════════
+#  SHARED CONNECTION + RATE LIMIT
+# ═══════════════════════════════════════════
+
+def _client():
+    """Current client, connecting once if there is none"""
+    client = cfg.GROWW_CLIENT
+    if client is None:
+        with _connect_lock:
+            if cfg.GROWW_CLIENT is None:
+                groww_connect()
+            client = cfg.GROWW_CLIENT
+    return client
+
+
+def _reconnect(stale):
+    """Replace `stale` with a fresh client. Concurrent callers holding the same
+    stale client wait here and share the one that the first caller creates."""
+    with _connect_lock:
+        if cfg.GROWW_CLIENT is not stale and cfg.GROWW_CLIENT is not None:
+            return cfg.GROWW_CLIENT
+        print(f"  ⚠ Groww token issue, reconnecting...")
+        cfg.GROWW_CLIENT = None
+        groww_connect()
+        return cfg.GROWW_CLIENT
+
+
+def _is_token_error(e):
+    err_msg = str(e).lower()
+    return 'unauthorized' in err_msg or 'token' in err_msg or 'expired' in err_msg
+
+
+def _call(fn):
+    """Run fn(client) through the groww source, retrying once after a shared reconnect"""
+    client = _client()
+    if client is None:
+        return None
+    try:
+        return source_health.call('groww', fn, client)
+    except Exception as e:
+        if not _is_token_error(e):
+            raise
+        client = _reconnect(client)
+        if client is None:
+            return None
+        return source_health.call('groww', fn, client)
+
+
+# ═══════════════════════════════════════════
+#  QUOTES
+# ═══════════════════════════════════════════
+
+def _quote_entry(yahoo_sym, groww_sym, ltp, prev_close, net_chg=None):
+    if net_chg is None:
+        net_chg = ltp - prev_close
+    chg_pct = (net_chg / prev_close * 100) if prev_close else 0
+    return {
+        'symbol': yahoo_sym,
+        'shortName': groww_sym,
+        'regularMarketPrice': round(ltp, 2),
+        'regularMarketPreviousClose': round(prev_close, 2),
+        'regularMarketChange': round(net_chg, 2),
+        'regularMarketChangePercent': round(chg_pct, 2),
+    }
+
+
+def _known_closes():
+    today = datetime.now().strftime('%Y-%m-%d')
+    if _prev_closes['day'] != today:
+        _prev_closes['day'] = today
+        _prev_closes['closes'] = {}
+    return _prev_closes['closes']
+
+
+def _fetch_quote(yahoo_sym, groww_sym, exchange, segment):
+    try:
+        q = _call(lambda c: c.get_quote(groww_sym, exchange, segment, timeout=GROWW_TIMEOUT))
+    except Exception as e:
+        print(f"  ⚠ Groww quote error for {groww_sym}: {e}")
+        return None
+    if not (q and isinstance(q, dict)):
+        return None
+    ltp = float(q.get('last_price', 0))
+    prev_close = float(q.get('previous_close', ltp))
+    net_chg = float(q.get('net_change', ltp - prev_close))
+    _known_closes()[yahoo_sym] = prev_close
+    return _quote_entry(yahoo_sym, groww_sym, ltp, prev_close, net_chg)
+
 
+def groww_fetch_quotes(symbols, exchange='NSE', segment='CASH'):
+    """Fetch full quotes for {yahoo_sym: groww_sym} concurrently"""
+    futures = [
+        _executor.submit(_fetch_quote, yahoo_sym, groww_sym, exchange, segment)
+        for yahoo_sym, groww_sym in symbols.items()
+    ]
     results = {}
-    for yahoo_sym, groww_sym in symbols.items():
+    deadline = time.monotonic() + FETCH_CYCLE_DEADLINE
+    for f in futures:
         try:
-            q = cfg.GROWW_CLIENT.get_quote(groww_sym, exchange, segment)
-            if q and isinstance(q, dict):
-                ltp = float(q.get('last_price', 0))
-                prev_close = float(q.get('previous_close', ltp))
-                net_chg = float(q.get('net_change', ltp - prev_close))
-                chg_pct = (net_chg / prev_close * 100) if prev_close else 0
-
-                results[yahoo_sym] = {
-                    'symbol': yahoo_sym,
-                    'shortName': groww_sym,
-                    'regularMarketPrice': round(ltp, 2),
-                    'regularMarketPreviousClose': round(prev_close, 2),
-                    'regularMarketChange': round(net_chg, 2),
-                    'regularMarketChangePercent': round(chg_pct, 2),
-                }
-        except Exception as e:
-            err_msg = str(e).lower()
-            if 'unauthorized' in err_msg or 'token' in err_msg or 'expired' in err_msg:
-                print(f"  ⚠ Groww token issue, reconnecting...")
-                cfg.GROWW_CLIENT = None
-                if groww_connect():
-                    try:
-                        q = cfg.GROWW_CLIENT.get_quote(groww_sym, exchange, segment)
-                        if q and isinstance(q, dict):
-                            ltp = float(q.get('last_price', 0))
-                            prev_close = float(q.get('previous_close', ltp))
-                            net_chg = float(q.get('net_change', ltp - prev_close))
-                            chg_pct = (net_chg / prev_close * 100) if prev_close else 0
-                            results[yahoo_sym] = {
-                                'symbol': yahoo_sym,
-                                'shortName': groww_sym,
-                                'regularMarketPrice': round(ltp, 2),
-                                'regularMarketPreviousClose': round(prev_close, 2),
-                                'regularMarketChange': round(net_chg, 2),
-                                'regularMarketChangePercent': round(chg_pct, 2),
-                            }
-                    except:
-                        pass
-            else:
-                print(f"  ⚠ Groww quote error for {groww_sym}: {e}")
+            q = f.result(max(0.0, deadline - time.monotonic()))
+        except concurrent.futures.TimeoutError:
+            f.cancel()  # still queued behind a hung call: do not start it
+            continue
+        if q:
+            results[q['symbol']] = q
     return results
 
 
-def groww_fetch_all():
-    """Fetch all available data from Groww (indices + stocks)"""
-    if not groww_is_configured():
-        return {}, {}
+def groww_fetch_ltp(symbols, exchange='NSE', segment='CASH'):
+    """Batch LTP for {yahoo_sym: groww_sym} → {yahoo_sym: ltp} (one call per GROWW_LTP_BATCH)"""
+    keyed = {f'{exchange}_{groww_sym}': yahoo_sym for yahoo_sym, groww_sym in symbols.items()}
+    keys = list(keyed)
+    chunks = [tuple(keys[i:i + GROWW_LTP_BATCH]) for i in range(0, len(keys), GROWW_LTP_BATCH)]
+    futures = [_executor.submit(_call, lambda c, chunk=chunk: c.get_ltp(chunk, segment, timeout=GROWW_TIMEOUT))
+               for chunk in chunks]
 
-    # Fetch NSE stocks (exchange=NSE, segment=CASH)
-    stock_results = groww_fetch_quotes(GROWW_STOCK_MAP, exchange='NSE', segment='CASH')
+    ltps = {}
+    deadline = time.monotonic() + FETCH_CYCLE_DEADLINE
+    for f in futures:
+        try:
+            data = f.result(max(0.0, deadline - time.monotonic())) or {}
+        except Exception as e:
+            print(f"  ⚠ Groww LTP error: {e}")
+            continue
+        for key, value in data.items():
+            if isinstance(value, dict):
+                value = value.get('ltp') or value.get('last_price')
+            if key in keyed and value:
+                ltps[keyed[key]] = float(value)
+    return ltps
+
+
+def _fetch_group(symbols, exchange):
+    """Batch LTP where the previous close is already known, full quotes for the rest"""
+    closes = _known_closes()
+    known = {y: g for y, g in symbols.items() if y in closes}
+    unknown = {y: g for y, g in symbols.items() if y not in closes}
 
-    # Fetch NSE indices (NIFTY, BANKNIFTY)
-    nse_idx = {k: v for k, v in GROWW_INDEX_MAP.items() if k != '^BSESN'}
-    idx_results = groww_fetch_quotes(nse_idx, exchange='NSE', segment='CASH')
+    results = {}
+    if known:
+        for yahoo_sym, ltp in groww_fetch_ltp(known, exchange=exchange).items():
+            results[yahoo_sym] = _quote_entry(yahoo_sym, known[yahoo_sym], ltp, closes[yahoo_sym])
+        unknown.update({y: g for y, g in known.items() if y not in results})
+    if unknown:
+        results.update(groww_fetch_quotes(unknown, exchange=exchange))
+    return results
+
+
+def groww_fetch_all(symbols):
+    """Fetch `symbols` (indices + stocks) from Groww in one concurrent step → (indices, stocks)"""
+    if not groww_is_configured() or not source_health.is_available('groww') or _client() is None:
+        return {}, {}
 
-    # Fetch BSE index (SENSEX)
-    bse_idx = {k: v for k, v in GROWW_INDEX_MAP.items() if k == '^BSESN'}
-    if bse_idx:
-        bse_results = groww_fetch_quotes(bse_idx, exchange='BSE', segment='CASH')
-        idx_results.update(bse_results)
+    # Groww keys are 'NSE_RELIANCE' / 'BSE_SENSEX': one group per exchange
+    by_exchange = {}
+    for yahoo_sym, key in vendor_keys(symbols, 'groww').items():
+        exchange, groww_sym = key.split('_', 1)
+        by_exchange.setdefault(exchange, {})[yahoo_sym] = groww_sym
 
+    groups = [_group_executor.submit(_fetch_group, syms, exchange) for exchange, syms in by_exchange.items()]
+    results = {}
+    start = time.monotonic()
+    for f in groups:
+        try:
+            results.update(f.result(max(0.0, start + FETCH_CYCLE_DEADLINE - time.monotonic())))
+        except concurrent.futures.TimeoutError:
+            # Past the SDK timeouts something is hung: count it so the breaker sees it
+            source_health.source('groww').failure(time.monotonic() - start, 'tier timed out')
+            print(f"  ⚠ Groww timed out after {FETCH_CYCLE_DEADLINE}s")
+
+    index_set = set(INDEX_SYMBOLS.values())
+    idx_results = {k: v for k, v in results.items() if k in index_set}
+    stock_results = {k: v for k, v in results.items() if k not in index_set}
     return idx_results, stock_results
@@ -0,0 +1,203 @@
+"""
+BHARAT TERMINAL — Intraday Tick History
+One fixed-capacity, preallocated NumPy ring buffer per symbol, filled from
+every snapshot publish that changes live prices (fetch_stock_data and the
+Upstox feed alike). Ticks within the same second collapse into one slot, so
+a full 6h15m session fits in HISTORY_CAPACITY samples per symbol.
+A symbol's ring is dropped when it leaves live prices (evicted from the
+on-demand hot set), and at most HISTORY_MAX_RINGS are kept — the least
+recently ticked goes first — so memory stays bounded all session.
+OHLC bars are aggregated with vectorized reduceat — no Python loops.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .config import NIFTY50_SYMBOLS, INDEX_SYMBOLS, COMMODITY_SYMBOLS, HOT_SET_SIZE
+from . import snapshot
+
+
+HISTORY_CAPACITY = 22528  # ≥ 375 min × 60 s — one trading session at 1 sample/s
+RESOLUTIONS = {'1m': 60, '5m': 300, '15m': 900}
+# The configured universe + a full hot set (~360 KB each)
+HISTORY_MAX_RINGS = len(NIFTY50_SYMBOLS) + len(INDEX_SYMBOLS) + len(COMMODITY_SYMBOLS) + HOT_SET_SIZE
+
+
+class TickRing:
+    """Preallocated ring of (epoch second, price) samples"""
+
+    __slots__ = ('ts', 'px', 'head', 'size')
+
+    def __init__(self, capacity=HISTORY_CAPACITY):
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.px = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # next write position
+        self.size = 0
+
+    def append(self, ts, price):
+        cap = len(self.ts)
+        if self.size:
+            last = (self.head - 1) % cap
+            if self.ts[last] == ts:
+                self.px[last] = price  # same second — keep the latest price
+                return
+            if self.ts[last] > ts:
+                return  # out-of-order sample
+        self.ts[self.head] = ts
+        self.px[self.head] = price
+        self.head = (self.head + 1) % cap
+        self.size = min(self.size + 1, cap)
+
+    def extend(self, ts, px):
+        """Bulk-append sorted samples (vectorized; same-second samples keep the last)"""
+        if len(ts) == 0:
+            return
+        keep = np.r_[ts[1:] != ts[:-1], True]
+        ts, px = ts[keep], px[keep]
+        if self.size:
+            newer = ts > self.ts[(self.head - 1) % len(self.ts)]
+            ts, px = ts[newer], px[newer]
+        cap = len(self.ts)
+        ts, px = ts[-cap:], px[-cap:]
+        n = len(ts)
+        if n == 0:
+            return
+        slots = (self.head + np.arange(n)) % cap
+        self.ts[slots] = ts
+        self.px[slots] = px
+        self.head = int((self.head + n) % cap)
+        self.size = min(self.size + n, cap)
+
+    def series(self, since=None):
+        """Chronological (ts, px) arrays (copies), optionally only ts >= since"""
+        cap = len(self.ts)
+        if self.size < cap:
+            ts, px = self.ts[:self.size].copy(), self.px[:self.size].copy()
+        else:
+            order = np.r_[self.head:cap, 0:self.head]
+            ts, px = self.ts[order], self.px[order]
+        if since is not None:
+            start = np.searchsorted(ts, since, side='left')
+            ts, px = ts[start:], px[start:]
+        return ts, px
+
+
+_rings = OrderedDict()      # symbol → TickRing, most recently ticked last
+_rings_lock = threading.Lock()
+
+
+def _ring(sym):
+    with _rings_lock:
+        ring = _rings.get(sym)
+        if ring is None:
+            ring = _rings[sym] = TickRing()
+            while len(_rings) > HISTORY_MAX_RINGS:
+                _rings.popitem(last=False)
+        else:
+            _rings.move_to_end(sym)
+        return ring
+
+
+def forget(symbols):
+    """Drop these symbols' rings"""
+    with _rings_lock:
+        for sym in symbols:
+            _rings.pop(sym, None)
+
+
+def record(prices, ts=None):
+    """Append {symbol: price} samples taken at epoch second `ts` (default now)"""
+    ts = int(ts if ts is not None else time.time())
+    for sym, price in prices.items():
+        if price and price > 0:
+            _ring(sym).append(ts, float(price))
+
+
+def backfill(sym, ts, px):
+    """Load already-sorted (epoch second, price) arrays into a symbol's ring"""
+    _ring(sym).extend(np.asarray(ts, dtype=np.int64), np.asarray(px, dtype=np.float64))
+
+
+def _on_publish(old, new):
+    if new.live_prices is old.live_prices:
+        return
+    changed = {s: p for s, p in new.live_prices.items() if old.live_prices.get(s) != p}
+    if changed:
+        record(changed)
+    gone = old.live_prices.keys() - new.live_prices.keys()  # evicted from the hot set
+    if gone:
+        forget(gone)
+
+
+snapshot.on_publish(_on_publish)
+
+
+def resolve_symbol(sym):
+    """Accept RELIANCE / RELIANCE.NS / ^NSEI and return the key we store under"""
+    if sym in _rings:
+        return sym
+    if f'{sym}.NS' in _rings:
+        return f'{sym}.NS'
+    return sym
+
+
+def symbols():
+    with _rings_lock:
+        return list(_rings)
+
+
+def series(sym, since=None):
+    ring = _rings.get(sym)
+    if ring is None:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    return ring.series(since)
+
+
+# ═══════════════════════════════════════════
+#  BAR AGGREGATION (vectorized)
+# ═══════════════════════════════════════════
+
+def aggregate_bars(ts, px, seconds):
+    """Samples → OHLC bars keyed by bucket start: dict of equal-length arrays"""
+    if len(ts) == 0:
+        empty = np.zeros(0)
+        return {'t': empty.astype(np.int64), 'o': empty, 'h': empty, 'l': empty, 'c': empty, 'n': empty.astype(np.int64)}
+
+    bucket = ts - ts % seconds
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(px)]
+    return {
+        't': bucket[starts],
+        'o': px[starts],
+        'h': np.maximum.reduceat(px, starts),
+        'l': np.minimum.reduceat(px, starts),
+        'c': px[ends - 1],
+        'n': ends - starts,
+    }
+
+
+def bars(sym, resolution='5m', since=None):
+    ts, px = series(sym, since)
+    return aggregate_bars(ts, px, RESOLUTIONS[resolution])
+
+
+def weighted_close_series(weights, resolution='5m', since=None):
+    """Σ weight × close on a common bar grid (forward-filled) → (t, value)"""
+    per_symbol = {}
+    for sym, w in weights.items():
+        b = bars(resolve_symbol(sym), resolution, since)
+        if len(b['t']):
+            per_symbol[sym] = (b['t'], b['c'], w)
+    if not per_symbol:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    grid = np.unique(np.concatenate([t for t, _, _ in per_symbol.values()]))
+    total = np.zeros(len(grid))
+    for t, c, w in per_symbol.values():
+        # Last bar at or before each grid point; before a symbol's first bar use its first close
+        idx = np.clip(np.searchsorted(t, grid, side='right') - 1, 0, None)
+        total += w * c[idx]
+    return grid, total
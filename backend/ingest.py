@@ -0,0 +1,151 @@
+"""
+BHARAT TERMINAL — Ingestion Engine
+One asyncio event loop on its own thread ('ingest'), beside Flask's request
+threads, and one pooled httpx.AsyncClient shared by every HTTP source —
+Upstox REST, Yahoo, Google Finance, news. Fetchers are coroutines: a
+hundred upstream requests in flight cost one thread, not a pool each.
+
+  • keep-alive pool of INGEST_MAX_CONNECTIONS, HTTP/2 when `h2` is installed
+    (one multiplexed connection per host instead of one per request)
+  • per-host concurrency caps (INGEST_PER_HOST, INGEST_HOST_LIMITS)
+  • every request goes through source_health (rate limit, breaker, stats)
+
+Threaded code hands work to the loop with run(coro) (blocks for the result)
+or submit(coro) (a concurrent.futures.Future). CPU-heavy parsing goes
+through in_thread() so it does not stall the other requests.
+"""
+
+import asyncio
+import functools
+import threading
+import concurrent.futures
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from .config import (
+    HEADERS, INGEST_MAX_CONNECTIONS, INGEST_MAX_KEEPALIVE, INGEST_PER_HOST, INGEST_HOST_LIMITS,
+    INGEST_CONNECT_TIMEOUT, INGEST_TIMEOUT,
+)
+from . import source_health
+
+
+_state = {'loop': None, 'client': None, 'http2': False}
+_start_lock = threading.Lock()
+_host_slots = {}            # host → asyncio.Semaphore (loop thread only)
+_stats = {'requests': 0, 'in_flight': 0, 'peak_in_flight': 0, 'errors': 0, 'by_version': {}}
+
+
+def loop():
+    """The ingest event loop, started on first use"""
+    if _state['loop'] is None:
+        with _start_lock:
+            if _state['loop'] is None:
+                new_loop = asyncio.new_event_loop()
+                threading.Thread(target=new_loop.run_forever, name='ingest', daemon=True).start()
+                _state['loop'] = new_loop
+    return _state['loop']
+
+
+def submit(coro):
+    """Schedule a coroutine on the ingest loop → concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, loop())
+
+
+def run(coro, timeout=None):
+    """Run a coroutine on the ingest loop from a normal thread and wait for it"""
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+async def in_thread(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the loop's default thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+
+def _client():
+    """The shared AsyncClient (created on the loop thread, on first request)"""
+    if _state['client'] is None:
+        import httpx
+
+        try:
+            import h2  # noqa: F401 — httpx only negotiates HTTP/2 with it installed
+            _state['http2'] = True
+        except ImportError:
+            _state['http2'] = False
+        _state['client'] = httpx.AsyncClient(
+            http2=_state['http2'],
+            headers=HEADERS,
+            timeout=httpx.Timeout(INGEST_TIMEOUT, connect=INGEST_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=INGEST_MAX_CONNECTIONS,
+                                max_keepalive_connections=INGEST_MAX_KEEPALIVE),
+            follow_redirects=True,
+        )
+    return _state['client']
+
+
+@asynccontextmanager
+async def _slot(url):
+    host = urlsplit(url).hostname or ''
+    slots = _host_slots.get(host)
+    if slots is None:
+        slots = _host_slots[host] = asyncio.Semaphore(INGEST_HOST_LIMITS.get(host, INGEST_PER_HOST))
+    async with slots:
+        _stats['requests'] += 1
+        _stats['in_flight'] += 1
+        _stats['peak_in_flight'] = max(_stats['peak_in_flight'], _stats['in_flight'])
+        try:
+            yield
+        except Exception:
+            _stats['errors'] += 1
+            raise
+        finally:
+            _stats['in_flight'] -= 1
+
+
+def _count_version(response):
+    by_version = _stats['by_version']
+    by_version[response.http_version] = by_version.get(response.http_version, 0) + 1
+
+
+async def request(source, method, url, **kwargs):
+    """One request through the shared client, counted against `source` → httpx.Response"""
+    async with _slot(url):
+        response = await source_health.call_async(source, _client().request, method, url, **kwargs)
+    _count_version(response)
+    return response
+
+
+async def get(source, url, **kwargs):
+    return await request(source, 'GET', url, **kwargs)
+
+
+@asynccontextmanager
+async def stream(source, url, **kwargs):
+    """GET with the body left unread: iterate response.aiter_bytes(), stop early
+    if you like — the response is closed on exit"""
+    async with _slot(url):
+        client = _client()
+        response = await source_health.call_async(
+            source, client.send, client.build_request('GET', url, **kwargs), stream=True)
+        _count_version(response)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+
+def ingest_status():
+    return {
+        'running': _state['loop'] is not None,
+        'http2': _state['http2'],
+        'requests': _stats['requests'],
+        'in_flight': _stats['in_flight'],
+        'peak_in_flight': _stats['peak_in_flight'],
+        'errors': _stats['errors'],
+        'responses_by_http_version': dict(_stats['by_version']),
+        'hosts': sorted(_host_slots),
+    }
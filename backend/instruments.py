@@ -0,0 +1,306 @@
+"""
+BHARAT TERMINAL — Instrument Master
+One table of every listed instrument, so no module has to guess a vendor's
+symbol from a Yahoo ticker. Loaded from the Upstox instrument dumps in
+INSTRUMENTS_DIR (NSE + BSE equities; JSON or the older CSV layout, gzipped
+or not), plus the headline indices from config. Without the dumps it is
+built from the config maps and covers the configured universe only.
+
+Rows are immutable tuples with interned strings; one alias dict maps every
+identifier — Yahoo symbol, trading symbol, 'NSE:SYMBOL', ISIN, Upstox key,
+Groww key, Google Finance symbol — to its row, so lookups in any direction
+are a single dict read. Where a company trades on both exchanges, the bare
+symbol and the ISIN resolve to the NSE listing.
+
+Download the dumps with `python -m backend.instruments --download`.
+"""
+
+import os
+import io
+import csv
+import sys
+import gzip
+import json
+import threading
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from .config import (
+    NIFTY50_SYMBOLS, INDEX_SYMBOLS, UPSTOX_STOCK_MAP, UPSTOX_INDEX_KEYS,
+    GROWW_INDEX_MAP, GOOGLE_FINANCE_MAP,
+    INSTRUMENTS_DIR, INSTRUMENTS_URL, INSTRUMENTS_EXCHANGES, HEADERS,
+)
+
+
+class Instrument(NamedTuple):
+    yahoo: str                   # 'RELIANCE.NS', 'RELIANCE.BO', '^NSEI'
+    symbol: str                  # exchange trading symbol / short display name
+    name: str
+    isin: str                    # '' for indices
+    exchange: str                # 'NSE' | 'BSE'
+    kind: str                    # 'EQ' | 'INDEX' | 'OTHER' (ETFs, bonds… in the cash segment)
+    upstox_key: Optional[str]    # 'NSE_EQ|INE002A01018'
+    groww_key: Optional[str]     # 'NSE_RELIANCE' (Groww's exchange_trading_symbol)
+    gf_key: Optional[str]        # 'RELIANCE:NSE'
+
+
+VENDOR_FIELDS = {'upstox': 'upstox_key', 'groww': 'groww_key', 'google_finance': 'gf_key'}
+
+# Series/types that are ordinary listed shares (JSON dump uses the NSE
+# series, the older CSV dump says EQUITY); BSE equity groups vary, so BSE
+# shares are recognised by an equity ISIN instead. Other cash-segment rows
+# (ETFs, bonds) are kept as 'OTHER' — quotable, but not in universe().
+_EQUITY_TYPES = {'EQ', 'BE', 'BZ', 'SM', 'ST', 'EQUITY'}
+_YAHOO_SUFFIX = {'NSE': '.NS', 'BSE': '.BO'}
+_GF_SUFFIX = {'NSE': ':NSE', 'BSE': ':BOM'}
+
+_lock = threading.Lock()
+_state = {'rows': None, 'alias': {}, 'source': None, 'loaded_at': None}
+
+
+# ═══════════════════════════════════════════
+#  BUILDING
+# ═══════════════════════════════════════════
+
+def _equity(symbol, name, isin, exchange, upstox_key=None, kind='EQ'):
+    symbol = sys.intern(symbol)
+    return Instrument(
+        yahoo=sys.intern(symbol + _YAHOO_SUFFIX[exchange]),
+        symbol=symbol,
+        name=sys.intern(name or symbol),
+        isin=sys.intern(isin or ''),
+        exchange=exchange,
+        kind=kind,
+        upstox_key=sys.intern(upstox_key) if upstox_key else None,
+        groww_key=sys.intern(f'{exchange}_{symbol}'),
+        gf_key=sys.intern(symbol + _GF_SUFFIX[exchange]),
+    )
+
+
+def _indices():
+    """Headline indices — the dumps name them differently from every vendor"""
+    rows = []
+    for name, yahoo in INDEX_SYMBOLS.items():
+        upstox_key = UPSTOX_INDEX_KEYS.get(name)
+        exchange = upstox_key.split('_')[0] if upstox_key else 'NSE'
+        groww = GROWW_INDEX_MAP.get(yahoo)
+        rows.append(Instrument(
+            yahoo=yahoo,
+            symbol=name.upper(),
+            name=upstox_key.split('|', 1)[1] if upstox_key else name.upper(),
+            isin='',
+            exchange=exchange,
+            kind='INDEX',
+            upstox_key=upstox_key,
+            groww_key=f'{exchange}_{groww}' if groww else None,
+            gf_key=GOOGLE_FINANCE_MAP.get(yahoo),
+        ))
+    return rows
+
+
+def _fallback_equities():
+    """Configured universe only, ISINs where config knows them"""
+    rows = []
+    for yahoo in NIFTY50_SYMBOLS:
+        upstox_key = UPSTOX_STOCK_MAP.get(yahoo)
+        isin = upstox_key.split('|', 1)[1] if upstox_key else ''
+        rows.append(_equity(yahoo[:-len('.NS')], None, isin, 'NSE', upstox_key))
+    return rows
+
+
+def _read_dump(path):
+    """Upstox dump → iterable of dict rows (JSON list or CSV, optionally gzipped)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        raw = f.read()
+    if '.json' in os.path.basename(path):
+        return json.loads(raw)
+    return csv.DictReader(io.StringIO(raw.decode('utf-8')))
+
+
+def _parse_row(row):
+    """Dump row → Instrument for an NSE/BSE cash-segment listing, else None"""
+    segment = row.get('segment') or row.get('exchange') or ''
+    if segment not in ('NSE_EQ', 'BSE_EQ'):
+        return None
+    exchange = segment[:3]
+    key = row.get('instrument_key') or ''
+    isin = row.get('isin') or (key.split('|', 1)[1] if key.startswith(segment + '|IN') else '')
+    itype = (row.get('instrument_type') or '').upper()
+    share = itype in _EQUITY_TYPES or (exchange == 'BSE' and isin.startswith('INE'))
+    symbol = (row.get('trading_symbol') or row.get('tradingsymbol') or '').strip().upper()
+    if not symbol:
+        return None
+    return _equity(symbol, (row.get('name') or '').strip(), isin, exchange, key or None, 'EQ' if share else 'OTHER')
+
+
+def _dump_files():
+    if not os.path.isdir(INSTRUMENTS_DIR):
+        return []
+    return sorted(
+        os.path.join(INSTRUMENTS_DIR, f) for f in os.listdir(INSTRUMENTS_DIR)
+        if f.endswith(('.json', '.json.gz', '.csv', '.csv.gz'))
+    )
+
+
+def _index(rows):
+    """alias → row; NSE listings claim the exchange-less aliases first"""
+    alias = {}
+    for preferred in (True, False):
+        for row in rows:
+            if (row.exchange == 'NSE') != preferred:
+                continue
+            keys = [row.yahoo, f'{row.exchange}:{row.symbol}', row.upstox_key, row.groww_key, row.gf_key]
+            if row.kind != 'INDEX':
+                keys += [row.symbol, row.isin]
+            for key in keys:
+                if key:
+                    alias.setdefault(key, row)
+    return alias
+
+
+def load_instruments(force=False):
+    """Build the master (once) → number of instruments"""
+    with _lock:
+        if _state['rows'] is not None and not force:
+            return len(_state['rows'])
+
+        rows, seen, files = _indices(), set(), []
+        for path in _dump_files():
+            try:
+                parsed = [r for r in map(_parse_row, _read_dump(path)) if r]
+            except Exception as e:
+                print(f"  ⚠ Instrument dump {os.path.basename(path)} unreadable: {e}")
+                continue
+            files.append(os.path.basename(path))
+            for r in parsed:
+                if r.yahoo not in seen:
+                    seen.add(r.yahoo)
+                    rows.append(r)
+        if not files:
+            rows += _fallback_equities()
+
+        _state['rows'] = tuple(rows)
+        _state['alias'] = _index(rows)
+        _state['source'] = files or 'config'
+        _state['loaded_at'] = datetime.now().isoformat()
+        where = ', '.join(files) if files else 'config maps (no dump in instruments/)'
+        print(f"  📇 Instrument master: {len(rows)} instruments from {where}")
+        return len(rows)
+
+
+def _alias():
+    if _state['rows'] is None:
+        load_instruments()
+    return _state['alias']
+
+
+# ═══════════════════════════════════════════
+#  LOOKUPS
+# ═══════════════════════════════════════════
+
+def resolve(ident):
+    """Any identifier (Yahoo symbol, trading symbol, 'BSE:SYM', ISIN, vendor
+    key) → Instrument, or None"""
+    if not ident:
+        return None
+    alias = _alias()
+    return alias.get(ident) or alias.get(ident.strip().upper())
+
+
+def vendor_symbol(sym, vendor):
+    """Yahoo symbol → the vendor's key for it ('upstox', 'groww', 'google_finance'),
+    or None when the vendor cannot quote it"""
+    inst = _alias().get(sym)
+    return getattr(inst, VENDOR_FIELDS[vendor]) if inst else None
+
+
+def from_vendor(vendor, key):
+    """Vendor key → Yahoo symbol, or None"""
+    inst = _alias().get(key)
+    return inst.yahoo if inst and getattr(inst, VENDOR_FIELDS[vendor]) == key else None
+
+
+def vendor_keys(symbols, vendor):
+    """{yahoo_sym: vendor key} for the symbols the vendor can quote"""
+    alias, field = _alias(), VENDOR_FIELDS[vendor]
+    keys = {}
+    for sym in symbols:
+        inst = alias.get(sym)
+        key = getattr(inst, field) if inst else None
+        if key:
+            keys[sym] = key
+    return keys
+
+
+def short_name(sym):
+    """Display name for a quote: trading symbol when known, else the bare ticker"""
+    inst = _alias().get(sym)
+    if inst:
+        return inst.symbol
+    for suffix in ('.NS', '.BO', '=X'):
+        if sym.endswith(suffix):
+            return sym[:-len(suffix)]
+    return sym.lstrip('^')
+
+
+def is_listed(sym):
+    return sym in _alias()
+
+
+def has_dump():
+    """True when the master came from instrument files, i.e. it knows every listing"""
+    _alias()
+    return _state['source'] != 'config'
+
+
+def all_instruments():
+    """Every row, in load order (indices first)"""
+    _alias()
+    return _state['rows']
+
+
+def universe(exchange='NSE'):
+    """Yahoo symbols of every listed share on `exchange`"""
+    _alias()
+    return [r.yahoo for r in _state['rows'] if r.kind == 'EQ' and r.exchange == exchange]
+
+
+def instruments_status():
+    _alias()
+    rows = _state['rows']
+    return {
+        'source': _state['source'],
+        'loaded_at': _state['loaded_at'],
+        'instruments': len(rows),
+        'equities': {ex: sum(1 for r in rows if r.kind == 'EQ' and r.exchange == ex) for ex in ('NSE', 'BSE')},
+        'aliases': len(_state['alias']),
+        'vendor_coverage': {v: sum(1 for r in rows if getattr(r, f)) for v, f in VENDOR_FIELDS.items()},
+    }
+
+
+# ═══════════════════════════════════════════
+#  DOWNLOAD
+# ═══════════════════════════════════════════
+
+def download_instruments():
+    """Fetch the NSE/BSE dumps into INSTRUMENTS_DIR (atomic replace per file)"""
+    import requests as req_lib
+
+    os.makedirs(INSTRUMENTS_DIR, exist_ok=True)
+    for exchange in INSTRUMENTS_EXCHANGES:
+        url = INSTRUMENTS_URL.format(exchange=exchange)
+        path = os.path.join(INSTRUMENTS_DIR, os.path.basename(url))
+        r = req_lib.get(url, headers=HEADERS, timeout=60)
+        r.raise_for_status()
+        with open(path + '.tmp', 'wb') as f:
+            f.write(r.content)
+        os.replace(path + '.tmp', path)
+        print(f"  ✓ {exchange}: {len(r.content) // 1024} KB → {path}")
+
+
+if __name__ == '__main__':
+    if '--download' in sys.argv:
+        download_instruments()
+    load_instruments(force=True)
+    print(json.dumps(instruments_status(), indent=2))
@@ -0,0 +1,188 @@
+"""
+BHARAT TERMINAL — Job Scheduler
+All background work runs off one timer thread and a small worker pool. Jobs
+sit in a heap keyed by their due time; the timer sleeps until exactly the
+earliest one (or until a new job is added), hands it to a worker, and goes
+back to sleep — no polling, no wake-ups while the market is shut.
+
+A job is one of:
+  • interval  — every N seconds, fixed-rate (runs do not drift), plus up to
+                JOB_JITTER × N of random delay so jobs do not fire in lockstep
+  • dynamic   — fn returns the seconds until its next run
+  • calendar  — at(now) returns the next datetime to run (market open, close…)
+
+Interval and dynamic jobs can be tied to the market calendar: session='open'
+runs them only during the continuous session, 'extended' from pre-open. A
+due time outside the window moves to the start of the next one, so the first
+run of the day lands exactly on the open.
+
+A job never overlaps itself: the next run is planned when the current one
+finishes, and interval slots that passed while it ran are counted as skipped.
+"""
+
+import time
+import heapq
+import random
+import itertools
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import JOB_WORKERS, JOB_JITTER
+from .market_calendar import IST, next_window
+
+
+class Job:
+    def __init__(self, name, fn, every=None, at=None, session=None, jitter=JOB_JITTER):
+        self.name = name
+        self.fn = fn
+        self.every = every          # seconds (interval jobs; fallback for dynamic ones)
+        self.at = at                # callable(now: datetime) → next run datetime, or None
+        self.session = session      # None | 'open' | 'extended'
+        self.jitter = jitter
+        self.anchor = None          # un-jittered slot the pending run belongs to
+        self.due = None
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_run = None
+        self.last_error = None
+        self.last_duration = None
+        self.last_lag = None
+        self.max_lag = 0.0
+
+
+_cond = threading.Condition()
+_heap = []                  # (due epoch seconds, seq, job name)
+_jobs = {}
+_seq = itertools.count()
+_runner = {'thread': None, 'pool': None}
+
+
+# ═══════════════════════════════════════════
+#  PLANNING
+# ═══════════════════════════════════════════
+
+def _gate(job, ts):
+    """Earliest time ≥ ts inside the job's trading window (None = no session ahead)"""
+    if not job.session:
+        return ts
+    window = next_window(datetime.fromtimestamp(ts, IST), pre_open=job.session == 'extended')
+    if window is None:
+        return None
+    return max(ts, window[0].timestamp())
+
+
+def _plan(job, base, jitter=True):
+    """Set job.anchor / job.due for the next run at or after `base` and queue it"""
+    if job.at:
+        when = job.at(datetime.fromtimestamp(base, IST))
+        anchor = when.timestamp() if when else None
+    else:
+        anchor = _gate(job, base)
+    job.anchor = anchor
+    job.due = anchor
+    if anchor is not None and jitter and job.every and job.jitter and not job.at:
+        job.due = anchor + random.uniform(0, job.jitter * job.every)
+    if job.due is not None:
+        heapq.heappush(_heap, (job.due, next(_seq), job.name))
+        _cond.notify()
+
+
+def add_job(name, fn, every=None, at=None, session=None, jitter=JOB_JITTER):
+    """Register a job; interval/dynamic jobs first run as soon as their window allows"""
+    job = Job(name, fn, every, at, session, jitter)
+    with _cond:
+        _jobs[name] = job
+        _plan(job, time.time(), jitter=False)
+    return job
+
+
+# ═══════════════════════════════════════════
+#  RUNNING
+# ═══════════════════════════════════════════
+
+def _run(job, due):
+    start = time.time()
+    result, error = None, None
+    try:
+        result = job.fn()
+    except Exception as e:
+        error = e
+        print(f"  ⚠ Job {job.name} failed: {e}")
+    finish = time.time()
+
+    with _cond:
+        job.running = False
+        job.runs += 1
+        job.last_run = datetime.fromtimestamp(start, IST).isoformat(timespec='seconds')
+        job.last_duration = finish - start
+        job.last_lag = max(0.0, start - due)
+        job.max_lag = max(job.max_lag, job.last_lag)
+        if error is not None:
+            job.errors += 1
+            job.last_error = f'{datetime.now(IST).strftime("%H:%M:%S")} {error}'[:200]
+
+        if isinstance(result, (int, float)) and not isinstance(result, bool):
+            _plan(job, finish + result, jitter=False)
+        elif job.every and not job.at:
+            base = job.anchor + job.every
+            if base < finish:  # the run outlasted its interval: drop the missed slots
+                missed = int((finish - base) // job.every) + 1
+                job.skipped += missed
+                base += missed * job.every
+            _plan(job, base)
+        else:
+            _plan(job, finish)
+
+
+def _loop():
+    while True:
+        with _cond:
+            while not _heap or _heap[0][0] > time.time():
+                _cond.wait(_heap[0][0] - time.time() if _heap else None)
+            due, _, name = heapq.heappop(_heap)
+            job = _jobs.get(name)
+            if job is None or job.due != due or job.running:
+                continue  # superseded entry
+            job.running = True
+        try:
+            _runner['pool'].submit(_run, job, due)
+        except RuntimeError:  # interpreter shutting down
+            return
+
+
+def start_scheduler():
+    """Start the timer thread (once); jobs may be added before or after"""
+    with _cond:
+        if _runner['thread'] is not None:
+            return
+        _runner['pool'] = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+        _runner['thread'] = threading.Thread(target=_loop, name='job-scheduler', daemon=True)
+        _runner['thread'].start()
+
+
+def jobs_status():
+    """Per-job cadence, last run duration/lag and next due time"""
+    now = time.time()
+    with _cond:
+        return {
+            name: {
+                'every': job.every,
+                'session': job.session,
+                'running': job.running,
+                'runs': job.runs,
+                'skipped': job.skipped,
+                'errors': job.errors,
+                'last_run': job.last_run,
+                'last_duration_ms': round(job.last_duration * 1000, 1) if job.last_duration is not None else None,
+                'last_lag_ms': round(job.last_lag * 1000, 1) if job.last_lag is not None else None,
+                'max_lag_ms': round(job.max_lag * 1000, 1),
+                'next_run': datetime.fromtimestamp(job.due, IST).isoformat(timespec='seconds')
+                if job.due is not None else None,
+                'next_in': round(max(0.0, job.due - now), 1) if job.due is not None else None,
+                'last_error': job.last_error,
+            }
+            for name, job in sorted(_jobs.items())
+        }
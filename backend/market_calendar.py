@@ -0,0 +1,157 @@
+"""
+BHARAT TERMINAL — Market Calendar
+When is the exchange open? Everything here is in IST (a fixed +05:30
+offset — India has no DST, and this needs no tz database on Windows), not
+the host's local time.
+
+A trading day has a pre-open (MARKET_PRE_OPEN), a continuous session
+(MARKET_OPEN → MARKET_CLOSE), and nothing else. Weekends and NSE_HOLIDAYS
+have no session; SPECIAL_SESSIONS override a date (muhurat trading on Diwali,
+budget days on a weekend). MARKET_CALENDAR_FILE adds to both lists.
+"""
+
+import os
+import json
+from datetime import datetime, date, time as dtime, timedelta, timezone
+from typing import NamedTuple
+
+from .config import (
+    MARKET_PRE_OPEN, MARKET_OPEN, MARKET_CLOSE,
+    NSE_HOLIDAYS, SPECIAL_SESSIONS, MARKET_CALENDAR_FILE,
+)
+
+
+IST = timezone(timedelta(hours=5, minutes=30), 'IST')
+LOOKAHEAD_DAYS = 30  # longest run of closed days searched for the next session
+
+_calendar = {'holidays': None, 'sessions': None}
+
+
+class Session(NamedTuple):
+    day: date
+    pre_open: datetime
+    open: datetime
+    close: datetime
+    label: str           # 'regular', 'Muhurat trading', …
+
+
+def now_ist():
+    return datetime.now(IST)
+
+
+def today_ist():
+    return now_ist().date()
+
+
+def _hhmm(text):
+    return dtime.fromisoformat(text)
+
+
+# ═══════════════════════════════════════════
+#  CALENDAR
+# ═══════════════════════════════════════════
+
+def load_calendar(force=False):
+    """Holidays + special sessions from config, plus MARKET_CALENDAR_FILE if present"""
+    if _calendar['holidays'] is not None and not force:
+        return _calendar
+    holidays = {date.fromisoformat(d): name for d, name in NSE_HOLIDAYS.items()}
+    sessions = {date.fromisoformat(d): tuple(s) for d, s in SPECIAL_SESSIONS.items()}
+    if os.path.exists(MARKET_CALENDAR_FILE):
+        try:
+            with open(MARKET_CALENDAR_FILE) as f:
+                extra = json.load(f)
+            holidays.update({date.fromisoformat(d): name for d, name in extra.get('holidays', {}).items()})
+            sessions.update({date.fromisoformat(d): tuple(s) for d, s in extra.get('sessions', {}).items()})
+        except Exception as e:
+            print(f"  ⚠ {os.path.basename(MARKET_CALENDAR_FILE)} unreadable: {e}")
+    _calendar['holidays'], _calendar['sessions'] = holidays, sessions
+    return _calendar
+
+
+def holiday(day):
+    """Holiday name for `day`, or None"""
+    return load_calendar()['holidays'].get(day)
+
+
+def session_on(day):
+    """The Session traded on `day`, or None when the exchange is shut"""
+    special = load_calendar()['sessions'].get(day)
+    if special:
+        open_t, close_t = _hhmm(special[0]), _hhmm(special[1])
+        label = special[2] if len(special) > 2 else 'special'
+    elif day.weekday() >= 5 or holiday(day):
+        return None
+    else:
+        open_t, close_t, label = _hhmm(MARKET_OPEN), _hhmm(MARKET_CLOSE), 'regular'
+    opens = datetime.combine(day, open_t, IST)
+    pre_open_len = datetime.combine(day, _hhmm(MARKET_OPEN)) - datetime.combine(day, _hhmm(MARKET_PRE_OPEN))
+    return Session(day, opens - pre_open_len, opens, datetime.combine(day, close_t, IST), label)
+
+
+def next_session(at=None):
+    """The session in progress at `at` (pre-open included), else the next one"""
+    at = at or now_ist()
+    day = at.astimezone(IST).date()
+    for _ in range(LOOKAHEAD_DAYS):
+        session = session_on(day)
+        if session and session.close > at:
+            return session
+        day += timedelta(days=1)
+    return None
+
+
+def market_phase(at=None):
+    """'pre-open' | 'open' | 'closed'"""
+    at = at or now_ist()
+    session = next_session(at)
+    if session is None or at < session.pre_open:
+        return 'closed'
+    return 'open' if at >= session.open else 'pre-open'
+
+
+def is_market_open(at=None):
+    return market_phase(at) == 'open'
+
+
+def next_window(at=None, pre_open=False):
+    """(start, end) of the trading window in progress at `at`, else the next
+    one — continuous session only, or from pre-open when `pre_open`"""
+    session = next_session(at)
+    if session is None:
+        return None
+    return (session.pre_open if pre_open else session.open), session.close
+
+
+def next_transition(at=None):
+    """(when, phase) of the next pre-open / open / close boundary"""
+    at = at or now_ist()
+    session = next_session(at)
+    if session is None:
+        return None
+    for when, phase in ((session.pre_open, 'pre-open'), (session.open, 'open'), (session.close, 'closed')):
+        if when > at:
+            return when, phase
+    return None
+
+
+def calendar_status():
+    now = now_ist()
+    session = next_session(now)
+    transition = next_transition(now)
+    upcoming = sorted(d for d in load_calendar()['holidays'] if d >= now.date())[:5]
+    return {
+        'now': now.isoformat(timespec='seconds'),
+        'phase': market_phase(now),
+        'session': {
+            'date': session.day.isoformat(),
+            'pre_open': session.pre_open.isoformat(timespec='minutes'),
+            'open': session.open.isoformat(timespec='minutes'),
+            'close': session.close.isoformat(timespec='minutes'),
+            'label': session.label,
+        } if session else None,
+        'next_transition': {'at': transition[0].isoformat(timespec='minutes'), 'phase': transition[1]}
+        if transition else None,
+        'holiday_today': holiday(now.date()),
+        'upcoming_holidays': [{'date': d.isoformat(), 'name': holiday(d)} for d in upcoming],
+    }
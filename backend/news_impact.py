@@ -0,0 +1,254 @@
+"""
+BHARAT TERMINAL — News Impact
+How did the market take a story? For each archived article, the return of
+every stock it names over NEWS_IMPACT_WINDOWS after publication (5 min,
+30 min, to that session's close), and the same return in excess of
+NEWS_IMPACT_BENCHMARK.
+
+A window starts at the publish time, or at the next open for news that
+breaks outside market hours; its reference price is the last trade at or
+before that moment, so overnight news is measured from the previous close
+(the gap counts). A window ends at its length or the session's close,
+whichever is first. Windows still running are left out (null) and the
+result is cached for PROVISIONAL_TTL; once the session has closed it is
+final and cached for good.
+
+Prices come from tick_store. Every article × symbol × window is looked up
+in one batch: the tick series of all symbols are laid end to end under a
+(symbol << 32 | epoch second) key, so each price is one np.searchsorted
+over a single sorted array — no per-article loop over ticks.
+
+Per source, the market-moving score is the mean absolute excess return of
+the stocks its stories name (NEWS_IMPACT_SCORE_WINDOW), with the share of
+positive/negative stories the stocks actually followed.
+"""
+
+import time
+import bisect
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from .config import NEWS_IMPACT_WINDOWS, NEWS_IMPACT_BENCHMARK, NEWS_IMPACT_SCORE_WINDOW
+from .market_calendar import IST, next_session, today_ist
+from .instruments import resolve
+from . import news_store
+from . import tick_store
+
+
+PROVISIONAL_TTL = 60        # seconds an unfinished result is reused
+RECENT_HOURS = 24           # refresh_impacts(): articles published this recently
+_SYMBOL_SHIFT = 32          # key = symbol column << 32 | epoch second
+
+_lock = threading.Lock()
+_cache = {}                 # article id → (expires epoch or None when final, result)
+_stats = {'batches': 0, 'measured': 0, 'last_batch_s': 0.0}
+
+
+def _ticker(sym):
+    """Trading symbol → the key tick_store records it under"""
+    inst = resolve(sym)
+    return inst.yahoo if inst else f'{sym}.NS'
+
+
+def _pct(value):
+    return None if np.isnan(value) else round(float(value) * 100, 3)
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, IST).isoformat(timespec='seconds')
+
+
+# ═══════════════════════════════════════════
+#  MEASUREMENT (vectorized)
+# ═══════════════════════════════════════════
+
+def _days_needed(first_anchor):
+    """tick_store days covering first_anchor's session, the one before it (the
+    reference price of pre-open news) and today"""
+    first = datetime.fromtimestamp(first_anchor, IST).date().isoformat()
+    past = [d for d in tick_store.sealed_days() if d < today_ist().isoformat()]
+    return len(past) - max(bisect.bisect_left(past, first) - 1, 0) + 1
+
+
+def _load_ticks(symbols, days):
+    """All symbols' series end to end → (sorted keys, prices)"""
+    keys, prices = [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+    for col, sym in enumerate(symbols):
+        ts, px = tick_store.series(_ticker(sym), days)
+        keys.append(ts.astype(np.int64) + (col << _SYMBOL_SHIFT))
+        prices.append(px)
+    return np.concatenate(keys), np.concatenate(prices)
+
+
+def _measure(items, now):
+    """[(published epoch, article)] → {id: result}, all prices in one batch"""
+    names = list(NEWS_IMPACT_WINDOWS)
+    spans = np.array([np.inf if s is None else s for s in NEWS_IMPACT_WINDOWS.values()])
+
+    # Per article: when its windows start and the session they end with
+    sessions, anchors, closes = [], [], []
+    for ts, article in items:
+        session = next_session(datetime.fromtimestamp(ts, IST))
+        sessions.append(session)
+        anchors.append(max(ts, session.open.timestamp()) if session else ts)
+        closes.append(session.close.timestamp() if session else ts)
+    anchors, closes = np.array(anchors, dtype=np.int64), np.array(closes, dtype=np.int64)
+
+    # One query row per (article, affected symbol) plus one for the benchmark
+    columns = {}
+    q_article, q_col, bench_row = [], [], []
+    for i, (_, article) in enumerate(items):
+        if sessions[i] is None:
+            bench_row.append(-1)
+            continue
+        for sym in list(article.get('affected') or ()) + [NEWS_IMPACT_BENCHMARK]:
+            q_article.append(i)
+            q_col.append(columns.setdefault(sym, len(columns)))
+        bench_row.append(len(q_article) - 1)
+    q_article, q_col = np.array(q_article, dtype=np.intp), np.array(q_col, dtype=np.int64)
+
+    returns = np.full((len(q_article), len(names)), np.nan)
+    keys, prices = _load_ticks(list(columns), _days_needed(int(anchors.min()))) if len(q_article) else ([], [])
+    if len(keys):
+        base = q_col << _SYMBOL_SHIFT
+        last = len(keys) - 1
+
+        # Reference: last tick at/before the anchor, else the session's first
+        i0 = np.searchsorted(keys, base + anchors[q_article], side='right') - 1
+        has_before = (i0 >= 0) & (keys[np.clip(i0, 0, last)] >= base)
+        i_after = np.clip(i0 + 1, 0, last)
+        has_after = (i0 < last) & (keys[i_after] >= base) & (keys[i_after] < base + closes[q_article])
+        i0 = np.where(has_before, i0, i_after)
+
+        # Window ends: capped at the close; still running → no value yet
+        ends = np.minimum(anchors[q_article, None] + spans, closes[q_article, None]).astype(np.int64)
+        i1 = np.searchsorted(keys, base[:, None] + ends, side='right') - 1
+        done = (ends <= now) & (i1 >= i0[:, None]) & (has_before | has_after)[:, None]
+        returns = np.where(done, prices[np.clip(i1, 0, last)] / prices[i0][:, None] - 1.0, np.nan)
+
+    results, row = {}, 0
+    for i, (ts, article) in enumerate(items):
+        session = sessions[i]
+        result = {
+            'id': article['id'],
+            'published': article.get('published') or _iso(ts),
+            'impact': article.get('impact'),
+            'session': session.day.isoformat() if session else None,
+            'from': _iso(int(anchors[i])) if session else None,
+            'windows': names,
+            'benchmark': NEWS_IMPACT_BENCHMARK,
+            'benchmark_return': {n: None for n in names},
+            'returns': {},
+            'excess': {},
+            'final': bool(session is None or now >= closes[i]),
+        }
+        if session is not None:
+            bench = returns[bench_row[i]]
+            result['benchmark_return'] = {n: _pct(v) for n, v in zip(names, bench)}
+            for r in range(row, bench_row[i]):
+                sym = article['affected'][r - row]
+                result['returns'][sym] = {n: _pct(v) for n, v in zip(names, returns[r])}
+                result['excess'][sym] = {n: _pct(v) for n, v in zip(names, returns[r] - bench)}
+            row = bench_row[i] + 1
+        results[article['id']] = result
+    return results
+
+
+def _results(items, now=None):
+    """{id: result} for [(published epoch, article)] — cached ones reused, the
+    rest measured together"""
+    now = now or time.time()
+    out, stale = {}, []
+    with _lock:
+        for ts, article in items:
+            entry = _cache.get(article['id'])
+            if entry and (entry[0] is None or entry[0] > now):
+                out[article['id']] = entry[1]
+            else:
+                stale.append((ts, article))
+    if stale:
+        start = time.time()
+        measured = _measure(stale, now)
+        with _lock:
+            for article_id, result in measured.items():
+                _cache[article_id] = (None if result['final'] else now + PROVISIONAL_TTL, result)
+            _stats['batches'] += 1
+            _stats['measured'] += len(measured)
+            _stats['last_batch_s'] = round(time.time() - start, 3)
+        out.update(measured)
+    return out
+
+
+# ═══════════════════════════════════════════
+#  PUBLIC
+# ═══════════════════════════════════════════
+
+def article_impact(article_id):
+    """Price reaction to one archived article, or None for an unknown id"""
+    article = news_store.get_article(article_id)
+    if article is None:
+        return None
+    ts = datetime.fromisoformat(article['published']).timestamp()
+    return _results([(ts, article)])[article_id]
+
+
+def refresh_impacts():
+    """Scheduler job: measure the last RECENT_HOURS of news while the windows run"""
+    items = news_store.articles_since(time.time() - RECENT_HOURS * 3600)
+    _results(items)
+    with _lock:
+        gone = [article_id for article_id in _cache if news_store.get_article(article_id) is None]
+        for article_id in gone:  # aged out of the archive
+            del _cache[article_id]
+    return len(items)
+
+
+def source_scores(window=NEWS_IMPACT_SCORE_WINDOW):
+    """Per news source, over the whole archive: stories with a measured
+    reaction, mean |excess return| of the stocks they name (score, %) and
+    the share of positive/negative calls the stocks followed"""
+    results = _results(news_store.articles_since())
+    col = list(NEWS_IMPACT_WINDOWS).index(window)
+    names = list(NEWS_IMPACT_WINDOWS)
+
+    rows_source, rows_move, rows_signed, rows_call = [], [], [], []
+    for result in results.values():
+        moves = [sym_excess[names[col]] for sym_excess in result['excess'].values()]
+        moves = [m for m in moves if m is not None]
+        if not moves:
+            continue
+        article = news_store.get_article(result['id'])
+        if article is None:
+            continue
+        call = {'positive': 1, 'negative': -1}.get(result['impact'], 0)
+        outlets = {src['source'] for src in article.get('sources') or [article]}
+        for outlet in outlets:
+            rows_source.append(outlet)
+            rows_move.append(np.abs(moves).mean())
+            rows_signed.append(np.mean(moves))
+            rows_call.append(call)
+
+    if not rows_source:
+        return {'window': window, 'benchmark': NEWS_IMPACT_BENCHMARK, 'sources': []}
+    outlets, idx = np.unique(np.array(rows_source), return_inverse=True)
+    move, signed, call = np.array(rows_move), np.array(rows_signed), np.array(rows_call)
+    count = np.bincount(idx, minlength=len(outlets))
+    score = np.bincount(idx, weights=move, minlength=len(outlets)) / count
+    called = np.bincount(idx, weights=(call != 0), minlength=len(outlets))
+    hits = np.bincount(idx, weights=(call != 0) & (np.sign(signed) == call), minlength=len(outlets))
+
+    sources = [{
+        'source': str(outlets[k]),
+        'articles': int(count[k]),
+        'score': round(float(score[k]), 3),
+        'hit_rate': round(float(hits[k] / called[k]), 3) if called[k] else None,
+    } for k in np.argsort(-score, kind='stable')]
+    return {'window': window, 'benchmark': NEWS_IMPACT_BENCHMARK, 'sources': sources}
+
+
+def news_impact_status():
+    with _lock:
+        final = sum(1 for expires, _ in _cache.values() if expires is None)
+        return {'cached': len(_cache), 'final': final, **_stats}
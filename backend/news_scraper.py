@@ -1,183 +1,257 @@
 """
 BHARAT TERMINAL — News Scraper
-RSS feeds + website scraping from ET, Moneycontrol, Livemint.
+RSS feeds + website scraping from ET, Moneycontrol, Livemint. Every feed and
+page is fetched at once on the ingest loop; parsing runs on its thread pool.
+
+Each source has its own deadline (NEWS_SOURCE_TIMEOUT), so a cycle lasts as
+long as the slowest source, capped — a late or failing one keeps its last
+articles. Requests are conditional (If-None-Match / If-Modified-Since); a
+304, or a body whose hash has not changed, reuses the articles parsed last
+time. Validators, hashes and articles persist in NEWS_FEED_STATE_FILE.
+
+Parsed articles go to the archive (news_store), which classifies only the
+ones it has not seen; the newest NEWS_LATEST are published to the cache.
 """
 
+import os
+import json
 import time
+import asyncio
+import hashlib
+import calendar
 import traceback
 from datetime import datetime
+from urllib.parse import urlparse
 
-import requests as req_lib
-from bs4 import BeautifulSoup
-import feedparser
-
-from .config import NEWS_FEEDS, SCRAPE_NEWS_URLS, HEADERS, cache, cache_lock
+from .config import NEWS_FEEDS, SCRAPE_NEWS_URLS, NEWS_SOURCE_TIMEOUT, NEWS_FEED_STATE_FILE, NEWS_LATEST
+from .market_calendar import IST
+from . import snapshot
+from . import news_store
+from . import news_tagger
+from . import ingest
 
 
 def classify_news_impact(title, summary=''):
-    """Simple keyword-based sentiment classifier"""
-    text = (title + ' ' + summary).lower()
-    positive_kw = ['surge', 'jump', 'rally', 'gain', 'rise', 'soar', 'boom', 'bullish',
-                   'record', 'high', 'profit', 'growth', 'upgrade', 'beat', 'strong',
-                   'inflow', 'optimis', 'positive', 'bull run']
-    negative_kw = ['crash', 'fall', 'drop', 'slump', 'plunge', 'decline', 'loss', 'bearish',
-                   'low', 'cut', 'downgrade', 'miss', 'weak', 'outflow', 'recession',
-                   'fear', 'warning', 'negative', 'sell-off', 'selloff']
-
-    pos = sum(1 for kw in positive_kw if kw in text)
-    neg = sum(1 for kw in negative_kw if kw in text)
-
-    if pos > neg:
-        return 'positive'
-    elif neg > pos:
-        return 'negative'
-    return 'neutral'
+    """'positive' / 'negative' / 'neutral' from sentiment keywords"""
+    return news_tagger.tag(title, summary).impact
 
 
 def classify_news_category(title, summary='', source_cat='Economy'):
     """Categorize news into Economy/Earnings/Policy/Global/Sector"""
-    text = (title + ' ' + summary).lower()
-    if any(kw in text for kw in ['earnings', 'quarter', 'profit', 'revenue', 'result', 'q1', 'q2', 'q3', 'q4', 'fy']):
-        return 'Earnings'
-    if any(kw in text for kw in ['rbi', 'sebi', 'policy', 'regulation', 'tax', 'government', 'budget', 'reform']):
-        return 'Policy'
-    if any(kw in text for kw in ['global', 'us ', 'china', 'fed ', 'dollar', 'world', 'international', 'europe']):
-        return 'Global'
-    if any(kw in text for kw in ['sector', 'industry', 'auto', 'pharma', 'bank', 'it ', 'fmcg', 'metal', 'oil', 'energy']):
-        return 'Sector'
-    return source_cat
+    return news_tagger.tag(title, summary).category or source_cat
 
 
 def detect_affected_stocks(title, summary=''):
-    """Detect which stock symbols are mentioned in the news"""
-    text = (title + ' ' + summary).upper()
-    known = ['RELIANCE', 'TCS', 'HDFCBANK', 'ICICIBANK', 'INFY', 'INFOSYS', 'ITC',
-             'MARUTI', 'SUNPHARMA', 'TATAMOTORS', 'TATA MOTORS', 'BAJFINANCE',
-             'WIPRO', 'AXISBANK', 'AXIS BANK', 'LT', 'L&T', 'TITAN', 'ADANI',
-             'ONGC', 'NTPC', 'BHARTI AIRTEL', 'BHARTIARTL', 'SBIN', 'SBI',
-             'ZOMATO', 'PAYTM', 'HAL', 'HDFC', 'KOTAK', 'NIFTY', 'SENSEX']
-    affected = []
-    for sym in known:
-        if sym in text:
-            mapped = sym.replace('INFOSYS', 'INFY').replace('TATA MOTORS', 'TATAMOTORS')
-            mapped = mapped.replace('AXIS BANK', 'AXISBANK').replace('L&T', 'LT')
-            mapped = mapped.replace('BHARTI AIRTEL', 'BHARTIARTL').replace('SBI', 'SBIN')
-            mapped = mapped.replace('HDFC', 'HDFCBANK').replace('KOTAK', 'KOTAKBANK')
-            if mapped not in affected and mapped not in ['NIFTY', 'SENSEX', 'ADANI']:
-                affected.append(mapped)
-    return affected[:5]
-
-
-def scrape_rss_news():
-    """Scrape news from RSS feeds"""
+    """Trading symbols of every company the news mentions"""
+    return news_tagger.tag(title, summary).affected
+
+
+_feed_state = {}            # url → {'etag', 'last_modified', 'hash', 'articles'}
+_feed_log = {}              # url → outcome of its last fetch
+_state = {'loaded': False, 'dirty': False, 'published': False}
+
+
+async def _news_get(url, **kwargs):
+    """GET through the per-host 'news:<host>' source (rate limit + breaker)"""
+    return await ingest.get(f'news:{urlparse(url).netloc}', url, **kwargs)
+
+
+# ═══════════════════════════════════════════
+#  FEED STATE (validators + last articles)
+# ═══════════════════════════════════════════
+
+def _load_feed_state():
+    if _state['loaded']:
+        return
+    _state['loaded'] = True
+    try:
+        with open(NEWS_FEED_STATE_FILE) as f:
+            _feed_state.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"  ⚠ {os.path.basename(NEWS_FEED_STATE_FILE)} unreadable: {e}")
+
+
+def _save_feed_state():
+    if not _state['dirty']:
+        return
+    tmp = NEWS_FEED_STATE_FILE + '.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(_feed_state, f)
+        os.replace(tmp, NEWS_FEED_STATE_FILE)
+        _state['dirty'] = False
+    except OSError as e:
+        print(f"  ⚠ News feed state not saved: {e}")
+
+
+def _conditional_headers(cached):
+    headers = {}
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached and cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+
+def _parse_feed(feed_info, content):
+    """RSS/Atom bytes → articles (CPU-bound: runs off the ingest loop)"""
+    import feedparser
+    from bs4 import BeautifulSoup
+
     articles = []
-    for feed_info in NEWS_FEEDS:
-        try:
-            feed = feedparser.parse(feed_info['url'])
-            for entry in feed.entries[:5]:
-                title = entry.get('title', '').strip()
-                summary = BeautifulSoup(entry.get('summary', ''), 'html.parser').get_text()[:300].strip()
-                link = entry.get('link', '')
-
-                try:
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        dt = datetime(*entry.published_parsed[:6])
-                        time_str = dt.strftime('%I:%M %p')
-                    else:
-                        time_str = datetime.now().strftime('%I:%M %p')
-                except:
-                    time_str = datetime.now().strftime('%I:%M %p')
-
-                cat = classify_news_category(title, summary, feed_info['cat'])
-                impact = classify_news_impact(title, summary)
-                affected = detect_affected_stocks(title, summary)
-
-                articles.append({
-                    'title': title,
-                    'summary': summary,
-                    'cat': cat,
-                    'impact': impact,
-                    'time': time_str,
-                    'source': feed_info['source'],
-                    'affected': affected,
-                    'link': link,
-                })
-        except Exception as e:
-            print(f"  ⚠ RSS error ({feed_info['source']}): {e}")
+    feed = feedparser.parse(content)
+    for entry in feed.entries[:5]:
+        title = entry.get('title', '').strip()
+        summary = BeautifulSoup(entry.get('summary', ''), 'html.parser').get_text()[:300].strip()
+        link = entry.get('link', '')
 
+        try:
+            if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                ts = calendar.timegm(entry.published_parsed)  # feedparser gives UTC
+            else:
+                ts = time.time()
+        except:
+            ts = time.time()
+
+        articles.append({
+            'title': title,
+            'summary': summary,
+            'cat': feed_info['cat'],
+            'time': datetime.fromtimestamp(ts, IST).strftime('%I:%M %p'),
+            'ts': ts,
+            'source': feed_info['source'],
+            'link': link,
+        })
     return articles
 
 
-def scrape_website_news():
-    """Scrape news by parsing HTML from financial websites"""
+def _parse_site(site, html):
+    """Headline links on a news page → articles (CPU-bound)"""
+    from bs4 import BeautifulSoup
+
     articles = []
-    for site in SCRAPE_NEWS_URLS:
-        try:
-            r = req_lib.get(site['url'], headers=HEADERS, timeout=10)
-            if r.status_code != 200:
-                continue
-
-            soup = BeautifulSoup(r.text, 'lxml')
-            links = soup.select(site['selector'])[:8]
-
-            for link in links:
-                title = link.get_text().strip()
-                href = link.get('href', '')
-                if not title or len(title) < 20:
-                    continue
-                if href and not href.startswith('http'):
-                    base = site['url'].split('/')[0] + '//' + site['url'].split('/')[2]
-                    href = base + href
-
-                cat = classify_news_category(title, '', site['cat'])
-                impact = classify_news_impact(title)
-                affected = detect_affected_stocks(title)
-
-                articles.append({
-                    'title': title,
-                    'summary': '',
-                    'cat': cat,
-                    'impact': impact,
-                    'time': datetime.now().strftime('%I:%M %p'),
-                    'source': site['source'],
-                    'affected': affected,
-                    'link': href,
-                })
-        except Exception as e:
-            print(f"  ⚠ Scrape error ({site['source']}): {e}")
+    soup = BeautifulSoup(html, 'lxml')  # bytes: bs4 detects the encoding
+    links = soup.select(site['selector'])[:8]
+
+    for link in links:
+        title = link.get_text().strip()
+        href = link.get('href', '')
+        if not title or len(title) < 20:
+            continue
+        if href and not href.startswith('http'):
+            base = site['url'].split('/')[0] + '//' + site['url'].split('/')[2]
+            href = base + href
+
+        articles.append({
+            'title': title,
+            'summary': '',
+            'cat': site['cat'],
+            'time': datetime.now(IST).strftime('%I:%M %p'),
+            'ts': time.time(),
+            'source': site['source'],
+            'link': href,
+        })
+    return articles
+
 
+def _enrich(article):
+    """Category, impact and affected stocks in one tagging pass (once per new
+    article — news_store)"""
+    tags = news_tagger.tag(article['title'], article['summary'])
+    return {**article, 'cat': tags.category or article['cat'], 'impact': tags.impact, 'affected': tags.affected}
+
+
+async def _refresh(info, parse, cached):
+    """Conditional GET; parse only a changed body → (outcome, articles)"""
+    r = await _news_get(info['url'], headers=_conditional_headers(cached))
+    if r.status_code == 304 and cached:
+        return 'not-modified', cached['articles']
+    if r.status_code != 200:
+        return f'http {r.status_code}', cached['articles'] if cached else []
+
+    digest = hashlib.blake2b(r.content, digest_size=16).hexdigest()
+    if cached and cached['hash'] == digest:
+        outcome, articles = 'unchanged', cached['articles']
+    else:
+        outcome, articles = 'parsed', await ingest.in_thread(parse, info, r.content)
+    _feed_state[info['url']] = {
+        'etag': r.headers.get('etag'),
+        'last_modified': r.headers.get('last-modified'),
+        'hash': digest,
+        'articles': articles,
+    }
+    _state['dirty'] = True
+    return outcome, articles
+
+
+async def _fetch_source(info, parse, kind):
+    """One feed/page within its deadline; on timeout or error its last articles"""
+    cached = _feed_state.get(info['url'])
+    start = time.perf_counter()
+    try:
+        outcome, articles = await asyncio.wait_for(
+            _refresh(info, parse, cached), info.get('timeout', NEWS_SOURCE_TIMEOUT))
+    except asyncio.TimeoutError:
+        outcome, articles = 'timeout', cached['articles'] if cached else []
+    except Exception as e:
+        print(f"  ⚠ {kind} error ({info['source']}): {e}")
+        outcome, articles = 'error', cached['articles'] if cached else []
+    _feed_log[info['url']] = {
+        'source': info['source'],
+        'kind': kind,
+        'outcome': outcome,
+        'ms': round((time.perf_counter() - start) * 1000),
+        'articles': len(articles),
+        'at': datetime.now().isoformat(timespec='seconds'),
+    }
     return articles
 
 
+async def scrape_rss_news():
+    """Scrape news from RSS feeds (all feeds at once)"""
+    parts = await asyncio.gather(*(_fetch_source(feed, _parse_feed, 'RSS') for feed in NEWS_FEEDS))
+    return [article for part in parts for article in part]
+
+
+async def scrape_website_news():
+    """Scrape news by parsing HTML from financial websites (all sites at once)"""
+    parts = await asyncio.gather(*(_fetch_source(site, _parse_site, 'Scrape') for site in SCRAPE_NEWS_URLS))
+    return [article for part in parts for article in part]
+
+
+async def _scrape_all():
+    return await asyncio.gather(scrape_rss_news(), scrape_website_news())
+
+
 def fetch_news_data():
     """Fetch all news from RSS feeds and websites"""
     print(f"[{datetime.now().strftime('%H:%M:%S')}] 📰 Scraping news headlines...")
     start = time.time()
 
     try:
-        rss_news = scrape_rss_news()
-        web_news = scrape_website_news()
-        all_news = rss_news + web_news
-
-        # Deduplicate by title
-        seen_titles = set()
-        unique_news = []
-        for article in all_news:
-            key = article['title'][:60].lower()
-            if key not in seen_titles:
-                seen_titles.add(key)
-                unique_news.append(article)
-
-        for i, n in enumerate(unique_news):
-            n['id'] = i + 1
-
-        with cache_lock:
-            cache['news'] = unique_news[:30]
-            cache['last_news_update'] = datetime.now().isoformat()
+        _load_feed_state()
+        rss_news, web_news = ingest.run(_scrape_all())
+        _save_feed_state()
+
+        # Only unseen headlines are classified and stored; ids are stable
+        added = news_store.add_articles(rss_news + web_news, _enrich)
+        if added or not _state['published']:
+            snapshot.publish(news=news_store.latest(NEWS_LATEST), last_news_update=datetime.now().isoformat())
+            _state['published'] = True
 
         elapsed = time.time() - start
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ Got {len(unique_news)} unique news articles in {elapsed:.1f}s")
+        parsed = sum(1 for log in _feed_log.values() if log['outcome'] == 'parsed')
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ {added} new or updated stories in {elapsed:.1f}s "
+              f"({parsed}/{len(_feed_log)} sources changed)")
 
     except Exception as e:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ News fetch error: {e}")
         traceback.print_exc()
+
+
+def news_feed_status():
+    """Last fetch of every feed/page: outcome (parsed / unchanged / not-modified /
+    timeout / error / http N), duration and article count"""
+    return {url: dict(log) for url, log in sorted(_feed_log.items())}
@@ -0,0 +1,338 @@
+"""
+BHARAT TERMINAL — News Archive
+Every article seen in the last NEWS_RETENTION_DAYS, in SQLite
+(NEWS_ARCHIVE_DB) and mirrored in memory. An article is keyed by a hash of
+its normalized headline: one already archived is not enriched again
+(category, impact, affected stocks) and keeps its id — the table's rowid —
+across cycles and restarts. A cycle that brings nothing new costs one dict
+lookup per headline.
+
+An inverted index over headlines, summaries and affected symbols backs
+/api/news/search:
+  • query words are AND-ed; the last one also matches as a prefix, so
+    partial words work while typing
+  • score = Σ idf × term weight (headline words count TITLE_WEIGHT times),
+    halved every SEARCH_HALF_LIFE_H hours of age
+  • ?symbol= and ?since= narrow the candidates before scoring
+
+A headline that is new but nearly the same as a story from the last
+NEWS_DUP_WINDOW_HOURS (news_dedup: SimHash + LSH) is not a new article: it
+is appended to that story's `sources`, its headline becomes one more key
+of the story, and its words are indexed for search.
+"""
+
+import re
+import json
+import math
+import time
+import heapq
+import bisect
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+from .config import NEWS_ARCHIVE_DB, NEWS_RETENTION_DAYS
+from .market_calendar import IST
+from .news_dedup import NearDupIndex, fingerprint, headline_words
+
+
+SEARCH_DEFAULT_RESULTS = 20
+SEARCH_MAX_RESULTS = 100
+SEARCH_HALF_LIFE_H = 48
+TITLE_WEIGHT = 2
+PREFIX_TERMS = 50           # vocabulary terms a trailing prefix expands to
+
+_WORD_RE = re.compile(r'[a-z0-9&]+')
+_SINCE_RE = re.compile(r'^(\d+)([mhd])$')
+_SINCE_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+_STOPWORDS = {'a', 'an', 'the', 'of', 'to', 'in', 'on', 'for', 'and', 'or', 'at', 'by',
+              'is', 'as', 'with', 'from', 'its', 'it', 'be', 'are', 'was'}
+
+_lock = threading.Lock()
+_state = {'conn': None, 'vocab': None, 'merged': 0}  # vocab: sorted index terms, rebuilt after changes
+_articles = {}              # id → article dict (never mutated once stored)
+_order = []                 # (published epoch, id), ascending
+_by_key = {}                # content key → id
+_ts = {}                    # id → published epoch
+_terms = {}                 # id → {term: weight}
+_postings = {}              # term → {id: weight}
+_by_symbol = {}             # symbol → {id}
+_dups = NearDupIndex()      # fingerprints of the recent stories
+
+
+def content_key(title):
+    """Stable key of a headline (case, punctuation and spacing ignored)"""
+    normalized = ' '.join(_WORD_RE.findall(title.lower()))
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+
+def _words(text):
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _cutoff():
+    return time.time() - NEWS_RETENTION_DAYS * 86400
+
+
+# ═══════════════════════════════════════════
+#  INDEX
+# ═══════════════════════════════════════════
+
+def _keys(article):
+    """Content keys of a story: its headline and every near-duplicate's"""
+    return {content_key(article['title'])} | {content_key(src['title']) for src in article.get('sources', ())}
+
+
+def _index(article_id, ts, article):
+    weights = {}
+    for word in _words(article['title']):
+        weights[word] = weights.get(word, 0) + TITLE_WEIGHT
+    for src in article.get('sources', ())[1:]:
+        for word in _words(src['title']):
+            weights.setdefault(word, 1)
+    for word in _words(article.get('summary', '')):
+        weights[word] = weights.get(word, 0) + 1
+    for sym in article.get('affected', ()):
+        weights[sym.lower()] = weights.get(sym.lower(), 0) + TITLE_WEIGHT
+        _by_symbol.setdefault(sym, set()).add(article_id)
+    for term, weight in weights.items():
+        _postings.setdefault(term, {})[article_id] = weight
+
+    _articles[article_id] = article
+    for key in _keys(article):
+        _by_key[key] = article_id
+    _ts[article_id] = ts
+    _terms[article_id] = weights
+    bisect.insort(_order, (ts, article_id))
+    _state['vocab'] = None
+
+
+def _unindex(article_id):
+    article = _articles.pop(article_id)
+    for key in _keys(article):
+        _by_key.pop(key, None)
+    _ts.pop(article_id)
+    for term in _terms.pop(article_id):
+        postings = _postings[term]
+        postings.pop(article_id, None)
+        if not postings:
+            del _postings[term]
+    for sym in article.get('affected', ()):
+        ids = _by_symbol.get(sym)
+        if ids is not None:
+            ids.discard(article_id)
+            if not ids:
+                del _by_symbol[sym]
+    _state['vocab'] = None
+
+
+def _prune():
+    """Drop articles past NEWS_RETENTION_DAYS from memory and disk"""
+    cutoff = _cutoff()
+    i = bisect.bisect_left(_order, (cutoff,))
+    if not i:
+        return
+    for _, article_id in _order[:i]:
+        _unindex(article_id)
+        _dups.remove(article_id)
+    del _order[:i]
+    with _state['conn']:
+        _state['conn'].execute('DELETE FROM articles WHERE ts < ?', (cutoff,))
+
+
+def _open():
+    """Connect and load the archive into memory (once)"""
+    if _state['conn'] is not None:
+        return
+    conn = sqlite3.connect(NEWS_ARCHIVE_DB, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS articles ('
+        ' id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, ts REAL NOT NULL, data TEXT NOT NULL)'
+    )
+    with conn:
+        conn.execute('DELETE FROM articles WHERE ts < ?', (_cutoff(),))
+    for article_id, ts, data in conn.execute('SELECT id, ts, data FROM articles ORDER BY id'):
+        _index(article_id, ts, {**json.loads(data), 'id': article_id})
+    recent = bisect.bisect_left(_order, (time.time() - _dups.window,))
+    for ts, article_id in _order[recent:]:
+        article = _articles[article_id]
+        _dups.add(article_id, fingerprint(article['title'], article.get('summary', '')), ts,
+                  headline_words(article['title']))
+    _state['conn'] = conn
+
+
+def _source(raw):
+    return {'source': raw.get('source', ''), 'link': raw.get('link', ''), 'title': raw['title']}
+
+
+def _merge(article_id, raw):
+    """Fold a near-duplicate into an archived story (a new dict: stored ones are never mutated)"""
+    old = _articles[article_id]
+    article = {**old, 'sources': list(old.get('sources') or [_source(old)]) + [_source(raw)]}
+    _state['conn'].execute('UPDATE articles SET data = ? WHERE id = ?',
+                           (json.dumps({k: v for k, v in article.items() if k != 'id'}), article_id))
+    ts = _ts[article_id]
+    _unindex(article_id)
+    del _order[bisect.bisect_left(_order, (ts, article_id))]
+    _index(article_id, ts, article)
+    _state['merged'] += 1
+
+
+# ═══════════════════════════════════════════
+#  WRITE / READ
+# ═══════════════════════════════════════════
+
+def add_articles(raw_articles, enrich):
+    """Archive the articles not seen before — each new story passed through
+    enrich(raw) once, each near-duplicate folded into its story → number of
+    stories added or given a new source. raw['ts'] is its publish time
+    (epoch seconds)."""
+    now = time.time()
+    cutoff = _cutoff()
+    with _lock:
+        _open()
+        fresh = {}
+        for raw in raw_articles:
+            if not raw.get('title'):
+                continue
+            key = content_key(raw['title'])
+            if key in _by_key or key in fresh:
+                continue
+            ts = min(raw.get('ts') or now, now)
+            if ts < cutoff:
+                continue
+            fresh[key] = (ts, raw)
+        _dups.expire(now)
+        changed = set()
+        with _state['conn']:  # one transaction
+            for key, (ts, raw) in fresh.items():
+                fp, words = fingerprint(raw['title'], raw.get('summary', '')), headline_words(raw['title'])
+                dup = _dups.find(fp, ts, words)
+                if dup is not None:
+                    if any(src['link'] == raw.get('link') for src in _articles[dup].get('sources', ())):
+                        _by_key[key] = dup  # same page, headline edited
+                    else:
+                        _merge(dup, raw)
+                        changed.add(dup)
+                    continue
+                article = enrich({k: v for k, v in raw.items() if k != 'ts'})
+                article['published'] = datetime.fromtimestamp(ts, IST).isoformat(timespec='seconds')
+                article['sources'] = [_source(raw)]
+                cur = _state['conn'].execute(
+                    'INSERT INTO articles (key, ts, data) VALUES (?, ?, ?)', (key, ts, json.dumps(article)))
+                article['id'] = cur.lastrowid
+                _index(article['id'], ts, article)
+                _dups.add(article['id'], fp, ts, words)  # later articles in this batch can fold into it
+                changed.add(article['id'])
+        _prune()
+        return len(changed)
+
+
+def latest(n):
+    """The n most recently published articles, newest first"""
+    with _lock:
+        _open()
+        return [_articles[article_id] for _, article_id in reversed(_order[-n:])]
+
+
+def get_article(article_id):
+    with _lock:
+        _open()
+        return _articles.get(article_id)
+
+
+def articles_since(since=None):
+    """[(published epoch, article)] oldest first, optionally only ts >= since"""
+    with _lock:
+        _open()
+        start = bisect.bisect_left(_order, (since,)) if since is not None else 0
+        return [(ts, _articles[article_id]) for ts, article_id in _order[start:]]
+
+
+def parse_since(text):
+    """'30m' / '6h' / '2d' ago, or an ISO date/datetime (IST if naive) → epoch seconds"""
+    text = (text or '').strip()
+    m = _SINCE_RE.match(text)
+    if m:
+        return time.time() - int(m.group(1)) * _SINCE_UNITS[m.group(2)]
+    when = datetime.fromisoformat(text)  # ValueError for anything else
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=IST)
+    return when.timestamp()
+
+
+def _prefix_terms(prefix):
+    vocab = _state['vocab']
+    if vocab is None:
+        vocab = _state['vocab'] = sorted(_postings)
+    i = bisect.bisect_left(vocab, prefix)
+    out = []
+    while i < len(vocab) and vocab[i].startswith(prefix) and len(out) < PREFIX_TERMS:
+        out.append(vocab[i])
+        i += 1
+    return out
+
+
+def search(q='', symbol=None, since=None, limit=SEARCH_DEFAULT_RESULTS):
+    """Ranked archive matches → {'total', 'results'}; since is epoch seconds"""
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+    words = _words(q)
+    now = time.time()
+    with _lock:
+        _open()
+        total_docs = len(_articles) or 1
+
+        # one {id: weight} map per query word; the last word also matches as a prefix
+        word_maps = []
+        for i, word in enumerate(words):
+            if i == len(words) - 1:
+                merged = {}
+                for term in _prefix_terms(word):
+                    for article_id, weight in _postings[term].items():
+                        merged[article_id] = max(merged.get(article_id, 0), weight)
+                word_maps.append(merged)
+            else:
+                word_maps.append(_postings.get(word, {}))
+
+        if symbol:
+            candidates = set(_by_symbol.get(symbol.upper().split('.')[0], ()))
+        elif word_maps:
+            candidates = set(min(word_maps, key=len))
+        else:
+            candidates = set(_articles)
+        for m in sorted(word_maps, key=len):
+            candidates.intersection_update(m)
+            if not candidates:
+                break
+        if since is not None:
+            candidates = {article_id for article_id in candidates if _ts[article_id] >= since}
+
+        idf = [math.log(1 + total_docs / len(m)) if m else 0.0 for m in word_maps]
+        scored = []
+        for article_id in candidates:
+            relevance = sum(w * m[article_id] for w, m in zip(idf, word_maps)) if word_maps else 1.0
+            age_h = max(0.0, now - _ts[article_id]) / 3600
+            scored.append((relevance * 0.5 ** (age_h / SEARCH_HALF_LIFE_H), article_id))
+        top = heapq.nlargest(limit, scored)
+        return {
+            'total': len(scored),
+            'results': [{**_articles[article_id], 'score': round(score, 3)} for score, article_id in top],
+        }
+
+
+def news_archive_status():
+    with _lock:
+        _open()
+        oldest = _order[0][0] if _order else None
+        return {
+            'articles': len(_articles),
+            'oldest': datetime.fromtimestamp(oldest, IST).isoformat(timespec='seconds') if oldest else None,
+            'terms': len(_postings),
+            'symbols': len(_by_symbol),
+            'retention_days': NEWS_RETENTION_DAYS,
+            'near_duplicates_merged': _state['merged'],
+            'near_duplicate_index': _dups.status(),
+        }
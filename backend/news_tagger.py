@@ -0,0 +1,249 @@
+"""
+BHARAT TERMINAL — News Tagger
+Sentiment, category and every mentioned company, in one pass over the text.
+
+All keywords and entity names are compiled into one Aho-Corasick automaton
+(a trie with failure links), so the cost of tagging an article grows with
+its length, not with the size of the dictionary — the whole NSE list costs
+the same per character as a dozen keywords.
+
+Matching is on whole words: 'low' does not fire inside 'follow', 'SBI'
+not inside 'SBIN'. A keyword ending in '*' matches as a word prefix
+('surge*' → surges, surged). Patterns written in capitals ('US', 'IT',
+trading symbols) only match capitals; everything else ignores case. Where
+entity names overlap, the longest wins ('SBI Life' → SBILIFE, not SBIN).
+
+Entities come from the instrument master — each NSE share's trading symbol
+and company name (with 'Ltd', 'Industries'… removed) — plus
+NEWS_ENTITY_ALIASES. A name two companies would share is left out.
+"""
+
+import re
+import time
+import threading
+from typing import NamedTuple
+
+from .config import NEWS_ENTITY_ALIASES
+from .instruments import all_instruments
+
+
+POSITIVE_WORDS = [
+    'surge*', 'jump*', 'rally', 'rallies', 'rallied', 'gain*', 'rise', 'rises', 'rising', 'rose',
+    'soar*', 'boom*', 'bullish', 'record', 'high', 'highs', 'higher', 'profit*', 'growth',
+    'upgrade*', 'beat', 'beats', 'strong*', 'inflow*', 'optimis*', 'positive', 'bull run',
+]
+NEGATIVE_WORDS = [
+    'crash*', 'fall', 'falls', 'fell', 'falling', 'drop*', 'slump*', 'plunge*', 'plunging',
+    'decline*', 'declining', 'loss', 'losses', 'bearish', 'low', 'lows', 'lower', 'cut', 'cuts',
+    'downgrade*', 'miss', 'misses', 'missed', 'weak*', 'outflow*', 'recession*', 'fear*',
+    'warning*', 'negative', 'sell-off', 'selloff', 'sell off',
+]
+# First category with a match wins; none → the feed's own category
+CATEGORY_WORDS = [
+    ('Earnings', ['earning*', 'quarter*', 'profit*', 'revenue*', 'result*', 'q1*', 'q2*', 'q3*', 'q4*', 'fy*']),
+    ('Policy', ['RBI', 'SEBI', 'policy', 'policies', 'regulat*', 'tax*', 'government', 'govt', 'budget*',
+                'reform*', 'GST']),
+    ('Global', ['global*', 'US', 'U.S.', 'china', 'chinese', 'fed', 'federal reserve', 'dollar', 'world',
+                'international', 'europe*', 'wall street']),
+    ('Sector', ['sector*', 'industry', 'industries', 'auto', 'autos', 'pharma', 'bank', 'banks', 'banking',
+                'IT', 'FMCG', 'metal*', 'oil', 'energy']),
+]
+
+# Trailing words dropped from company names ('RELIANCE INDUSTRIES LTD' → 'reliance')
+_NAME_SUFFIXES = {'ltd', 'ltd.', 'limited', 'l', 'co', 'co.', 'company', 'corp', 'corporation', 'inc',
+                  'ind', 'inds', 'industries', 'india', '(india)', '(i)', 'pvt', 'private', 'ins', 'insurance'}
+# Single-word names too common in headlines to mean one company
+_COMMON_WORDS = {'india', 'indian', 'bharat', 'national', 'global', 'capital', 'finance', 'financial',
+                 'market', 'markets', 'power', 'energy', 'gold', 'silver', 'steel', 'bank', 'prime',
+                 'future', 'first', 'star', 'city', 'general', 'united', 'standard', 'super', 'modern',
+                 'premier', 'royal', 'shree', 'hindustan', 'oriental', 'international', 'infra', 'tech',
+                 'technologies', 'systems', 'solutions', 'foods', 'metals', 'chemicals', 'agro',
+                 'textiles', 'motors', 'paper', 'sugar', 'cement', 'pharma', 'life', 'home', 'housing',
+                 'oil', 'gas', 'nifty', 'sensex', 'asian', 'tata', 'adani', 'bajaj', 'birla', 'mahindra'}
+# Capitalised words headlines use that are not the share with that symbol
+_NOT_SYMBOLS = {'IPO', 'GDP', 'CPI', 'WPI', 'FII', 'FPI', 'DII', 'RBI', 'SEBI', 'GST', 'US', 'UK', 'EU',
+                'AI', 'EV', 'IT', 'FY', 'MF', 'ETF', 'NSE', 'BSE', 'CEO', 'CFO', 'NIFTY', 'SENSEX'}
+
+_SPACE_RE = re.compile(r'\s+')
+_QUOTES = str.maketrans({'’': "'", '‘': "'"})
+
+_build_lock = threading.Lock()
+_automaton = {'rows': None}
+
+
+class Tags(NamedTuple):
+    impact: str             # 'positive' | 'negative' | 'neutral'
+    category: str           # None when no category keyword matched
+    affected: list          # trading symbols, in order of first mention
+
+
+# ═══════════════════════════════════════════
+#  BUILDING
+# ═══════════════════════════════════════════
+
+def _company_names(name):
+    """Instrument name → the forms a headline may use (full, and without suffixes)"""
+    words = _SPACE_RE.sub(' ', name.lower()).strip().split(' ')
+    while words and words[-1] in ('ltd', 'ltd.', 'limited'):
+        words.pop()
+    full = ' '.join(words)
+    while len(words) > 1 and words[-1] in _NAME_SUFFIXES:
+        words.pop()
+    names = {full, ' '.join(words)}
+    return [n for n in names if n and (' ' in n or (len(n) >= 4 and n not in _COMMON_WORDS))]
+
+
+def _entities(rows):
+    """{pattern: symbol} — symbols, unambiguous company names, then the aliases"""
+    entities, ambiguous = {}, set()
+    for row in rows:
+        if row.kind != 'EQ' or row.exchange != 'NSE':
+            continue
+        if len(row.symbol) >= 2 and row.symbol not in _NOT_SYMBOLS:
+            entities[row.symbol] = row.symbol
+        if row.name == row.symbol:
+            continue
+        for name in _company_names(row.name):
+            if entities.get(name, row.symbol) != row.symbol:
+                ambiguous.add(name)
+            entities[name] = row.symbol
+    for name in ambiguous:
+        del entities[name]
+    for alias, symbol in NEWS_ENTITY_ALIASES.items():
+        entities.pop(alias.lower(), None)  # a derived name spelt like an alias yields to it
+        entities[alias] = symbol
+    return entities
+
+
+def _add(goto, pattern_ids, patterns, text, tag):
+    """Insert one pattern (its text, folded) with a tag; patterns sharing text share an id"""
+    prefix = text.endswith('*')
+    text = text.rstrip('*').translate(_QUOTES)
+    exact = text if text.upper() == text and any(c.isalpha() for c in text) else None
+    key = (text.lower(), prefix, exact)
+    pid = pattern_ids.get(key)
+    if pid is None:
+        node = 0
+        for ch in key[0]:
+            nxt = goto[node].get(ch)
+            if nxt is None:
+                nxt = goto[node][ch] = len(goto)
+                goto.append({})
+            node = nxt
+        pid = pattern_ids[key] = len(patterns)
+        patterns.append((len(key[0]), prefix, exact, node, []))
+    patterns[pid][4].append(tag)
+
+
+def build_tagger():
+    """Compile keywords + entities into the automaton"""
+    global _automaton
+    start = time.time()
+    rows = all_instruments()
+    goto, pattern_ids, patterns = [{}], {}, []
+    for word in POSITIVE_WORDS:
+        _add(goto, pattern_ids, patterns, word, ('impact', 'positive'))
+    for word in NEGATIVE_WORDS:
+        _add(goto, pattern_ids, patterns, word, ('impact', 'negative'))
+    for rank, (category, words) in enumerate(CATEGORY_WORDS):
+        for word in words:
+            _add(goto, pattern_ids, patterns, word, ('category', rank))
+    entities = _entities(rows)
+    for name, symbol in entities.items():
+        _add(goto, pattern_ids, patterns, name, ('entity', symbol))
+
+    # Outputs per node, then failure links breadth-first; each node's outputs
+    # include those of its failure chain, so a match is read off in one step
+    out = [()] * len(goto)
+    for pid, (_, _, _, node, _) in enumerate(patterns):
+        out[node] += (pid,)
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for node in queue:  # grows while iterated: BFS
+        for ch, child in goto[node].items():
+            f = fail[node]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[child] = goto[f].get(ch, 0)
+            out[child] += out[fail[child]]
+            queue.append(child)
+
+    _automaton = {
+        'rows': rows,
+        'goto': goto,
+        'fail': fail,
+        'out': out,
+        'patterns': [(length, prefix, exact, tuple(tags)) for length, prefix, exact, _, tags in patterns],
+    }
+    print(f"  🏷 News tagger: {len(entities)} entity names, {len(patterns)} patterns, "
+          f"{len(goto)} states in {time.time() - start:.2f}s")
+    return len(patterns)
+
+
+def _current():
+    if _automaton['rows'] is not all_instruments():  # first use, or the master was reloaded
+        with _build_lock:
+            if _automaton['rows'] is not all_instruments():
+                build_tagger()
+    return _automaton
+
+
+# ═══════════════════════════════════════════
+#  TAGGING
+# ═══════════════════════════════════════════
+
+def tag(title, summary=''):
+    """One scan of title + summary → Tags(impact, category, affected)"""
+    ac = _current()
+    goto, fail, out, patterns = ac['goto'], ac['fail'], ac['out'], ac['patterns']
+    text = _SPACE_RE.sub(' ', f'{title} {summary}'.translate(_QUOTES))
+    folded = text.lower()
+    if len(folded) != len(text):  # a few characters change length when lowered
+        folded = ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+    n = len(folded)
+
+    hits, entities = set(), []
+    node = 0
+    for i, ch in enumerate(folded):
+        while node and ch not in goto[node]:
+            node = fail[node]
+        node = goto[node].get(ch, 0)
+        for pid in out[node]:
+            length, prefix, exact, tags = patterns[pid]
+            start = i - length + 1
+            if start > 0 and folded[start - 1].isalnum():
+                continue
+            if not prefix and i + 1 < n and folded[i + 1].isalnum():
+                continue
+            if exact is not None and text[start:i + 1] != exact:
+                continue
+            for kind, value in tags:
+                if kind == 'entity':
+                    entities.append((start, -length, value))
+                else:
+                    hits.add((kind, value, pid))
+
+    pos = sum(1 for kind, value, _ in hits if value == 'positive')
+    neg = sum(1 for kind, value, _ in hits if value == 'negative')
+    impact = 'positive' if pos > neg else 'negative' if neg > pos else 'neutral'
+    ranks = [value for kind, value, _ in hits if kind == 'category']
+    category = CATEGORY_WORDS[min(ranks)][0] if ranks else None
+
+    # Overlapping names: leftmost, then longest
+    affected, end = [], -1
+    for start, neg_length, symbol in sorted(entities):
+        if start < end:
+            continue
+        end = start - neg_length
+        if symbol not in affected:
+            affected.append(symbol)
+    return Tags(impact, category, affected)
+
+
+def tagger_status():
+    ac = _automaton
+    return {
+        'built': ac['rows'] is not None,
+        'patterns': len(ac['patterns']) if ac['rows'] is not None else 0,
+        'states': len(ac['goto']) if ac['rows'] is not None else 0,
+    }
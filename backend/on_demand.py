@@ -0,0 +1,152 @@
+"""
+BHARAT TERMINAL — On-Demand Quotes + Hot Set
+/api/quote can ask for any NSE/BSE ticker, not just the configured universe.
+A cold symbol is fetched once — concurrent requests for it join the same
+in-flight fetch (single-flight) instead of each hitting upstream. Symbols
+that resolve join a bounded LRU hot set that the refresh scheduler keeps
+warm; the least recently requested one is evicted (and dropped from the
+snapshot) when the set is full. Symbols upstream does not know are
+remembered for ON_DEMAND_NEGATIVE_TTL so a typo cannot hammer Yahoo.
+Identifiers go through the instrument master first (ISINs, 'BSE:SYM' and
+bare BSE-only symbols resolve too); with instrument dumps on disk, an
+NSE/BSE ticker that is not listed is rejected without any upstream call.
+"""
+
+import re
+import time
+import threading
+import concurrent.futures
+from collections import OrderedDict
+
+from .config import (
+    NIFTY50_SYMBOLS, INDEX_SYMBOLS, COMMODITY_SYMBOLS,
+    HOT_SET_SIZE, ON_DEMAND_TIMEOUT, ON_DEMAND_NEGATIVE_TTL,
+)
+from .stock_data import fetch_on_demand
+from .source_health import is_available
+from .instruments import resolve, is_listed, has_dump
+from . import snapshot
+
+
+_SYMBOL_RE = re.compile(r'^(\^[A-Z0-9.]{1,20}|[A-Z0-9&\-]{1,20}(\.NS|\.BO)|[A-Z0-9]{1,10}=[FX])$')
+_configured = set(NIFTY50_SYMBOLS) | set(INDEX_SYMBOLS.values()) | set(COMMODITY_SYMBOLS)
+
+_lock = threading.Lock()
+_hot = OrderedDict()     # symbol → None, most recently requested last
+_inflight = {}           # symbol → Event set when its fetch finishes
+_negative = {}           # symbol → monotonic time it came back empty
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='on-demand')
+
+
+def normalize(sym):
+    """Client symbol → Yahoo symbol (bare NSE tickers get .NS), or None if
+    malformed or, when the full instrument list is loaded, not listed"""
+    inst = resolve(sym)
+    if inst:
+        return inst.yahoo
+    sym = sym.strip().upper()
+    if not sym:
+        return None
+    if not (sym.startswith('^') or '.' in sym or '=' in sym):
+        sym += '.NS'
+    if not _SYMBOL_RE.match(sym):
+        return None
+    if sym.endswith(('.NS', '.BO')) and has_dump() and not is_listed(sym):
+        return None
+    return sym
+
+
+def hot_symbols():
+    with _lock:
+        return list(_hot)
+
+
+def _touch(sym):
+    """Mark `sym` as just requested; evict the coldest symbol past HOT_SET_SIZE"""
+    _hot[sym] = None
+    _hot.move_to_end(sym)
+    evicted = []
+    while len(_hot) > HOT_SET_SIZE:
+        evicted.append(_hot.popitem(last=False)[0])
+    return evicted
+
+
+def _drop(symbols):
+    if not symbols:
+        return
+    gone = set(symbols)
+    snapshot.update(lambda snap: {
+        'quotes': {s: q for s, q in snap.quotes.items() if s not in gone},
+        'live_prices': {s: p for s, p in snap.live_prices.items() if s not in gone},
+    })
+
+
+def _run(symbols, events):
+    try:
+        results = fetch_on_demand(symbols)
+    except Exception:
+        results = {}
+    evicted = []
+    with _lock:
+        now = time.monotonic()
+        for sym in symbols:
+            if sym in results:
+                evicted += _touch(sym)
+            elif is_available('yahoo'):
+                _negative[sym] = now  # upstream answered, just not for this symbol
+            _inflight.pop(sym, None)
+        if len(_negative) > 4 * HOT_SET_SIZE:
+            for sym in [s for s, t in _negative.items() if now - t >= ON_DEMAND_NEGATIVE_TTL]:
+                del _negative[sym]
+    for event in events:
+        event.set()
+    _drop(evicted)
+
+
+def ensure_quotes(symbols, wait=True):
+    """Make sure every valid requested symbol has a quote in the snapshot.
+    Starts at most one upstream fetch per cold symbol; with `wait`, blocks up
+    to ON_DEMAND_TIMEOUT for them."""
+    snap = snapshot.current()
+    waiting = []
+    cold, cold_events = [], []
+    now = time.monotonic()
+    with _lock:
+        for raw in symbols:
+            sym = normalize(raw)
+            if sym is None or sym in _configured:
+                continue
+            if sym in _hot:
+                _hot.move_to_end(sym)
+                continue
+            if sym in snap.quotes:
+                continue
+            if now - _negative.get(sym, -ON_DEMAND_NEGATIVE_TTL) < ON_DEMAND_NEGATIVE_TTL:
+                continue
+            event = _inflight.get(sym)
+            if event is None:
+                event = _inflight[sym] = threading.Event()
+                cold.append(sym)
+                cold_events.append(event)
+            waiting.append(event)
+
+    if cold:
+        print(f"  🔎 On-demand fetch: {', '.join(cold)}")
+        _executor.submit(_run, cold, cold_events)
+    if wait:
+        deadline = now + ON_DEMAND_TIMEOUT
+        for event in waiting:
+            event.wait(max(0.0, deadline - time.monotonic()))
+    return len(waiting)
+
+
+def hot_set_status():
+    with _lock:
+        now = time.monotonic()
+        return {
+            'size': len(_hot),
+            'capacity': HOT_SET_SIZE,
+            'symbols': list(reversed(_hot)),
+            'in_flight': list(_inflight),
+            'rejected': [s for s, t in _negative.items() if now - t < ON_DEMAND_NEGATIVE_TTL],
+        }
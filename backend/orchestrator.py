@@ -0,0 +1,111 @@
+"""
+BHARAT TERMINAL — Source Orchestrator
+Starts every data-source tier at the same time, merges results by priority
+and returns as soon as every symbol is settled or the cycle deadline hits.
+
+A tier is a dict:
+    {'name': 'groww', 'priority': 0, 'covers': {...}, 'fetch': callable}
+Lower priority number wins. `covers` is the set of symbols the tier can
+return; `fetch()` returns {yahoo_symbol: quote_dict}. A coroutine function
+runs on the ingest loop, anything else on the tier pool. An optional
+'source' names its source_health entry — while that circuit is open the
+tier is not started at all.
+"""
+
+import time
+import inspect
+import threading
+import concurrent.futures
+from datetime import datetime
+
+from .source_health import is_available
+from . import ingest
+
+
+# Long-lived pool for blocking tiers, so one that overruns the deadline never blocks the cycle
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix='tier')
+_in_flight = {}  # tier name → Future still running from an earlier cycle
+_in_flight_lock = threading.Lock()
+
+
+def _is_settled(sym, tiers, finished):
+    """A symbol is settled once no unfinished tier could still beat what we have"""
+    for tier in tiers:  # sorted best → worst
+        name = tier['name']
+        if name in finished:
+            if sym in finished[name]:
+                return True
+        elif sym in tier['covers']:
+            return False
+    return True
+
+
+def _merge(tiers, finished):
+    """Layer tier results worst → best so higher priority wins field by field"""
+    results = {}
+    for tier in reversed(tiers):
+        for sym, data in finished.get(tier['name'], {}).items():
+            results[sym] = {**results.get(sym, {}), **data}
+    return results
+
+
+def run_tiers(tiers, symbols, deadline):
+    """Run all tiers concurrently; return (merged results, per-tier report)"""
+    tiers = sorted(tiers, key=lambda t: t['priority'])
+    start = time.time()
+    report = {}
+    futures = {}
+
+    with _in_flight_lock:
+        for tier in tiers:
+            prev = _in_flight.get(tier['name'])
+            if prev is not None and not prev.done():
+                # Still stuck from last cycle — don't stack another request on it
+                report[tier['name']] = {'status': 'skipped', 'count': 0, 'elapsed': None}
+                continue
+            if tier.get('source') and not is_available(tier['source']):
+                report[tier['name']] = {'status': 'circuit-open', 'count': 0, 'elapsed': None}
+                continue
+            if inspect.iscoroutinefunction(tier['fetch']):
+                f = ingest.submit(tier['fetch']())
+            else:
+                f = _pool.submit(tier['fetch'])
+            _in_flight[tier['name']] = f
+            futures[f] = tier
+
+    finished = {}
+    for name in report:
+        finished[name] = {}
+    pending = set(futures)
+
+    while pending:
+        if all(_is_settled(sym, tiers, finished) for sym in symbols):
+            break
+        remaining = deadline - (time.time() - start)
+        if remaining <= 0:
+            break
+        done, pending = concurrent.futures.wait(
+            pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED)
+        for f in done:
+            tier = futures[f]
+            elapsed = round(time.time() - start, 2)
+            try:
+                data = f.result() or {}
+                finished[tier['name']] = data
+                report[tier['name']] = {'status': 'ok', 'count': len(data), 'elapsed': elapsed}
+            except Exception as e:
+                print(f"  ⚠ {tier['name']} tier error: {e}")
+                finished[tier['name']] = {}
+                report[tier['name']] = {'status': 'error', 'count': 0, 'elapsed': elapsed}
+
+    for f in pending:
+        tier = futures[f]
+        # Not needed (all settled) or missed the deadline — result is discarded
+        timed_out = time.time() - start >= deadline
+        report[tier['name']] = {'status': 'late' if timed_out else 'unneeded', 'count': 0, 'elapsed': None}
+
+    summary = ', '.join(f"{name}={r['status']}" + (f"({r['count']} in {r['elapsed']}s)" if r['status'] == 'ok' else '')
+                        for name, r in report.items())
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🧭 Tiers: {summary}")
+
+    return _merge(tiers, finished), report
@@ -8,7 +8,8 @@ import os
 import json
 from datetime import datetime
 
-from .config import SAVED_CLOSES_FILE, cache, cache_lock
+from .config import SAVED_CLOSES_FILE
+from . import snapshot
 import backend.config as cfg
 
 
@@ -171,8 +172,7 @@ def get_portfolio_with_live_prices():
     total_current = 0
     total_invested = 0
 
-    with cache_lock:
-        quotes = cache.get('quotes', {})
+    quotes = snapshot.current().quotes
 
     for h in holdings:
         sym = h['symbol']
@@ -0,0 +1,64 @@
+"""
+BHARAT TERMINAL — Token Bucket Rate Limiter
+Thread-safe: `rate` tokens per second refill up to `burst`. Callers either
+block for a token (acquire), await one without blocking the event loop
+(acquire_async), or check without waiting (try_acquire).
+"""
+
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """Allow `rate` calls/second on average with bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, n=1):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= n:
+                self.tokens -= n
+                return True
+            return False
+
+    def _take(self, n, deadline):
+        """Take `n` tokens → 0.0, else seconds to wait (None: past the deadline)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= n:
+                self.tokens -= n
+                return 0.0
+            wait = (n - self.tokens) / self.rate
+        if deadline is not None and now + wait > deadline:
+            return None
+        return wait
+
+    def acquire(self, n=1, timeout=None):
+        """Block until `n` tokens are available → False if `timeout` runs out first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(n, deadline)
+            if not wait:
+                return wait == 0.0
+            time.sleep(wait)
+
+    async def acquire_async(self, n=1, timeout=None):
+        """acquire() for coroutines: waits with asyncio.sleep"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(n, deadline)
+            if not wait:
+                return wait == 0.0
+            await asyncio.sleep(wait)
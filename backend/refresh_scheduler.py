@@ -0,0 +1,229 @@
+"""
+BHARAT TERMINAL — Adaptive Refresh Scheduler
+Replaces the flat "refetch everything every 30s". Each symbol carries its
+own interval, recomputed after every refresh:
+
+  base REFRESH_BASE
+  × 0.5   big recent move (EWMA of per-refresh |return| ≥ 0.25%, or |day chg| ≥ 2%)
+  × 0.5   in holdings
+  × 0.5   watched (asked for via /api/quote within REFRESH_INTEREST_TTL, or
+          subscribed on an open /api/stream)
+  × 2     idle (none of the above and barely moving; indices never idle —
+          they are on every page)
+  → REFRESH_MAX when the Upstox feed already streams the symbol
+
+clamped to [REFRESH_MIN, REFRESH_MAX]. If Σ 60/interval exceeds
+REFRESH_BUDGET (symbol-refreshes per minute — a per-tier upper bound on
+upstream requests, since each request carries at least one symbol; see
+config), every interval is stretched by the same factor — those the
+stretch pushes past REFRESH_MAX sit at the cap and the rest stretch further
+to make up for it. If even every symbol at REFRESH_MAX is over budget, the
+overshoot is reported in refresh_status().
+
+Symbols that fall due within REFRESH_COALESCE of each other are fetched
+together. A symbol no tier returned a quote for is not counted as
+refreshed: it is retried after REFRESH_MIN, doubling per miss up to
+REFRESH_MAX. The on-demand hot set (backend/on_demand.py) is scheduled
+alongside the configured universe.
+"""
+
+import time
+import threading
+
+from .config import (
+    INDEX_SYMBOLS, REFRESH_BASE, REFRESH_MIN, REFRESH_MAX, REFRESH_BUDGET, REFRESH_INTEREST_TTL,
+)
+from .stock_data import ALL_SYMBOLS, fetch_stock_data
+from .stream import stream_symbols
+from .upstox_feed import upstox_feed_is_live, upstox_feed_covers
+from .portfolio import load_holdings
+from .on_demand import hot_symbols
+from .source_health import source as health_source
+from . import snapshot
+
+
+REFRESH_COALESCE = 5        # seconds: fetch soon-due symbols along with due ones
+MOVE_EWMA_ALPHA = 0.3
+HOT_MOVE_PCT = 0.25         # EWMA per-refresh |return| (%) that counts as moving
+HOT_DAY_CHANGE_PCT = 2.0
+QUIET_MOVE_PCT = 0.05
+HOLDINGS_TTL = 60
+QUOTE_SOURCES = ('groww', 'upstox', 'yahoo', 'google_finance')  # upstream calls counted against the budget
+
+_lock = threading.Lock()
+_state = {}                 # symbol → {'interval', 'next_due', 'last_fetch', 'last_price', 'move', 'reasons',
+                            #           'misses', 'retry_at'}
+_interest = {}              # symbol → monotonic time of the last /api/quote request
+_holdings = {'at': 0.0, 'symbols': set()}
+_stats = {'refreshes': 0, 'symbols_fetched': 0, 'started': time.monotonic()}
+
+_configured = set(ALL_SYMBOLS)
+_headline = set(INDEX_SYMBOLS.values())
+
+
+def _canonical(sym):
+    for candidate in (sym, f'{sym}.NS'):
+        if candidate in _configured or candidate in _state:
+            return candidate
+    return None
+
+
+def note_interest(symbols):
+    """Record that a client asked for these symbols (cheap; called per request)"""
+    now = time.monotonic()
+    with _lock:  # _reschedule iterates _interest; _canonical reads _state
+        for sym in symbols:
+            sym = _canonical(sym)
+            if sym:
+                _interest[sym] = now
+
+
+def _held_symbols():
+    now = time.monotonic()
+    if now - _holdings['at'] > HOLDINGS_TTL:
+        _holdings['symbols'] = {s for s in (_canonical(h.get('symbol', '')) for h in load_holdings()) if s}
+        _holdings['at'] = now
+    return _holdings['symbols']
+
+
+def _desired_interval(sym, st, held, watched, streamed):
+    if sym in streamed:
+        return REFRESH_MAX, ['streamed']
+
+    q = snapshot.current().quotes.get(sym) or {}
+    day_chg = abs(q.get('regularMarketChangePercent') or 0)
+    interval = REFRESH_BASE
+    reasons = []
+    if st['move'] >= HOT_MOVE_PCT or day_chg >= HOT_DAY_CHANGE_PCT:
+        interval *= 0.5
+        reasons.append('moving')
+    if sym in held:
+        interval *= 0.5
+        reasons.append('held')
+    if sym in watched:
+        interval *= 0.5
+        reasons.append('watched')
+    if not reasons and sym not in _headline and st['move'] < QUIET_MOVE_PCT:
+        interval *= 2
+        reasons.append('idle')
+    return max(REFRESH_MIN, min(REFRESH_MAX, interval)), reasons
+
+
+def _reschedule(now):
+    """Recompute every symbol's interval, then stretch them all to fit the budget"""
+    held = _held_symbols()
+    watched = {s for s, t in _interest.items() if now - t <= REFRESH_INTEREST_TTL} | {
+        s for s in map(_canonical, stream_symbols()) if s
+    }
+    streamed = upstox_feed_covers() if upstox_feed_is_live() else set()
+
+    desired = {}
+    for sym, st in _state.items():
+        desired[sym] = _desired_interval(sym, st, held, watched, streamed)
+
+    stretch = _budget_stretch([interval for interval, _ in desired.values()])
+    for sym, (interval, reasons) in desired.items():
+        st = _state[sym]
+        st['interval'] = min(REFRESH_MAX, interval * stretch)
+        st['reasons'] = reasons + (['budget'] if stretch > 1 else [])
+        if st['last_fetch'] is not None:
+            st['next_due'] = max(st['last_fetch'] + st['interval'], st['retry_at'])
+
+
+def _budget_stretch(intervals):
+    """Factor s with Σ 60 / min(REFRESH_MAX, interval × s) ≤ REFRESH_BUDGET.
+    Capped intervals stop helping, so the uncapped ones take up the slack."""
+    stretch = 1.0
+    for _ in range(len(intervals) + 1):  # each pass caps at least one more symbol, or settles
+        capped = [i for i in intervals if i * stretch >= REFRESH_MAX]
+        free = sum(60.0 / i for i in intervals if i * stretch < REFRESH_MAX)
+        room = REFRESH_BUDGET - 60.0 * len(capped) / REFRESH_MAX
+        if free == 0 or room <= 0:
+            return max(stretch, REFRESH_MAX / min(intervals)) if intervals else stretch
+        needed = max(1.0, free / room)
+        if needed <= stretch:
+            return stretch
+        stretch = needed
+    return stretch
+
+
+def _record(symbols, fetched, now):
+    """Update the symbols a refresh got a quote for; the misses are retried
+    after a backoff (REFRESH_MIN, doubling up to REFRESH_MAX), not counted fresh"""
+    prices = snapshot.current().live_prices
+    for sym in symbols:
+        st = _state.get(sym)
+        if st is None:  # evicted while the fetch ran
+            continue
+        if sym not in fetched:
+            st['misses'] += 1
+            st['retry_at'] = now + min(REFRESH_MAX, REFRESH_MIN * 2 ** (st['misses'] - 1))
+            st['next_due'] = st['retry_at']
+            continue
+        st['misses'] = 0
+        st['retry_at'] = 0.0
+        price = prices.get(sym)
+        if price and st['last_price']:
+            ret = abs(price - st['last_price']) / st['last_price'] * 100
+            st['move'] = MOVE_EWMA_ALPHA * ret + (1 - MOVE_EWMA_ALPHA) * st['move']
+        if price:
+            st['last_price'] = price
+        st['last_fetch'] = now
+
+
+def refresh_due():
+    """Fetch every symbol that is due (plus those due within REFRESH_COALESCE).
+    Returns seconds until the next symbol falls due."""
+    with _lock:
+        now = time.monotonic()
+        universe = ALL_SYMBOLS + hot_symbols()
+        for sym in universe:
+            _state.setdefault(sym, {
+                'interval': REFRESH_BASE, 'next_due': now, 'last_fetch': None,
+                'last_price': None, 'move': 0.0, 'reasons': [], 'misses': 0, 'retry_at': 0.0,
+            })
+        for sym in set(_state) - set(universe):  # evicted from the hot set
+            del _state[sym]
+            _interest.pop(sym, None)
+        due = [s for s, st in _state.items() if st['next_due'] <= now + REFRESH_COALESCE]
+
+    if due:
+        fetched = fetch_stock_data(due) or {}
+        with _lock:
+            now = time.monotonic()
+            _record(due, fetched, now)
+            _reschedule(now)
+            _stats['refreshes'] += 1
+            _stats['symbols_fetched'] += len(fetched.keys() & set(due))
+
+    with _lock:
+        next_due = min(st['next_due'] for st in _state.values())
+    return max(1.0, next_due - time.monotonic())
+
+
+def refresh_status():
+    """Per-symbol cadence + staleness, and overall refresh rate"""
+    now = time.monotonic()
+    with _lock:
+        symbols = {
+            sym: {
+                'interval': round(st['interval'], 1),
+                'next_in': round(max(0.0, st['next_due'] - now), 1),
+                'staleness': round(now - st['last_fetch'], 1) if st['last_fetch'] is not None else None,
+                'move_pct': round(st['move'], 3),
+                'misses': st['misses'],
+                'reasons': st['reasons'],
+            }
+            for sym, st in sorted(_state.items())
+        }
+        minutes = max(1 / 60, (now - _stats['started']) / 60)
+        planned = sum(60.0 / st['interval'] for st in _state.values())
+        return {
+            'budget_per_min': REFRESH_BUDGET,
+            'planned_per_min': round(planned, 1),
+            'over_budget_per_min': round(max(0.0, planned - REFRESH_BUDGET), 1),  # all at REFRESH_MAX
+            'refreshes': _stats['refreshes'],
+            'symbols_fetched_per_min': round(_stats['symbols_fetched'] / minutes, 1),
+            'quote_requests_per_min': round(sum(health_source(s).calls for s in QUOTE_SOURCES) / minutes, 1),
+            'symbols': symbols,
+        }
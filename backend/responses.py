@@ -0,0 +1,156 @@
+"""
+BHARAT TERMINAL — Pre-serialized API Responses
+JSON bodies are rendered once per version of the sections they show (plus
+a gzip copy) and served with an ETag. Requests whose If-None-Match matches
+get an empty 304. ETags carry a per-boot salt: versions restart at 1 after
+a cold start, and an old tag must not match different data.
+/api/quote bodies are assembled by joining pre-rendered per-symbol fragments.
+"""
+
+import gzip
+import json
+import zlib
+import secrets
+import threading
+from types import MappingProxyType
+
+from flask import Response, request
+
+from .config import INDEX_SYMBOLS
+
+
+GZIP_MIN_BYTES = 1024        # smaller bodies aren't worth compressing
+QUOTE_BODY_CACHE_SIZE = 256  # distinct symbol lists remembered per version
+BODY_CACHE_SIZE = 64         # distinct keys (e.g. news categories) kept at once
+
+_BOOT = secrets.token_hex(4)  # ETag salt, new every process
+_bodies = {}  # key → (version, raw, gz)
+_fragments = (None, {}, {})  # (version, symbol → fragment, symbol list → body)
+_fragments_lock = threading.Lock()
+
+
+def _json_default(obj):
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    raise TypeError(f'{type(obj).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """Compact JSON bytes; snapshot sections serialize like plain dicts"""
+    return json.dumps(obj, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+def _compress(raw):
+    return gzip.compress(raw, compresslevel=6) if len(raw) >= GZIP_MIN_BYTES else None
+
+
+def _respond(raw, gz, etag):
+    """Build the 200 (or 304) response for pre-rendered bytes"""
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    if gz is not None and 'gzip' in request.accept_encodings:
+        resp = Response(gz, mimetype='application/json')
+        resp.headers['Content-Encoding'] = 'gzip'
+    else:
+        resp = Response(raw, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+
+def cached_json(key, version, build):
+    """Serve build() as JSON, serializing at most once per (key, version)"""
+    etag = f'{key}-{_BOOT}-v{version}'
+    if request.if_none_match.contains(etag):
+        return _respond(None, None, etag)
+
+    entry = _bodies.get(key)
+    if entry is None or entry[0] != version:
+        raw = dumps(build())
+        entry = (version, raw, _compress(raw))
+        if key not in _bodies and len(_bodies) >= BODY_CACHE_SIZE:
+            _bodies.clear()
+        _bodies[key] = entry
+    return _respond(entry[1], entry[2], etag)
+
+
+# ═══════════════════════════════════════════
+#  /api/quote FRAGMENTS
+# ═══════════════════════════════════════════
+
+def _render_fragments(snap):
+    """Pre-render one JSON object per symbol the quote endpoint can answer"""
+    by_symbol = {}
+
+    # Keyed by Yahoo symbol — the route normalizes what clients ask for.
+    # Lowest precedence first so later entries overwrite
+    for sym, cmd in snap.commodities.items():
+        by_symbol[sym] = dumps({
+            'symbol': sym,
+            'regularMarketPrice': cmd['val'],
+            'regularMarketChange': cmd['chg'],
+            'regularMarketChangePercent': cmd['chgP'],
+            'shortName': cmd['name'],
+        })
+
+    for sym, q in snap.quotes.items():
+        by_symbol[sym] = dumps(q)
+
+    for idx_name, sym in INDEX_SYMBOLS.items():
+        idx = snap.indices.get(idx_name)
+        if idx:
+            by_symbol[sym] = dumps({
+                'symbol': sym,
+                'shortName': idx_name.upper(),
+                'regularMarketPrice': idx['val'],
+                'regularMarketPreviousClose': idx['prev'],
+                'regularMarketChange': idx['chg'],
+                'regularMarketChangePercent': idx['chgP'],
+            })
+    return by_symbol
+
+
+def quote_fragments(snap):
+    """(version, symbol → JSON bytes, memo) for a snapshot, rendered once per version"""
+    global _fragments
+    frags = _fragments
+    if frags[0] != snap.version:
+        with _fragments_lock:
+            frags = _fragments
+            if frags[0] != snap.version:
+                frags = (snap.version, _render_fragments(snap), {})
+                if frags[0] > (_fragments[0] or 0):
+                    _fragments = frags
+    return frags
+
+
+def quote_response(snap, symbols, requested=None):
+    """Serve a Yahoo-compatible quoteResponse by joining per-symbol fragments.
+    `symbols` are normalized (Yahoo) symbols; `requested`, the client's own
+    identifiers in the same order — a quote asked for another way (ISIN,
+    'NSE:SYM', lowercase) carries it as requestedSymbol."""
+    requested = requested or symbols
+    list_key = ','.join(requested)
+    etag = f'quote-{_BOOT}-v{snap.version}-{zlib.crc32(list_key.encode()):08x}'
+    if request.if_none_match.contains(etag):
+        return _respond(None, None, etag)
+
+    _, by_symbol, bodies = quote_fragments(snap)
+    entry = bodies.get(list_key)
+    if entry is None:
+        parts = []
+        for sym, asked in zip(symbols, requested):
+            frag = by_symbol.get(sym)
+            if frag is not None and asked != sym:
+                frag = b'{"requestedSymbol":' + dumps(asked) + b',' + frag[1:]
+            if frag is not None:
+                parts.append(frag)
+        raw = b'{"quoteResponse":{"result":[' + b','.join(parts) + b'],"error":null}}'
+        entry = (raw, _compress(raw))
+        if len(bodies) < QUOTE_BODY_CACHE_SIZE:
+            bodies[list_key] = entry
+    return _respond(entry[0], entry[1], etag)
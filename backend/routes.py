@@ -3,18 +3,36 @@ BHARAT TERMINAL — Flask API Routes
 """
 
 import threading
-import requests as req_lib
 from urllib.parse import quote
-from flask import jsonify, request, send_from_directory, redirect
+from flask import Response, jsonify, request, send_from_directory, redirect
 from dotenv import set_key
 
 from .config import (
-    INDEX_SYMBOLS, UPSTOX_API_KEY, UPSTOX_API_SECRET, UPSTOX_REDIRECT_URI,
-    UPSTOX_BASE_URL, ENV_PATH, cache, cache_lock,
+    UPSTOX_API_KEY, UPSTOX_API_SECRET, UPSTOX_REDIRECT_URI,
+    UPSTOX_BASE_URL, ENV_PATH, NEWS_IMPACT_WINDOWS, NEWS_IMPACT_SCORE_WINDOW,
 )
+from . import snapshot
+from .responses import cached_json, quote_response
+from .stream import event_stream, parse_subscription, open_stream, close_stream, stream_client_count
+from . import history
+from . import tick_store
 from .stock_data import fetch_stock_data, save_market_close
+from .close_ledger import latest_closes
 from .groww_api import groww_is_configured
 from .upstox_api import upstox_is_configured, upstox_has_token
+from .upstox_feed import upstox_feed_status
+from .source_health import source_status, health_report, is_available as source_is_available
+from .refresh_scheduler import note_interest, refresh_status
+from .on_demand import ensure_quotes, hot_set_status, normalize as normalize_symbol
+from .instruments import instruments_status
+from .ingest import ingest_status
+from .news_scraper import news_feed_status
+from . import news_store
+from .news_impact import article_impact, source_scores, news_impact_status
+from .market_calendar import calendar_status
+from .job_scheduler import jobs_status
+from .warm_start import warm_status
+from .search import search as search_symbols, SEARCH_DEFAULT_RESULTS
 from .portfolio import (
     fetch_portfolio_from_groww, get_portfolio_with_live_prices,
     load_holdings, save_holdings,
@@ -69,6 +87,8 @@ def register_routes(app):
             return jsonify({'error': 'No authorization code received'}), 400
 
         try:
+            import requests as req_lib
+
             token_url = f'{UPSTOX_BASE_URL}/login/authorization/token'
             payload = {
                 'code': code,
@@ -129,74 +149,69 @@ def register_routes(app):
     @app.route('/api/data-sources')
     def api_data_sources():
         return jsonify({
-            'groww': {'configured': groww_is_configured(), 'connected': cfg.GROWW_CLIENT is not None, 'priority': 0},
-            'upstox': {'configured': upstox_is_configured(), 'has_token': upstox_has_token(), 'priority': 1},
-            'google_finance': {'configured': True, 'connected': True, 'priority': 2},
-            'yfinance': {'configured': True, 'connected': True, 'priority': 3},
+            'groww': {'configured': groww_is_configured(), 'connected': cfg.GROWW_CLIENT is not None, 'priority': 0,
+                      'health': source_status('groww')},
+            'upstox': {'configured': upstox_is_configured(), 'has_token': upstox_has_token(), 'priority': 1,
+                       'health': source_status('upstox')},
+            'upstox_feed': {**upstox_feed_status(), 'priority': 1},
+            'google_finance': {'configured': True, 'connected': source_is_available('google_finance'), 'priority': 2,
+                               'health': source_status('google_finance')},
+            'yfinance': {'configured': True, 'connected': source_is_available('yahoo'), 'priority': 3,
+                         'health': source_status('yahoo')},
+            'news': health_report('news'),
+            'news_feeds': news_feed_status(),
+            'instruments': instruments_status(),
+            'ingest': ingest_status(),
         })
 
+    @app.route('/api/refresh-schedule')
+    def api_refresh_schedule():
+        """Per-symbol refresh interval, time to next refresh and staleness"""
+        return jsonify({**refresh_status(), 'hot_set': hot_set_status()})
+
+    @app.route('/api/jobs')
+    def api_jobs():
+        """Market calendar phase and every background job's last run / lag / next run"""
+        return jsonify({'market': calendar_status(), 'jobs': jobs_status()})
+
     # ── Data endpoints ──
 
     @app.route('/api/quote')
     def api_quotes():
         """Return stock quotes (compatible with frontend format)"""
-        symbols = request.args.get('symbols', '').split(',')
-        symbols = [s.strip() for s in symbols if s.strip()]
-
-        idx_sym_to_name = {v: k for k, v in INDEX_SYMBOLS.items()}
-
-        with cache_lock:
-            result = []
-            for sym in symbols:
-                found = False
-
-                if sym in idx_sym_to_name:
-                    idx_name = idx_sym_to_name[sym]
-                    if idx_name in cache['indices']:
-                        idx = cache['indices'][idx_name]
-                        result.append({
-                            'symbol': sym,
-                            'shortName': idx_name.upper(),
-                            'regularMarketPrice': idx['val'],
-                            'regularMarketPreviousClose': idx['prev'],
-                            'regularMarketChange': idx['chg'],
-                            'regularMarketChangePercent': idx['chgP'],
-                        })
-                        found = True
-
-                if not found and sym in cache['quotes']:
-                    result.append(cache['quotes'][sym])
-                    found = True
-
-                if not found and sym in cache['commodities']:
-                    cmd = cache['commodities'][sym]
-                    result.append({
-                        'symbol': sym,
-                        'regularMarketPrice': cmd['val'],
-                        'regularMarketChange': cmd['chg'],
-                        'regularMarketChangePercent': cmd['chgP'],
-                        'shortName': cmd['name'],
-                    })
-                    found = True
-
-                if not found:
-                    for k, v in cache['quotes'].items():
-                        if k == sym or k.replace('.NS', '') == sym.replace('.NS', ''):
-                            result.append(v)
-                            break
-
-            return jsonify({'quoteResponse': {'result': result, 'error': None}})
+        requested, symbols = [], []
+        for raw in dict.fromkeys(s.strip() for s in request.args.get('symbols', '').split(',')):
+            sym = normalize_symbol(raw) if raw else None  # ISIN, 'NSE:SYM', lowercase → Yahoo symbol
+            if sym:
+                requested.append(raw)
+                symbols.append(sym)
+        ensure_quotes(symbols)
+        note_interest(symbols)
+
+        return quote_response(snapshot.current(), symbols, requested)
+
+    @app.route('/api/search')
+    def api_search():
+        """Ranked symbol / company / ISIN matches over every listed instrument"""
+        q = request.args.get('q', '')
+        try:
+            limit = int(request.args.get('limit', SEARCH_DEFAULT_RESULTS))
+        except ValueError:
+            limit = SEARCH_DEFAULT_RESULTS
+        return jsonify({'query': q, 'results': search_symbols(q, limit)})
 
     @app.route('/api/indices')
     def api_indices():
-        with cache_lock:
-            return jsonify(cache['indices'])
+        snap = snapshot.current()
+        return cached_json('indices', snap.section_version('indices'), lambda: snap.indices)
 
     @app.route('/api/commodities')
     def api_commodities():
-        with cache_lock:
+        snap = snapshot.current()
+
+        def build():
             commodities_list = []
-            for sym, data in cache['commodities'].items():
+            for sym, data in snap.commodities.items():
                 commodities_list.append({
                     'symbol': sym,
                     'name': data['name'],
@@ -204,38 +219,138 @@ def register_routes(app):
                     'change': data['chg'],
                     'changePercent': data['chgP'],
                 })
-            return jsonify(commodities_list)
+            return commodities_list
+
+        return cached_json('commodities', snap.section_version('commodities'), build)
 
     @app.route('/api/news')
     def api_news():
-        cat = request.args.get('category', 'all')
-        with cache_lock:
-            news = cache['news']
-            if cat and cat != 'all':
-                news = [n for n in news if n.get('cat', '').lower() == cat.lower()]
-            return jsonify({
+        cat = (request.args.get('category', 'all') or 'all').lower()
+        snap = snapshot.current()
+
+        def build():
+            news = snap.news
+            if cat != 'all':
+                news = [n for n in news if n.get('cat', '').lower() == cat]
+            return {
                 'articles': news,
                 'total': len(news),
-                'lastUpdate': cache['last_news_update'],
-            })
+                'lastUpdate': snap.last_news_update,
+            }
+
+        return cached_json(f'news-{cat}', snap.section_version('news', 'last_news_update'), build)
+
+    @app.route('/api/news/search')
+    def api_news_search():
+        """Ranked full-text search over the news archive (?q=…&symbol=…&since=2d|ISO&limit=N)"""
+        q = request.args.get('q', '')
+        symbol = request.args.get('symbol', '').strip() or None
+        since = None
+        if request.args.get('since'):
+            try:
+                since = news_store.parse_since(request.args['since'])
+            except ValueError:
+                return jsonify({'error': "since must be like 30m, 6h, 2d or an ISO date/time"}), 400
+        try:
+            limit = int(request.args.get('limit', news_store.SEARCH_DEFAULT_RESULTS))
+        except ValueError:
+            limit = news_store.SEARCH_DEFAULT_RESULTS
+        return jsonify({'query': q, 'symbol': symbol, **news_store.search(q, symbol, since, limit)})
+
+    @app.route('/api/news/<int:article_id>/impact')
+    def api_news_impact(article_id):
+        """Returns of the stocks an article names over 5m / 30m / to the close, raw and vs Nifty"""
+        result = article_impact(article_id)
+        if result is None:
+            return jsonify({'error': f'No archived article {article_id}'}), 404
+        return jsonify(result)
+
+    @app.route('/api/news/impact/sources')
+    def api_news_source_scores():
+        """Market-moving score per news source (?window=5m|30m|eod)"""
+        window = request.args.get('window', NEWS_IMPACT_SCORE_WINDOW)
+        if window not in NEWS_IMPACT_WINDOWS:
+            return jsonify({'error': f"window must be one of {', '.join(NEWS_IMPACT_WINDOWS)}"}), 400
+        return jsonify(source_scores(window))
 
     @app.route('/api/status')
     def api_status():
-        with cache_lock:
-            return jsonify({
-                'status': 'running',
-                'stocks_cached': len(cache['quotes']),
-                'indices_cached': len(cache['indices']),
-                'commodities_cached': len(cache['commodities']),
-                'news_cached': len(cache['news']),
-                'last_stock_update': cache['last_stock_update'],
-                'last_news_update': cache['last_news_update'],
-            })
+        """Cache counts plus how stale each section is (ages change, so not ETag-cached)"""
+        snap = snapshot.current()
+        return jsonify({
+            'status': 'running',
+            'version': snap.version,
+            'stocks_cached': len(snap.quotes),
+            'indices_cached': len(snap.indices),
+            'commodities_cached': len(snap.commodities),
+            'news_cached': len(snap.news),
+            'last_stock_update': snap.last_stock_update,
+            'last_news_update': snap.last_news_update,
+            'warm_start': warm_status(),
+            'news_archive': news_store.news_archive_status(),
+            'news_impact': news_impact_status(),
+        })
+
+    @app.route('/api/stream')
+    def api_stream():
+        """Server-Sent Events: quote/index/commodity/news deltas for a subscription"""
+        symbols, topics = parse_subscription(request.args.get('symbols'), request.args.get('topics'))
+        token = open_stream(symbols)
+        if token is None:
+            return jsonify({'error': 'Too many open streams', 'open': stream_client_count()}), 503
+        if symbols:
+            try:
+                ensure_quotes(symbols, wait=False)  # cold symbols arrive as a later push
+            except Exception:
+                close_stream(token)
+                raise
+        resp = Response(event_stream(token, topics), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+        resp.call_on_close(lambda: close_stream(token))  # also when the body was never started
+        return resp
+
+    @app.route('/api/history')
+    def api_history():
+        """Intraday series for one symbol over `days` trading days: raw samples or OHLC bars"""
+        sym = request.args.get('symbol', '').strip()
+        resolution = request.args.get('resolution', '1m')
+        since = request.args.get('since', type=int)
+        days = max(1, min(request.args.get('days', 1, type=int), 30))
+        if not sym:
+            return jsonify({'error': 'Missing symbol parameter'}), 400
+        if resolution != 'raw' and resolution not in history.RESOLUTIONS:
+            return jsonify({'error': f'resolution must be raw or one of {list(history.RESOLUTIONS)}'}), 400
+
+        sym = history.resolve_symbol(sym)
+        ts, px = tick_store.series(sym, days, since)
+        if resolution == 'raw':
+            return jsonify({'symbol': sym, 'resolution': 'raw', 'days': days, 't': ts.tolist(), 'p': px.tolist()})
+
+        bars = history.aggregate_bars(ts, px, history.RESOLUTIONS[resolution])
+        for k in ('o', 'h', 'l', 'c'):
+            bars[k] = bars[k].round(2)
+        return jsonify({'symbol': sym, 'resolution': resolution, 'days': days, **{k: v.tolist() for k, v in bars.items()}})
+
+    @app.route('/api/history/portfolio')
+    def api_history_portfolio():
+        """Intraday value of the current holdings (Σ qty × close per bar)"""
+        resolution = request.args.get('resolution', '5m')
+        if resolution not in history.RESOLUTIONS:
+            return jsonify({'error': f'resolution must be one of {list(history.RESOLUTIONS)}'}), 400
+        weights = {}
+        for h in load_holdings():
+            if h.get('symbol'):
+                weights[h['symbol']] = weights.get(h['symbol'], 0) + float(h.get('qty', 0) or 0)
+        t, value = history.weighted_close_series(weights, resolution)
+        return jsonify({'resolution': resolution, 't': t.tolist(), 'value': [round(v, 2) for v in value.tolist()]})
 
     @app.route('/api/save-closes')
     def api_save_closes():
         save_market_close()
-        return jsonify({'status': 'saved', 'file': 'saved_closes.json'})
+        date, closes = latest_closes()
+        return jsonify({'status': 'saved', 'date': date, 'count': len(closes)})
 
     # ── Portfolio endpoints ──
 
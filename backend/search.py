@@ -0,0 +1,319 @@
+"""
+BHARAT TERMINAL — Symbol Search
+/api/search over every instrument in the instrument master. Built once (at
+startup, or on the first query) and shared read-only by all requests:
+
+  • exact     — any identifier the master resolves (symbol, ISIN, 'BSE:SYM')
+  • trie      — prefix match on trading symbols and on company names (each
+                word and the whole name). Every node caches its best
+                SEARCH_MAX_RESULTS entries by static rank, so a prefix
+                query is one walk of len(q) dict reads. Past TRIE_DEPTH
+                characters a node keeps its full (term, entry) list instead.
+  • ISIN      — prefix match by bisect over the sorted ISINs
+  • trigram   — substring and typo-tolerant match over the vocabulary of
+                symbols and name words. Each query word is compared with
+                the terms sharing its trigrams (Dice similarity; 0.9 when it
+                is a substring, 0.8 when one or two edits away); an entry
+                scores the mean of its best term per query word, kept at
+                ≥ FUZZY_MIN.
+
+Static rank puts the configured universe first, then NSE shares, BSE
+shares, other listings, shorter symbols first.
+"""
+
+import re
+import time
+import heapq
+import bisect
+import threading
+from functools import lru_cache
+from collections import Counter
+
+from .config import NIFTY50_SYMBOLS, INDEX_SYMBOLS
+from .instruments import all_instruments, resolve
+from . import snapshot
+
+
+SEARCH_DEFAULT_RESULTS = 10
+SEARCH_MAX_RESULTS = 20
+TRIE_DEPTH = 8
+FUZZY_MIN = 0.5
+FUZZY_TERM_MIN = 0.3        # Dice similarity a term needs before the finer checks
+FUZZY_CHECKED = 48          # terms (best Dice first) given the substring check
+FUZZY_EDITS = 8             # … of which this many also get the edit-distance check
+FUZZY_TERMS = 16            # best vocabulary terms kept per query word
+
+SCORE_EXACT = 1000
+SCORE_SYMBOL = 800
+SCORE_ISIN = 750
+SCORE_NAME = 700
+SCORE_FUZZY = 500           # × similarity
+
+_NAME_STOPWORDS = {'ltd', 'limited', 'the', 'of', 'and', '&', 'co', 'inc'}
+_WORD_RE = re.compile(r'[a-z0-9&]+')
+_ISIN_PREFIX_RE = re.compile(r'^IN[A-Z0-9]{2,10}$')
+_KIND_RANK = {'INDEX': 0, 'EQ': 1, 'OTHER': 2}
+_LEAF = '\0'  # node key holding the full (term, entry) list at TRIE_DEPTH
+
+_build_lock = threading.Lock()
+_index = {'rows': None}
+
+
+# ═══════════════════════════════════════════
+#  BUILDING
+# ═══════════════════════════════════════════
+
+def _words(text):
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _NAME_STOPWORDS]
+
+
+def _compact(text):
+    return re.sub(r'[^a-z0-9]', '', text.lower())
+
+
+@lru_cache(maxsize=4096)
+def _trigrams(word):
+    padded = f' {word} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _trie_insert(root, term, eid):
+    node = root
+    for ch in term[:TRIE_DEPTH]:
+        node = node.setdefault(ch, {})
+        top = node.setdefault('', [])
+        if len(top) < SEARCH_MAX_RESULTS and eid not in top:
+            top.append(eid)
+    if len(term) > TRIE_DEPTH:
+        node.setdefault(_LEAF, []).append((term, eid))
+
+
+def _freeze(node):
+    """Lists → tuples once the trie is complete (smaller, read-only)"""
+    for key, child in node.items():
+        if key == '' or key == _LEAF:
+            node[key] = tuple(child)
+        else:
+            _freeze(child)
+
+
+def _trie_prefix(root, prefix):
+    """Entry ids whose term starts with `prefix`, best static rank first"""
+    node = root
+    for ch in prefix[:TRIE_DEPTH]:
+        node = node.get(ch)
+        if node is None:
+            return ()
+    if len(prefix) <= TRIE_DEPTH:
+        return node.get('', ())
+    seen, hits = set(), []
+    for term, eid in node.get(_LEAF, ()):
+        if term.startswith(prefix) and eid not in seen:
+            seen.add(eid)
+            hits.append(eid)
+    return hits
+
+
+def _count_nodes(node):
+    return 1 + sum(_count_nodes(c) for k, c in node.items() if k != '' and k != _LEAF)
+
+
+def build_search_index():
+    """(Re)build the index from the instrument master → entry count"""
+    global _index
+    start = time.time()
+    rows = all_instruments()
+    configured = set(NIFTY50_SYMBOLS) | set(INDEX_SYMBOLS.values())
+    order = sorted(range(len(rows)), key=lambda i: (
+        rows[i].yahoo not in configured, _KIND_RANK.get(rows[i].kind, 3),
+        rows[i].exchange != 'NSE', len(rows[i].symbol), rows[i].symbol,
+    ))
+    rank = [0] * len(rows)
+    for pos, i in enumerate(order):
+        rank[i] = pos
+
+    symbols, names, isins = {}, {}, []
+    vocab = {}  # term → [entry ids], best rank first
+    for i in order:  # best first, so each node's cached top list is by rank
+        row = rows[i]
+        sym = row.symbol.lower()
+        for term in {sym, _compact(sym)}:
+            _trie_insert(symbols, term, i)
+        words = _words(row.name)
+        for term in dict.fromkeys(words + [' '.join(words)]):
+            if term:
+                _trie_insert(names, term, i)
+        for term in dict.fromkeys([_compact(sym)] + words):
+            vocab.setdefault(term, []).append(i)
+        if row.isin:
+            isins.append((row.isin, i))
+    _freeze(symbols)
+    _freeze(names)
+
+    terms = tuple(vocab)
+    grams = {}
+    for tid, term in enumerate(terms):
+        for g in _trigrams(term):
+            grams.setdefault(g, []).append(tid)
+
+    # Swapped in as one dict so a concurrent query sees the old or the new index
+    _index = {
+        'rows': rows,
+        'ids': {row.yahoo: i for i, row in enumerate(rows)},
+        'rank': rank,
+        'symbols': symbols,
+        'names': names,
+        'isins': tuple(sorted(isins)),
+        'terms': terms,
+        'term_grams': tuple(len(_trigrams(t)) for t in terms),
+        'term_entries': tuple(tuple(vocab[t]) for t in terms),
+        'grams': {g: tuple(tids) for g, tids in grams.items()},
+    }
+    print(f"  🔎 Search index: {len(rows)} instruments, {_count_nodes(symbols) + _count_nodes(names)} trie nodes, "
+          f"{len(terms)} terms / {len(grams)} trigrams in {time.time() - start:.2f}s")
+    return len(rows)
+
+
+def _current():
+    if _index['rows'] is not all_instruments():  # first query, or the master was reloaded
+        with _build_lock:
+            if _index['rows'] is not all_instruments():
+                build_search_index()
+    return _index
+
+
+def ensure_search_index():
+    """Build the index now unless it is current (startup runs this in the background)"""
+    return len(_current()['rows'])
+
+
+# ═══════════════════════════════════════════
+#  QUERY
+# ═══════════════════════════════════════════
+
+def _edits_within(a, b, limit):
+    """Optimal-string-alignment distance(a, b) <= limit (adjacent swaps count once)"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return False
+        prev2, prev = prev, cur
+    return prev[-1] <= limit
+
+
+def _similar_terms(idx, word):
+    """[(term id, similarity)] for the vocabulary terms closest to `word`"""
+    grams = _trigrams(word)
+    counts = Counter()
+    for g in grams:
+        counts.update(idx['grams'].get(g, ()))
+    terms, term_grams = idx['terms'], idx['term_grams']
+    # Dice ≥ FUZZY_TERM_MIN needs at least this many shared trigrams (terms have ≥ 3)
+    min_shared = FUZZY_TERM_MIN * (len(grams) + 3) / 2
+    dices = heapq.nlargest(FUZZY_CHECKED, (
+        (2 * shared / (len(grams) + term_grams[tid]), tid)
+        for tid, shared in counts.items() if shared >= min_shared
+    ))
+    # A word that is itself in the vocabulary is not a typo: skip the edit checks
+    typo = len(word) >= 4 and not (dices and terms[dices[0][1]] == word)
+    limit = 1 if len(word) < 8 else 2
+    scored = []
+    for n, (dice, tid) in enumerate(dices):
+        if dice < FUZZY_TERM_MIN:
+            break
+        term = terms[tid]
+        if word == term:
+            sim = 1.0
+        elif len(word) >= 3 and word in term:
+            sim = 0.9
+        elif typo and n < FUZZY_EDITS and _edits_within(word, term, limit):
+            sim = 0.8
+        else:
+            sim = dice
+        scored.append((sim, tid))
+    scored.sort(reverse=True)
+    return [(tid, sim) for sim, tid in scored[:FUZZY_TERMS]]
+
+
+def _fuzzy(idx, words):
+    """{entry id: similarity} — mean over query words of the entry's best term"""
+    best = {}  # entry → [per-word best similarity]
+    for n, word in enumerate(words):
+        for tid, sim in _similar_terms(idx, word):
+            for eid in idx['term_entries'][tid][:SEARCH_MAX_RESULTS]:
+                sims = best.setdefault(eid, [0.0] * len(words))
+                sims[n] = max(sims[n], sim)
+    found = {}
+    for eid, sims in best.items():
+        sim = sum(sims) / len(sims)
+        if sim >= FUZZY_MIN:
+            found[eid] = sim
+    return found
+
+
+def search(q, limit=SEARCH_DEFAULT_RESULTS):
+    """Ranked matches for `q` → list of result dicts (at most `limit`)"""
+    q = (q or '').strip()
+    if not q:
+        return []
+    limit = max(1, min(SEARCH_MAX_RESULTS, limit))
+    idx = _current()
+    rows, rank = idx['rows'], idx['rank']
+    lower = q.lower()
+    words = _words(lower)
+    scores = {}
+
+    def hit(eid, score, how):
+        if score > scores.get(eid, (0, ''))[0]:
+            scores[eid] = (score, how)
+
+    exact = resolve(q)
+    if exact is not None and exact.yahoo in idx['ids']:
+        hit(idx['ids'][exact.yahoo], SCORE_EXACT, 'exact')
+
+    for term in {lower.replace(' ', ''), _compact(lower)}:
+        for eid in _trie_prefix(idx['symbols'], term):
+            hit(eid, SCORE_SYMBOL, 'symbol')
+    if words:
+        for eid in _trie_prefix(idx['names'], ' '.join(words)):
+            hit(eid, SCORE_NAME, 'name')
+
+    upper = q.upper()
+    if _ISIN_PREFIX_RE.match(upper):
+        isins = idx['isins']
+        pos = bisect.bisect_left(isins, (upper,))
+        for isin, eid in isins[pos:pos + SEARCH_MAX_RESULTS]:
+            if not isin.startswith(upper):
+                break
+            hit(eid, SCORE_ISIN, 'isin')
+
+    if len(scores) < limit and len(lower) >= 3 and words:
+        for eid, sim in _fuzzy(idx, words).items():
+            hit(eid, round(SCORE_FUZZY * sim), 'fuzzy')
+
+    best = sorted(scores, key=lambda eid: (-scores[eid][0], rank[eid]))[:limit]
+    snap = snapshot.current()
+    results = []
+    for eid in best:
+        row = rows[eid]
+        quote = snap.quotes.get(row.yahoo) or {}
+        results.append({
+            'symbol': row.yahoo,
+            'code': row.symbol,
+            'name': row.name,
+            'exchange': row.exchange,
+            'isin': row.isin or None,
+            'kind': row.kind,
+            'match': scores[eid][1],
+            'ltp': snap.live_prices.get(row.yahoo) or quote.get('regularMarketPrice'),
+            'chgP': quote.get('regularMarketChangePercent'),
+        })
+    return results
@@ -0,0 +1,115 @@
+"""
+BHARAT TERMINAL — Cache Snapshots
+Copy-on-write, versioned view of all shared market data.
+
+Writers build a new Snapshot and swap it in with a single reference
+assignment; readers call current() and get a consistent view with no lock.
+Sections are read-only mappings/tuples. Entries inside them (quote dicts,
+articles) are never mutated after publish — writers always build new ones.
+`versions` records the snapshot version at which each section last changed,
+so a cache of one section survives publishes that only touch another.
+"""
+
+import threading
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+
+
+def _empty():
+    return MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int = 0
+    quotes: MappingProxyType = field(default_factory=_empty)
+    indices: MappingProxyType = field(default_factory=_empty)
+    commodities: MappingProxyType = field(default_factory=_empty)
+    news: tuple = ()
+    macro: MappingProxyType = field(default_factory=_empty)
+    last_stock_update: str = None
+    last_news_update: str = None
+    live_prices: MappingProxyType = field(default_factory=_empty)
+    versions: MappingProxyType = field(default_factory=_empty)   # section → version it last changed
+
+    def section_version(self, *names):
+        """Latest version at which any of these sections changed"""
+        return max(self.versions.get(name, 0) for name in names)
+
+
+_current = Snapshot()
+_write_lock = threading.Lock()  # serialises writers only — readers never take it
+_listeners = []  # callables (old, new) run after every swap
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType(dict(value))
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _replace(old, version, frozen):
+    versions = MappingProxyType({**old.versions, **{name: version for name in frozen}})
+    return replace(old, version=version, versions=versions, **frozen)
+
+
+def on_publish(callback):
+    """Register callback(old, new), run under the writer lock after each swap — keep it cheap"""
+    _listeners.append(callback)
+
+
+def _notify(old, new):
+    for callback in _listeners:
+        try:
+            callback(old, new)
+        except Exception as e:
+            print(f"  ⚠ Snapshot listener error: {e}")
+
+
+def current():
+    """Return the latest published snapshot (lock-free)"""
+    return _current
+
+
+def publish(**sections):
+    """Build a new snapshot with the given sections replaced and swap it in"""
+    global _current
+    with _write_lock:
+        old = _current
+        frozen = {name: _freeze(value) for name, value in sections.items()}
+        snap = _replace(old, old.version + 1, frozen)
+        _current = snap
+        _notify(old, snap)
+    return snap
+
+
+def update(build):
+    """Atomically derive sections from the latest snapshot: build(snap) → {section: value}
+
+    Use this instead of current() + publish() when the new value depends on
+    the old one (e.g. merging streaming ticks), so concurrent writers can't
+    overwrite each other.
+    """
+    global _current
+    with _write_lock:
+        old = _current
+        sections = build(old) or {}
+        if not sections:
+            return old
+        frozen = {name: _freeze(value) for name, value in sections.items()}
+        snap = _replace(old, old.version + 1, frozen)
+        _current = snap
+        _notify(old, snap)
+    return snap
+
+
+def restore(version, **sections):
+    """Swap in a persisted snapshot at startup. Listeners are not told:
+    restored data is not a change (no ticks recorded, no stream deltas)."""
+    global _current
+    with _write_lock:
+        frozen = {name: _freeze(value) for name, value in sections.items()}
+        _current = _replace(_current, max(version, _current.version + 1), frozen)
+    return _current
@@ -0,0 +1,218 @@
+"""
+BHARAT TERMINAL — Source Health
+Every upstream call goes through call(name, fn, ...), which:
+  • waits for a token from the source's rate limiter (SOURCE_RATE_LIMITS;
+    news sources are keyed per host as 'news:<host>'),
+  • refuses instantly while the source's circuit breaker is open,
+  • records success/failure + latency into a rolling window.
+
+Breaker: CB_FAILURE_THRESHOLD consecutive failures open it for a cool-down.
+After that one probe call is let through (half-open); success closes the
+breaker, failure re-opens it with a doubled cool-down (up to CB_COOLDOWN_MAX).
+A dead upstream therefore costs one probe per cool-down, not a timeout per call.
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+
+from .config import (
+    SOURCE_RATE_LIMITS, SOURCE_RATE_WAIT, CB_FAILURE_THRESHOLD, CB_COOLDOWN, CB_COOLDOWN_MAX,
+    HEALTH_WINDOW, HEALTH_LATENCY_TARGET,
+)
+from .rate_limit import TokenBucket
+
+
+class SourceUnavailable(Exception):
+    """Raised instead of calling a source whose breaker is open or that is rate-limited"""
+
+
+class SourceHealth:
+    """Rate limiter + circuit breaker + rolling stats for one upstream"""
+
+    def __init__(self, name, rate=None):
+        self.name = name
+        self.limiter = TokenBucket(rate) if rate else None
+        self.window = deque(maxlen=HEALTH_WINDOW)  # (ok, latency seconds)
+        self.state = 'closed'
+        self.failures = 0          # consecutive
+        self.cooldown = CB_COOLDOWN
+        self.open_until = 0.0
+        self.probing = False
+        self.calls = 0
+        self.last_error = None
+        self.last_ok = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """May a call go out now? (half-open lets exactly one probe through)"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() >= self.open_until:
+                self.state = 'half-open'
+            if self.state == 'half-open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def throttle(self):
+        return self.limiter is None or self.limiter.acquire(timeout=SOURCE_RATE_WAIT)
+
+    async def throttle_async(self):
+        return self.limiter is None or await self.limiter.acquire_async(timeout=SOURCE_RATE_WAIT)
+
+    def success(self, latency):
+        with self._lock:
+            self.calls += 1
+            self.window.append((True, latency))
+            self.failures = 0
+            self.last_ok = datetime.now().isoformat()
+            if self.state != 'closed':
+                print(f"  ✓ {self.name} recovered — circuit closed")
+            self.state = 'closed'
+            self.cooldown = CB_COOLDOWN
+            self.probing = False
+
+    def failure(self, latency, error):
+        with self._lock:
+            self.calls += 1
+            self.window.append((False, latency))
+            self.failures += 1
+            self.last_error = f'{datetime.now().strftime("%H:%M:%S")} {error}'[:200]
+            if self.state == 'half-open':
+                self.cooldown = min(self.cooldown * 2, CB_COOLDOWN_MAX)
+                self._open()
+            elif self.state == 'closed' and self.failures >= CB_FAILURE_THRESHOLD:
+                self._open()
+            self.probing = False
+
+    def release(self):
+        """Give back a half-open probe slot that was never used"""
+        with self._lock:
+            self.probing = False
+
+    def _open(self):
+        self.state = 'open'
+        self.open_until = time.monotonic() + self.cooldown
+        print(f"  ⛔ {self.name} circuit open for {self.cooldown}s ({self.failures} consecutive failures)")
+
+    def score(self):
+        """0–100: success rate, scaled down when p90 latency exceeds the target"""
+        if self.state == 'open':
+            return 0
+        if not self.window:
+            return 100
+        oks = [ok for ok, _ in self.window]
+        latencies = sorted(lat for _, lat in self.window)
+        p90 = latencies[int(0.9 * (len(latencies) - 1))]
+        rate = sum(oks) / len(oks)
+        speed = min(1.0, HEALTH_LATENCY_TARGET / p90) if p90 > 0 else 1.0
+        return round(100 * rate * speed)
+
+    def status(self):
+        with self._lock:
+            latencies = sorted(lat for _, lat in self.window)
+            oks = [ok for ok, _ in self.window]
+            return {
+                'state': self.state,
+                'score': self.score(),
+                'success_rate': round(sum(oks) / len(oks), 3) if oks else None,
+                'latency_p50_ms': round(latencies[len(latencies) // 2] * 1000) if latencies else None,
+                'latency_p90_ms': round(latencies[int(0.9 * (len(latencies) - 1))] * 1000) if latencies else None,
+                'calls': self.calls,
+                'consecutive_failures': self.failures,
+                'retry_in': round(max(0.0, self.open_until - time.monotonic()), 1) if self.state == 'open' else None,
+                'last_ok': self.last_ok,
+                'last_error': self.last_error,
+            }
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def source(name):
+    """Registry lookup; 'news:<host>' sources share the 'news' rate setting"""
+    src = _sources.get(name)
+    if src is None:
+        with _sources_lock:
+            src = _sources.get(name)
+            if src is None:
+                src = _sources[name] = SourceHealth(name, SOURCE_RATE_LIMITS.get(name.split(':')[0]))
+    return src
+
+
+def is_available(name):
+    """False while the breaker is open (cheap pre-check before starting work)"""
+    src = source(name)
+    return src.state != 'open' or time.monotonic() >= src.open_until
+
+
+def _is_failure(result):
+    status = getattr(result, 'status_code', None)
+    return status is not None and (status >= 500 or status == 429)
+
+
+def _record(src, start, result):
+    if _is_failure(result):
+        src.failure(time.monotonic() - start, f'HTTP {result.status_code}')
+    else:
+        src.success(time.monotonic() - start)
+
+
+def call(name, fn, *args, **kwargs):
+    """fn(*args, **kwargs) guarded by the source's limiter, breaker and stats.
+    HTTP responses with 5xx/429 count as failures but are still returned."""
+    src = source(name)
+    if not src.allow():
+        raise SourceUnavailable(f'{name} circuit open')
+    if not src.throttle():
+        src.release()
+        raise SourceUnavailable(f'{name} rate limited')
+
+    start = time.monotonic()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        src.failure(time.monotonic() - start, e)
+        raise
+    _record(src, start, result)
+    return result
+
+
+async def call_async(name, fn, *args, **kwargs):
+    """call() for coroutine functions: awaits fn(*args, **kwargs); waiting for
+    a rate-limit token yields to the event loop instead of blocking it"""
+    src = source(name)
+    if not src.allow():
+        raise SourceUnavailable(f'{name} circuit open')
+    if not await src.throttle_async():
+        src.release()
+        raise SourceUnavailable(f'{name} rate limited')
+
+    start = time.monotonic()
+    try:
+        result = await fn(*args, **kwargs)
+    except asyncio.CancelledError:  # caller's deadline, not the source's fault
+        src.release()
+        raise
+    except Exception as e:
+        src.failure(time.monotonic() - start, e)
+        raise
+    _record(src, start, result)
+    return result
+
+
+def source_status(name):
+    return source(name).status()
+
+
+def health_report(prefix=None):
+    """{name: status} for every source seen so far (optionally one family)"""
+    return {
+        name: src.status() for name, src in sorted(_sources.items())
+        if prefix is None or name.split(':')[0] == prefix
+    }
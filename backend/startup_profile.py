@@ -0,0 +1,139 @@
+"""
+BHARAT TERMINAL — Startup Profiler
+`python app_server.py --profile-startup` times every module import and each
+initialization step, then — once the server answers its first request —
+prints where the time to first response went.
+
+Imports are timed by a meta-path finder that wraps each module's
+exec_module: a module's self time excludes the imports it triggers, so the
+numbers add up. Third-party modules are summed per top-level package,
+backend modules are listed one by one. Init steps are marked in
+app_server.py with `with phase('…'):`, which costs nothing when profiling
+is off. Uses the standard library only, so it can be installed before
+anything else is imported.
+"""
+
+import sys
+import time
+import threading
+import urllib.request
+from contextlib import contextmanager
+from importlib.machinery import SourceFileLoader, SourcelessFileLoader, ExtensionFileLoader
+
+REPORT_ROWS = 12
+FIRST_RESPONSE_URL = 'http://127.0.0.1:5000/api/status'
+FIRST_RESPONSE_TIMEOUT = 30  # seconds to wait for the server to answer
+
+_TIMED_LOADERS = (SourceFileLoader, SourcelessFileLoader, ExtensionFileLoader)
+
+_state = {'enabled': False, 't0': None}
+_imports = {}               # module → self seconds
+_phases = []                # (name, seconds)
+_stack = threading.local()  # per thread: child time of the imports in progress
+
+
+class _TimingFinder:
+    """Finds specs through the real finders and times the loader's exec_module"""
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if isinstance(spec.loader, _TIMED_LOADERS):  # one loader instance per module
+            spec.loader.exec_module = _timed(name, spec.loader.exec_module)
+        return spec
+
+
+def _timed(name, exec_module):
+    def run(module):
+        frames = getattr(_stack, 'frames', None)
+        if frames is None:
+            frames = _stack.frames = []
+        frames.append(0.0)
+        start = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            children = frames.pop()
+            if frames:
+                frames[-1] += total
+            _imports[name] = total - children
+    return run
+
+
+def install():
+    """Start timing imports (call before importing anything worth measuring)"""
+    if _state['enabled']:
+        return
+    _state['enabled'] = True
+    _state['t0'] = time.perf_counter()
+    sys.meta_path.insert(0, _TimingFinder())
+
+
+def enabled():
+    return _state['enabled']
+
+
+@contextmanager
+def phase(name):
+    """Time an initialization step (no-op unless profiling)"""
+    if not _state['enabled']:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - start))
+
+
+# ═══════════════════════════════════════════
+#  REPORT
+# ═══════════════════════════════════════════
+
+def _group(name):
+    return name if name.startswith('backend.') else name.split('.')[0]
+
+
+def report(first_response=None):
+    """Print the import / init breakdown (seconds → ms)"""
+    grouped = {}
+    for name, secs in _imports.items():
+        key = _group(name)
+        grouped[key] = grouped.get(key, 0.0) + secs
+    total_imports = sum(grouped.values())
+    total_init = sum(secs for _, secs in _phases)
+
+    print("\n  ⏱ Startup profile")
+    print(f"    imports  {total_imports * 1000:8.1f} ms  ({len(_imports)} modules)")
+    for key, secs in sorted(grouped.items(), key=lambda kv: -kv[1])[:REPORT_ROWS]:
+        print(f"      {key:<28}{secs * 1000:8.1f} ms")
+    print(f"    init     {total_init * 1000:8.1f} ms")
+    for name, secs in _phases:
+        print(f"      {name:<28}{secs * 1000:8.1f} ms")
+    if first_response is not None:
+        print(f"    first response {first_response * 1000:8.1f} ms after launch")
+    print()
+
+
+def report_after_first_response(url=FIRST_RESPONSE_URL):
+    """Poll `url` from a background thread; print the report once it answers"""
+    def wait():
+        deadline = time.monotonic() + FIRST_RESPONSE_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as r:
+                    r.read()
+                report(time.perf_counter() - _state['t0'])
+                return
+            except OSError:
+                time.sleep(0.01)
+        report()
+
+    threading.Thread(target=wait, name='startup-profile', daemon=True).start()
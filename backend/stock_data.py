@@ -1,70 +1,34 @@
 """
 BHARAT TERMINAL — Stock Data Fetching
-Pipeline: Groww → Upstox → Google Finance → yfinance
+Pipeline: Groww → Upstox → Google Finance → yfinance (all tiers run concurrently)
 Includes saved closes for day-over-day tracking.
 """
 
-import os
-import json
 import time
+import asyncio
 import traceback
+import functools
 import concurrent.futures
 from datetime import datetime
 
-import yfinance as yf
-import requests as req_lib
-from bs4 import BeautifulSoup
+import numpy as np
 
 from .config import (
-    NIFTY50_SYMBOLS, INDEX_SYMBOLS, COMMODITY_SYMBOLS, GOOGLE_FINANCE_MAP,
-    UPSTOX_STOCK_MAP, HEADERS, SAVED_CLOSES_FILE, cache, cache_lock,
+    NIFTY50_SYMBOLS, INDEX_SYMBOLS, COMMODITY_SYMBOLS,
+    YAHOO_SPARK_URL, YAHOO_BATCH_SIZE, YAHOO_BATCH_MODE,
+    FETCH_CYCLE_DEADLINE,
 )
+from . import snapshot
+from . import source_health
+from . import ingest
+from . import tick_store
+from .close_ledger import record_closes, previous_closes, latest_closes
+from .orchestrator import run_tiers
+from .instruments import vendor_keys, short_name
+from .google_finance import verify as gf_verify
 from .groww_api import groww_is_configured, groww_fetch_all
 from .upstox_api import upstox_is_configured, upstox_has_token, upstox_fetch_indices, upstox_fetch_stocks
-
-
-# ═══════════════════════════════════════════
-#  GOOGLE FINANCE SCRAPER
-# ═══════════════════════════════════════════
-
-def _fetch_from_google_finance(symbol):
-    """Scrape price data from Google Finance as backup source"""
-    if symbol in GOOGLE_FINANCE_MAP:
-        gf_sym = GOOGLE_FINANCE_MAP[symbol]
-    elif symbol.endswith('.NS'):
-        gf_sym = symbol.replace('.NS', '') + ':NSE'
-    else:
-        return None
-
-    try:
-        url = f'https://www.google.com/finance/quote/{gf_sym}'
-        r = req_lib.get(url, headers=HEADERS, timeout=8)
-        if r.status_code != 200:
-            return None
-
-        soup = BeautifulSoup(r.text, 'lxml')
-        price_el = soup.select_one('[data-last-price]')
-        if not price_el:
-            return None
-
-        price = float(price_el['data-last-price'])
-        prev_str = price_el.get('data-previous-close', '')
-        prev_close = float(prev_str) if prev_str else None
-
-        if price and prev_close:
-            chg = round(price - prev_close, 2)
-            chgP = round((chg / prev_close * 100), 2)
-            return {
-                'symbol': symbol,
-                'shortName': symbol,
-                'regularMarketPrice': round(price, 2),
-                'regularMarketPreviousClose': round(prev_close, 2),
-                'regularMarketChange': chg,
-                'regularMarketChangePercent': chgP,
-            }
-    except Exception as e:
-        print(f"  ⚠ Google Finance error ({symbol}): {e}")
-    return None
+from .upstox_feed import upstox_feed_is_live, upstox_feed_latest, upstox_feed_covers, merge_ticks
 
 
 # ═══════════════════════════════════════════
@@ -73,6 +37,8 @@ def _fetch_from_google_finance(symbol):
 
 def _fetch_single_ticker(sym):
     """Fetch a single ticker's data — uses fast_info for accurate live data"""
+    import yfinance as yf  # deferred: pulls in pandas, only the legacy path needs it
+
     try:
         t = yf.Ticker(sym)
 
@@ -87,7 +53,7 @@ def _fetch_single_ticker(sym):
 
                 return sym, {
                     'symbol': sym,
-                    'shortName': sym.replace('.NS', '').replace('=X', ''),
+                    'shortName': short_name(sym),
                     'regularMarketPrice': curr,
                     'regularMarketChange': chg,
                     'regularMarketChangePercent': chgP,
@@ -99,7 +65,7 @@ def _fetch_single_ticker(sym):
         except Exception:
             pass
 
-        hist = t.history(period='5d')
+        hist = source_health.call('yahoo', t.history, period='5d')
         if hist.empty or len(hist) < 1:
             return sym, None
         curr = round(float(hist['Close'].iloc[-1]), 2)
@@ -118,7 +84,7 @@ def _fetch_single_ticker(sym):
 
         return sym, {
             'symbol': sym,
-            'shortName': sym.replace('.NS', '').replace('=X', ''),
+            'shortName': short_name(sym),
             'regularMarketPrice': curr,
             'regularMarketChange': chg,
             'regularMarketChangePercent': chgP,
@@ -132,49 +98,185 @@ def _fetch_single_ticker(sym):
 
 
 # ═══════════════════════════════════════════
-#  SAVED CLOSES (day-over-day tracking)
+#  YAHOO BATCH FETCHER (spark endpoint)
 # ═══════════════════════════════════════════
 
-def _load_saved_closes():
-    """Load yesterday's closing prices from file"""
+IST_OFFSET_SECS = 19800  # +05:30, used to bucket epoch seconds into trading days
+
+
+async def _fetch_yahoo_spark_chunk(symbols):
+    """Fetch daily closes + chart meta for up to YAHOO_BATCH_SIZE symbols in one request"""
     try:
-        if os.path.exists(SAVED_CLOSES_FILE):
-            with open(SAVED_CLOSES_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get('prices', {})
+        params = {'symbols': ','.join(symbols), 'range': '5d', 'interval': '1d'}
+        r = await ingest.get('yahoo', YAHOO_SPARK_URL, params=params)
+        if r.status_code != 200:
+            return {}
+
+        out = {}
+        for item in (r.json().get('spark') or {}).get('result') or []:
+            responses = item.get('response') or []
+            if item.get('symbol') and responses:
+                out[item['symbol']] = responses[0]
+        return out
     except Exception as e:
-        print(f"  ⚠ Error loading saved closes: {e}")
-    return {}
+        print(f"  ⚠ Yahoo batch error ({len(symbols)} symbols): {e}")
+        return {}
 
 
-def _save_closes(prices):
-    """Save today's closing prices to file"""
-    try:
-        data = {
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'time': datetime.now().strftime('%H:%M:%S'),
-            'prices': prices,
+async def _fetch_yahoo_batch(symbols):
+    """Fetch the whole universe in a few multi-symbol requests.
+
+    Change / change% for every symbol are computed at once on NumPy arrays,
+    and the result has the same quote dict shape as _fetch_single_ticker.
+    Symbols Yahoo did not return are simply absent from the result.
+    """
+    chunks = [symbols[i:i + YAHOO_BATCH_SIZE] for i in range(0, len(symbols), YAHOO_BATCH_SIZE)]
+    raw = {}
+    for part in await asyncio.gather(*map(_fetch_yahoo_spark_chunk, chunks)):
+        raw.update(part)
+
+    syms = [s for s in symbols if s in raw]
+    if not syms:
+        return {}
+
+    # Right-align every close series into one (n, width) matrix, NaN-padded
+    series = []
+    for s in syms:
+        try:
+            closes = raw[s]['indicators']['quote'][0].get('close') or []
+        except (KeyError, IndexError, TypeError):
+            closes = []
+        stamps = raw[s].get('timestamp') or []
+        # Bar timestamps pair with closes from the right; extra ones (no
+        # indicators at all) would not fit the matrix
+        series.append((closes, stamps[len(stamps) - len(closes):] if closes else []))
+
+    n = len(syms)
+    width = max(1, max(len(c) for c, _ in series))
+    close_mat = np.full((n, width), np.nan)
+    ts_mat = np.zeros((n, width))
+    for i, (closes, stamps) in enumerate(series):
+        if closes:
+            close_mat[i, width - len(closes):] = [np.nan if c is None else c for c in closes]
+        if stamps:
+            ts_mat[i, width - len(stamps):] = stamps
+
+    metas = [raw[s].get('meta') or {} for s in syms]
+
+    def meta_col(key):
+        return np.array([m.get(key) if m.get(key) is not None else np.nan for m in metas], dtype=float)
+
+    live_px = meta_col('regularMarketPrice')
+    live_ts = meta_col('regularMarketTime')
+    hi52 = meta_col('fiftyTwoWeekHigh')
+    lo52 = meta_col('fiftyTwoWeekLow')
+
+    # Last and second-last valid close per row
+    rows = np.arange(n)
+    valid = ~np.isnan(close_mat)
+    has_last = valid.any(axis=1)
+    last_idx = width - 1 - np.argmax(valid[:, ::-1], axis=1)
+    last_close = np.where(has_last, close_mat[rows, last_idx], np.nan)
+    last_bar_ts = ts_mat[rows, last_idx]
+
+    valid_prev = valid.copy()
+    valid_prev[rows, last_idx] = False
+    has_prev = valid_prev.any(axis=1)
+    prev_idx = width - 1 - np.argmax(valid_prev[:, ::-1], axis=1)
+    prev_close = np.where(has_prev, close_mat[rows, prev_idx], np.nan)
+
+    curr = np.where(np.isnan(live_px), last_close, live_px)
+
+    # If today's daily bar hasn't appeared yet, the last bar IS the previous close
+    bar_day = (last_bar_ts + IST_OFFSET_SECS) // 86400
+    live_day = (live_ts + IST_OFFSET_SECS) // 86400
+    bar_is_stale = ~np.isnan(live_ts) & has_last & (bar_day < live_day)
+    prev = np.where(bar_is_stale, last_close, prev_close)
+    prev = np.where(np.isnan(prev), meta_col('chartPreviousClose'), prev)
+    prev = np.where(np.isnan(prev), curr, prev)
+
+    ok = ~np.isnan(curr) & (curr > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chg = np.round(curr - prev, 2)
+        chgP = np.where(prev > 0, np.round(chg / prev * 100, 2), 0.0)
+    curr = np.round(curr, 2)
+    prev = np.round(prev, 2)
+
+    def to_opt(arr):
+        return [None if np.isnan(v) else float(v) for v in arr]
+
+    curr_l, prev_l, chg_l, chgP_l = curr.tolist(), prev.tolist(), chg.tolist(), chgP.tolist()
+    hi_l, lo_l = to_opt(hi52), to_opt(lo52)
+
+    results = {}
+    for i, sym in enumerate(syms):
+        if not ok[i]:
+            continue
+        results[sym] = {
+            'symbol': sym,
+            'shortName': short_name(sym),
+            'regularMarketPrice': curr_l[i],
+            'regularMarketChange': chg_l[i],
+            'regularMarketChangePercent': chgP_l[i],
+            'regularMarketPreviousClose': prev_l[i],
+            'fiftyTwoWeekHigh': hi_l[i],
+            'fiftyTwoWeekLow': lo_l[i],
+            'marketCap': None,
         }
-        with open(SAVED_CLOSES_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] 💾 Saved {len(prices)} closing prices to saved_closes.json")
-    except Exception as e:
-        print(f"  ⚠ Error saving closes: {e}")
+    return results
+
+
+def _fetch_yahoo_per_ticker(symbols):
+    """Legacy fan-out: one yf.Ticker per symbol on a thread pool"""
+    results = {}
+    if not symbols or not source_health.is_available('yahoo'):
+        return results
+    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as pool:
+        futures = {pool.submit(_fetch_single_ticker, sym): sym for sym in symbols}
+        for future in concurrent.futures.as_completed(futures, timeout=60):
+            try:
+                sym, data = future.result()
+                if data:
+                    results[sym] = data
+            except:
+                pass
+    return results
+
+
+async def _fetch_yahoo(symbols):
+    """yfinance tier: batch spark requests, per-ticker fallback only for misses
+    (yfinance is blocking, so the fallback runs off the ingest loop)"""
+    if not YAHOO_BATCH_MODE:
+        return await ingest.in_thread(_fetch_yahoo_per_ticker, symbols)
+
+    if not source_health.is_available('yahoo'):
+        return {}
+    results = await _fetch_yahoo_batch(symbols)
+    missing = [s for s in symbols if s not in results]
+    if missing:
+        print(f"  ↻ Yahoo batch missed {len(missing)} symbols — falling back per ticker")
+        results.update(await ingest.in_thread(_fetch_yahoo_per_ticker, missing))
+    return results
 
 
+# ═══════════════════════════════════════════
+#  SAVED CLOSES (day-over-day tracking)
+# ═══════════════════════════════════════════
+
 def save_market_close():
-    """Save current prices as today's close (called at 3:31 PM IST)"""
-    with cache_lock:
-        live_prices = cache.get('_live_prices', {})
+    """Save current prices as today's close (scheduled just after the session ends)"""
+    live_prices = snapshot.current().live_prices
     if live_prices:
-        _save_closes(live_prices)
+        n = record_closes(live_prices)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 💾 Saved {n} closing prices to the close ledger")
     else:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠ No live prices to save at market close")
+    tick_store.seal_day()
 
 
 def prefill_cache_from_saved_closes():
-    """Pre-populate cache with saved_closes.json so frontend sees data instantly on startup"""
-    saved = _load_saved_closes()
+    """Pre-populate cache with the latest ledger closes so frontend sees data instantly on startup"""
+    date, saved = latest_closes()
     if not saved:
         return 0
 
@@ -188,7 +290,7 @@ def prefill_cache_from_saved_closes():
 
         entry = {
             'symbol': sym,
-            'shortName': sym.replace('.NS', '').replace('=X', '').replace('^', ''),
+            'shortName': short_name(sym),
             'regularMarketPrice': price,
             'regularMarketPreviousClose': price,
             'regularMarketChange': 0,
@@ -214,158 +316,237 @@ def prefill_cache_from_saved_closes():
         elif sym in NIFTY50_SYMBOLS:
             quotes[sym] = entry
 
-    with cache_lock:
-        cache['quotes'] = quotes
-        cache['indices'] = indices
-        cache['commodities'] = commodities
-        cache['last_stock_update'] = datetime.now().isoformat()
+    snapshot.publish(
+        quotes=quotes, indices=indices, commodities=commodities,
+        last_stock_update=datetime.now().isoformat(),
+    )
 
     total = len(quotes) + len(indices) + len(commodities)
-    print(f"  ✓ Pre-filled cache with {total} symbols from saved_closes.json")
+    print(f"  ✓ Pre-filled cache with {total} symbols from {date} closes")
     return total
 
 
+# ═══════════════════════════════════════════
+#  SOURCE TIERS (run concurrently by orchestrator)
+# ═══════════════════════════════════════════
+
+GF_KEY_STOCKS = ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS']
+
+
+def _groww_tier(symbols):
+    """PRIORITY 0: Groww API (indices + any listed stock)"""
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🟢 Fetching from Groww API...")
+    groww_indices, groww_stocks = groww_fetch_all(symbols)
+    if groww_indices:
+        print(f"  ✓ Groww: Got {len(groww_indices)} indices")
+    if groww_stocks:
+        print(f"  ✓ Groww: Got {len(groww_stocks)} stocks")
+    return {**groww_stocks, **groww_indices}
+
+
+async def _upstox_indices_tier():
+    """PRIORITY 1: Upstox index quotes"""
+    upstox_idx = await upstox_fetch_indices()
+    if upstox_idx:
+        print(f"  ✓ Upstox: Got {len(upstox_idx)} indices")
+    return upstox_idx
+
+
+async def _upstox_stocks_tier(symbols):
+    """PRIORITY 1: Upstox stock quotes"""
+    upstox_stk = await upstox_fetch_stocks(symbols)
+    if upstox_stk:
+        print(f"  ✓ Upstox: Got {len(upstox_stk)} stocks")
+    return upstox_stk
+
+
+async def _google_finance_tier(symbols):
+    """PRIORITY 2: Google Finance cross-verification for indices + key stocks"""
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🔍 Verifying via Google Finance...")
+    results = await gf_verify(symbols)
+    for sym, gf_data in results.items():
+        print(f"  ✓ {sym}: Google Finance = {gf_data['regularMarketPrice']} ({gf_data['regularMarketChangePercent']:+.2f}%)")
+    return results
+
+
+def _build_tiers(symbols, tag=''):
+    """Describe every configured source so the orchestrator can start them together.
+    HTTP tiers are coroutine functions (run on the ingest loop); Groww's SDK
+    and the feed snapshot are plain callables (run on the tier pool).
+    Each tier covers the requested symbols its vendor has a key for in the
+    instrument master. Google Finance stays a verifier for indices + key
+    stocks (one page scrape per symbol). `tag` keeps the tier names of a
+    separate pipeline (on-demand) apart from the refresh cycle's."""
+    wanted = set(symbols)
+    upstox_live = upstox_is_configured() and upstox_has_token()
+    feed_live = upstox_feed_is_live()
+    upstox_keyed = set(vendor_keys(wanted, 'upstox'))
+    tiers = []
+
+    if groww_is_configured():
+        groww_syms = set(vendor_keys(wanted, 'groww'))
+        if groww_syms:
+            tiers.append({
+                'name': 'groww' + tag, 'source': 'groww', 'priority': 0, 'fetch': lambda: _groww_tier(groww_syms),
+                'covers': groww_syms,
+            })
+
+    if feed_live:
+        # Streaming ticks are already in memory — no REST round trip needed
+        streamed = upstox_feed_covers() & wanted
+        tiers.append({
+            'name': 'upstox-feed' + tag, 'priority': 1, 'fetch': functools.partial(upstox_feed_latest, streamed),
+            'covers': streamed,
+        })
+    if upstox_live:
+        streamed = upstox_feed_covers() if feed_live else set()
+        idx_syms = (upstox_keyed & _INDEX_SYMBOL_SET) - streamed
+        stock_syms = upstox_keyed - _INDEX_SYMBOL_SET - streamed
+        if idx_syms or stock_syms:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 🏆 Fetching from Upstox API...")
+        if idx_syms:
+            tiers.append({
+                'name': 'upstox-indices' + tag, 'source': 'upstox', 'priority': 1, 'fetch': _upstox_indices_tier,
+                'covers': idx_syms,
+            })
+        if stock_syms:
+            tiers.append({
+                'name': 'upstox-stocks' + tag, 'source': 'upstox', 'priority': 1,
+                'fetch': functools.partial(_upstox_stocks_tier, stock_syms),
+                'covers': stock_syms,
+            })
+    elif upstox_is_configured():
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠ Upstox configured but no token. Login at http://localhost:5000/upstox/login")
+
+    gf_symbols = [
+        sym for sym in list(INDEX_SYMBOLS.values()) + GF_KEY_STOCKS
+        if sym in wanted and not ((upstox_live or feed_live) and sym in upstox_keyed)
+    ]
+    if gf_symbols:
+        tiers.append({
+            'name': 'google_finance' + tag, 'source': 'google_finance', 'priority': 2,
+            'fetch': functools.partial(_google_finance_tier, gf_symbols),
+            'covers': set(gf_symbols),
+        })
+
+    tiers.append({
+        'name': 'yfinance' + tag, 'source': 'yahoo', 'priority': 3, 'fetch': functools.partial(_fetch_yahoo, symbols),
+        'covers': wanted,
+    })
+    return tiers
+
+
 # ═══════════════════════════════════════════
 #  MAIN FETCH PIPELINE
 # ═══════════════════════════════════════════
 
-def fetch_stock_data():
-    """Fetch all stock quotes using the priority pipeline"""
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] 📈 Fetching stock data...")
-    start = time.time()
+ALL_SYMBOLS = NIFTY50_SYMBOLS + list(INDEX_SYMBOLS.values()) + list(COMMODITY_SYMBOLS.keys())
+_INDEX_SYMBOL_SET = set(INDEX_SYMBOLS.values())
+
+
+def _publish_results(results):
+    """Apply day-over-day closes and merge fetched quotes into the snapshot
+    → (stocks, indices, commodities) counts"""
+    # ── DAY-OVER-DAY GAIN/LOSS ──
+    saved_closes = previous_closes()
+    if saved_closes:
+        applied = 0
+        for sym, data in results.items():
+            if sym in saved_closes and saved_closes[sym] > 0:
+                prev = saved_closes[sym]
+                curr = data.get('regularMarketPrice', 0)
+                if curr > 0:
+                    chg = round(curr - prev, 2)
+                    chgP = round((chg / prev * 100), 2) if prev else 0
+                    data['regularMarketPreviousClose'] = prev
+                    data['regularMarketChange'] = chg
+                    data['regularMarketChangePercent'] = chgP
+                    applied += 1
+        if applied > 0:
+            print(f"  📊 Applied saved closes for {applied} symbols")
+
+    # Separate into stocks (NIFTY 50 + on-demand symbols), indices, commodities
+    quotes = {}
+    for sym, data in results.items():
+        if sym not in _INDEX_SYMBOL_SET and sym not in COMMODITY_SYMBOLS:
+            quotes[sym] = data
 
-    all_symbols = NIFTY50_SYMBOLS + list(INDEX_SYMBOLS.values()) + list(COMMODITY_SYMBOLS.keys())
+    indices = {}
+    for name, sym in INDEX_SYMBOLS.items():
+        if sym in results:
+            d = results[sym]
+            indices[name] = {
+                'val': d['regularMarketPrice'],
+                'prev': d['regularMarketPreviousClose'],
+                'chg': d['regularMarketChange'],
+                'chgP': d['regularMarketChangePercent'],
+            }
 
-    try:
-        results = {}
-        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as pool:
-            futures = {pool.submit(_fetch_single_ticker, sym): sym for sym in all_symbols}
-            for future in concurrent.futures.as_completed(futures, timeout=60):
-                try:
-                    sym, data = future.result()
-                    if data:
-                        results[sym] = data
-                except:
-                    pass
-
-        # ── PRIORITY 0: Groww API ──
-        if groww_is_configured():
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] 🟢 Fetching from Groww API...")
-            groww_indices, groww_stocks = groww_fetch_all()
-            if groww_indices:
-                for sym, data in groww_indices.items():
-                    results[sym] = {**results.get(sym, {}), **data}
-                print(f"  ✓ Groww: Got {len(groww_indices)} indices")
-            if groww_stocks:
-                for sym, data in groww_stocks.items():
-                    results[sym] = {**results.get(sym, {}), **data}
-                print(f"  ✓ Groww: Got {len(groww_stocks)} stocks")
-
-        # ── PRIORITY 1: Upstox API ──
-        if upstox_is_configured() and upstox_has_token():
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] 🏆 Fetching from Upstox API...")
-            upstox_idx = upstox_fetch_indices()
-            upstox_stk = upstox_fetch_stocks()
-            if upstox_idx:
-                for sym, data in upstox_idx.items():
-                    results[sym] = {**results.get(sym, {}), **data}
-                print(f"  ✓ Upstox: Got {len(upstox_idx)} indices")
-            if upstox_stk:
-                for sym, data in upstox_stk.items():
-                    results[sym] = {**results.get(sym, {}), **data}
-                print(f"  ✓ Upstox: Got {len(upstox_stk)} stocks")
-        elif upstox_is_configured():
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠ Upstox configured but no token. Login at http://localhost:5000/upstox/login")
-
-        # ── PRIORITY 2: Google Finance (cross-verification for indices) ──
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] 🔍 Verifying indices via Google Finance...")
-        for name, sym in INDEX_SYMBOLS.items():
-            gf_data = _fetch_from_google_finance(sym)
-            if gf_data:
-                print(f"  ✓ {name}: Google Finance = {gf_data['regularMarketPrice']} ({gf_data['regularMarketChangePercent']:+.2f}%)")
-                yf_data = results.get(sym)
-                if not yf_data:
-                    results[sym] = gf_data
-                elif sym not in [v for v in (upstox_idx if upstox_is_configured() and upstox_has_token() else {})]:
-                    yf_dir = yf_data['regularMarketChange'] >= 0
-                    gf_dir = gf_data['regularMarketChange'] >= 0
-                    if yf_dir != gf_dir:
-                        print(f"  ⚠ {name}: Direction mismatch! → Using Google Finance")
-                        results[sym] = {**yf_data, **gf_data}
-                    else:
-                        results[sym]['regularMarketPreviousClose'] = gf_data['regularMarketPreviousClose']
-                        results[sym]['regularMarketChange'] = gf_data['regularMarketChange']
-                        results[sym]['regularMarketChangePercent'] = gf_data['regularMarketChangePercent']
-                        results[sym]['regularMarketPrice'] = gf_data['regularMarketPrice']
-
-        # Verify top stocks
-        key_stocks = ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS']
-        for sym in key_stocks:
-            if upstox_is_configured() and upstox_has_token() and sym in UPSTOX_STOCK_MAP:
-                continue
-            gf_data = _fetch_from_google_finance(sym)
-            if gf_data and sym in results:
-                results[sym]['regularMarketPrice'] = gf_data['regularMarketPrice']
-                results[sym]['regularMarketPreviousClose'] = gf_data['regularMarketPreviousClose']
-                results[sym]['regularMarketChange'] = gf_data['regularMarketChange']
-                results[sym]['regularMarketChangePercent'] = gf_data['regularMarketChangePercent']
-
-        # ── DAY-OVER-DAY GAIN/LOSS ──
-        saved_closes = _load_saved_closes()
-        if saved_closes:
-            applied = 0
-            for sym, data in results.items():
-                if sym in saved_closes and saved_closes[sym] > 0:
-                    prev = saved_closes[sym]
-                    curr = data.get('regularMarketPrice', 0)
-                    if curr > 0:
-                        chg = round(curr - prev, 2)
-                        chgP = round((chg / prev * 100), 2) if prev else 0
-                        data['regularMarketPreviousClose'] = prev
-                        data['regularMarketChange'] = chg
-                        data['regularMarketChangePercent'] = chgP
-                        applied += 1
-            if applied > 0:
-                print(f"  📊 Applied saved closes for {applied} symbols")
-
-        # Separate into stocks, indices, commodities
-        quotes = {}
-        for sym in NIFTY50_SYMBOLS:
-            if sym in results:
-                quotes[sym] = results[sym]
-
-        indices = {}
-        for name, sym in INDEX_SYMBOLS.items():
-            if sym in results:
-                d = results[sym]
-                indices[name] = {
-                    'val': d['regularMarketPrice'],
-                    'prev': d['regularMarketPreviousClose'],
-                    'chg': d['regularMarketChange'],
-                    'chgP': d['regularMarketChangePercent'],
-                }
+    commodities = {}
+    for sym, cname in COMMODITY_SYMBOLS.items():
+        if sym in results:
+            d = results[sym]
+            commodities[sym] = {
+                'name': cname,
+                'val': d['regularMarketPrice'],
+                'chg': d['regularMarketChange'],
+                'chgP': d['regularMarketChangePercent'],
+            }
 
-        commodities = {}
-        for sym, cname in COMMODITY_SYMBOLS.items():
-            if sym in results:
-                d = results[sym]
-                commodities[sym] = {
-                    'name': cname,
-                    'val': d['regularMarketPrice'],
-                    'chg': d['regularMarketChange'],
-                    'chgP': d['regularMarketChangePercent'],
-                }
+    live_prices = {sym: data.get('regularMarketPrice', 0) for sym, data in results.items()}
+
+    def build(snap):
+        # Partial refreshes only replace the symbols they fetched
+        sections = {
+            'quotes': {**snap.quotes, **quotes},
+            'indices': {**snap.indices, **indices},
+            'live_prices': {**snap.live_prices, **live_prices},
+        }
+        if upstox_feed_is_live():
+            # Ticks that streamed in during this cycle are fresher than our merge
+            sections = merge_ticks(sections['quotes'], sections['indices'], sections['live_prices'], upstox_feed_latest())
+        return {
+            **sections,
+            'commodities': {**snap.commodities, **commodities},
+            'last_stock_update': datetime.now().isoformat(),
+        }
+
+    snapshot.update(build)
+    return len(quotes), len(indices), len(commodities)
+
+
+def fetch_stock_data(symbols=None):
+    """Fetch quotes for `symbols` (default: everything) using the priority pipeline.
+    Results are merged into the snapshot; returns {symbol: quote} fetched."""
+    symbols = list(symbols) if symbols else ALL_SYMBOLS
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] 📈 Fetching stock data ({len(symbols)} symbols)...")
+    start = time.time()
+    results = {}
 
-        with cache_lock:
-            cache['quotes'] = quotes
-            cache['indices'] = indices
-            cache['commodities'] = commodities
-            cache['last_stock_update'] = datetime.now().isoformat()
-            cache['_live_prices'] = {sym: data.get('regularMarketPrice', 0) for sym, data in results.items()}
+    try:
+        results, _ = run_tiers(_build_tiers(symbols), symbols, FETCH_CYCLE_DEADLINE)
+        n_stocks, n_indices, n_commodities = _publish_results(results)
 
         elapsed = time.time() - start
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ Got {len(quotes)} stocks, {len(indices)} indices, {len(commodities)} commodities in {elapsed:.1f}s")
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ Got {n_stocks} stocks, {n_indices} indices, {n_commodities} commodities in {elapsed:.1f}s")
 
     except Exception as e:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ Stock fetch error: {e}")
         traceback.print_exc()
+
+    return results
+
+
+def fetch_on_demand(symbols):
+    """Fetch symbols outside the configured universe through the same tiers
+    (Groww/Upstox know every listed share via the instrument master) →
+    {symbol: quote} published"""
+    symbols = list(symbols)
+    try:
+        results, _ = run_tiers(_build_tiers(symbols, tag=':on-demand'), symbols, FETCH_CYCLE_DEADLINE)
+        if results:
+            _publish_results(results)
+        return results
+    except Exception as e:
+        print(f"  ⚠ On-demand fetch error ({', '.join(symbols)}): {e}")
+        return {}
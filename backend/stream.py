@@ -0,0 +1,208 @@
+"""
+BHARAT TERMINAL — Server-Sent Events Push
+/api/stream?symbols=RELIANCE.NS,^NSEI&topics=quotes,indices,commodities,news
+
+Every snapshot publish appends ONE change record to a shared ring and wakes
+all streams (a single notify_all). Each client then filters the change to
+its own symbols/topics. Quote bodies reuse the per-symbol JSON fragments
+rendered once per version for /api/quote. A slow client that wakes up
+behind several records gets them coalesced into one message (latest value
+wins). A client that fell off the ring gets a full resync.
+"""
+
+import time
+import threading
+from collections import deque
+
+from .config import INDEX_SYMBOLS
+from .responses import dumps, quote_fragments
+from . import snapshot
+
+
+STREAM_TOPICS = ('quotes', 'indices', 'commodities', 'news')
+STREAM_RING_SIZE = 256      # change records kept for lagging clients
+STREAM_HEARTBEAT = 15       # seconds between keep-alive comments
+STREAM_MAX_CLIENTS = 200
+
+_ring = deque(maxlen=STREAM_RING_SIZE)  # (seq, change, snapshot)
+_seq = 0
+_cond = threading.Condition()
+_clients = {'count': 0}
+_closed = object()          # close_stream(): marks a token that was already released
+_subscriptions = {}  # per-open-stream token → subscribed symbol set (None = all)
+
+
+def _diff(old, new):
+    """What changed between two snapshots, keyed the way clients subscribe"""
+    idx_sym = INDEX_SYMBOLS
+    quotes = {s for s, q in new.quotes.items() if old.quotes.get(s) != q}
+    indices = {n for n, v in new.indices.items() if old.indices.get(n) != v}
+    commodities = {s for s, v in new.commodities.items() if old.commodities.get(s) != v}
+    # Index and commodity symbols are quotable too (same as /api/quote)
+    quotes |= {idx_sym[n] for n in indices if n in idx_sym}
+    quotes |= commodities
+    news = None
+    if new.news is not old.news:
+        seen = {a.get('link') or a.get('title') for a in old.news}
+        news = [a for a in new.news if (a.get('link') or a.get('title')) not in seen]
+    return {'quotes': quotes, 'indices': indices, 'commodities': commodities, 'news': news}
+
+
+def _on_publish(old, new):
+    global _seq
+    change = _diff(old, new)
+    if not (change['quotes'] or change['indices'] or change['commodities'] or change['news']):
+        return
+    with _cond:
+        _seq += 1
+        _ring.append((_seq, change, new))
+        _cond.notify_all()
+
+
+snapshot.on_publish(_on_publish)
+
+
+def _wait(cursor, timeout):
+    """Block until records past `cursor` exist → (records, new cursor, reset?)"""
+    with _cond:
+        _cond.wait_for(lambda: _seq > cursor, timeout=timeout)
+        if _seq <= cursor:
+            return [], cursor, False
+        if not _ring or _ring[0][0] > cursor + 1:
+            return [], _seq, True
+        records = [r for r in _ring if r[0] > cursor]
+        return records, _seq, False
+
+
+def _coalesce(records):
+    """Merge several change records into one (latest snapshot wins)"""
+    merged = {'quotes': set(), 'indices': set(), 'commodities': set(), 'news': []}
+    for _, change, _snap in records:
+        merged['quotes'] |= change['quotes']
+        merged['indices'] |= change['indices']
+        merged['commodities'] |= change['commodities']
+        if change['news']:
+            merged['news'].extend(change['news'])
+    return merged, records[-1][2]
+
+
+def _full_change(snap):
+    quotes = set(snap.quotes) | set(snap.commodities)
+    quotes |= {INDEX_SYMBOLS[n] for n in snap.indices if n in INDEX_SYMBOLS}
+    return {
+        'quotes': quotes, 'indices': set(snap.indices),
+        'commodities': set(snap.commodities), 'news': list(snap.news),
+    }
+
+
+def _event(name, body):
+    return b'event: ' + name.encode() + b'\ndata: ' + body + b'\n\n'
+
+
+def _render(change, snap, symbols, topics):
+    """SSE bytes for one client's slice of a change"""
+    out = []
+    version = str(snap.version).encode()
+
+    if 'quotes' in topics:
+        wanted = change['quotes'] if symbols is None else change['quotes'] & symbols
+        if wanted:
+            _, by_symbol, _ = quote_fragments(snap)
+            parts = [by_symbol[s] for s in wanted if s in by_symbol]
+            if parts:
+                out.append(_event('quotes', b'{"version":' + version + b',"result":[' + b','.join(parts) + b']}'))
+
+    if 'indices' in topics and change['indices']:
+        out.append(_event('indices', dumps({
+            'version': snap.version,
+            'indices': {n: snap.indices[n] for n in change['indices'] if n in snap.indices},
+        })))
+
+    if 'commodities' in topics and change['commodities']:
+        out.append(_event('commodities', dumps({
+            'version': snap.version,
+            'commodities': [
+                {'symbol': s, 'name': d['name'], 'price': d['val'], 'change': d['chg'], 'changePercent': d['chgP']}
+                for s, d in snap.commodities.items() if s in change['commodities']
+            ],
+        })))
+
+    if 'news' in topics and change['news']:
+        out.append(_event('news', dumps({
+            'version': snap.version,
+            'articles': change['news'],
+            'lastUpdate': snap.last_news_update,
+        })))
+
+    return b''.join(out)
+
+
+def parse_subscription(symbols_arg, topics_arg):
+    """Query args → (symbol set or None for all, topic set)"""
+    symbols = {s.strip() for s in (symbols_arg or '').split(',') if s.strip()} or None
+    topics = {t.strip() for t in (topics_arg or '').split(',') if t.strip() in STREAM_TOPICS}
+    return symbols, topics or set(STREAM_TOPICS)
+
+
+def open_stream(symbols):
+    """Reserve one of STREAM_MAX_CLIENTS slots → token, or None when full.
+    Checked and taken under one lock, so concurrent connects cannot overshoot."""
+    with _cond:
+        if _clients['count'] >= STREAM_MAX_CLIENTS:
+            return None
+        token = object()
+        _clients['count'] += 1
+        _subscriptions[token] = symbols
+        return token
+
+
+def close_stream(token):
+    """Give a slot back (idempotent: the generator and the response both call it)"""
+    with _cond:
+        if _subscriptions.pop(token, _closed) is not _closed:
+            _clients['count'] -= 1
+
+
+def stream_client_count():
+    return _clients['count']
+
+
+def stream_symbols():
+    """Symbols that open streams explicitly subscribed to"""
+    with _cond:
+        subs = list(_subscriptions.values())
+    return set().union(*(s for s in subs if s))
+
+
+def event_stream(token, topics):
+    """Generator of SSE bytes for the client holding `token` until it disconnects"""
+    with _cond:
+        symbols = _subscriptions.get(token)
+    try:
+        with _cond:
+            cursor = _seq
+        snap = snapshot.current()
+        yield b'retry: 3000\n\n'
+        yield _render(_full_change(snap), snap, symbols, topics) or b': ready\n\n'
+
+        last_sent = time.time()
+        while True:
+            timeout = max(0.0, STREAM_HEARTBEAT - (time.time() - last_sent))
+            records, cursor, reset = _wait(cursor, timeout)
+            if reset:
+                snap = snapshot.current()
+                body = _render(_full_change(snap), snap, symbols, topics)
+            elif records:
+                change, snap = _coalesce(records)
+                body = _render(change, snap, symbols, topics)
+            else:
+                body = b''
+
+            if body:
+                yield body
+                last_sent = time.time()
+            elif time.time() - last_sent >= STREAM_HEARTBEAT:
+                yield b': ping\n\n'
+                last_sent = time.time()
+    finally:
+        close_stream(token)
@@ -0,0 +1,415 @@
+"""
+BHARAT TERMINAL — On-Disk Tick Store
+Append-only, columnar intraday history that survives restarts.
+
+Layout under ticks/ (one set per trading day):
+  YYYY-MM-DD.wal   today's append-only log of fixed-width records
+                   (ts ms int64, symbol id uint16, price f8, volume f8)
+  YYYY-MM-DD.syms  symbol id → name for the .wal, one name per line
+  YYYY-MM-DD.cols  sealed day: header + columns sorted by (symbol, ts)
+                   ts_delta int32 ms, sym_id uint16, price f8, volume f8
+
+A sealed day has a per-symbol index {sym: [start row, count, base ts ms]},
+so a symbol's prices/volumes for that day are zero-copy NumPy views over
+the mmap. Timestamps are delta-encoded and rebuilt with one cumsum.
+
+Days are IST trading dates. A day sealed early (a manual close save
+mid-session) keeps recording to a new WAL, and sealing again merges it
+with the rows already sealed. Publishes only queue their ticks; the disk
+writes happen on the 'tick-writer' thread, outside the snapshot lock.
+"""
+
+import os
+import json
+import mmap
+import time
+import queue
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from .config import BASE_DIR
+from .market_calendar import IST
+from . import snapshot
+from . import history
+
+
+TICK_STORE_DIR = os.path.join(BASE_DIR, 'ticks')
+COLS_MAGIC = b'BTCOLS01'
+OPEN_DAY_CACHE = 16  # sealed days kept mapped
+
+WAL_DTYPE = np.dtype([('ts', '<i8'), ('sym', '<u2'), ('px', '<f8'), ('vol', '<f8')])
+COLUMNS = (('ts', '<i4'), ('sym', '<u2'), ('px', '<f8'), ('vol', '<f8'))
+
+_lock = threading.Lock()
+_wal = {'day': None, 'fh': None, 'syms': {}, 'syms_fh': None}
+_mapped = {}  # day → (mmap, header, file)
+_pending = queue.Queue()  # (epoch seconds, rows) from publishes, written by the 'tick-writer' thread
+_writer = {'thread': None}
+
+
+def _day(ts=None):
+    """IST trading date of epoch seconds `ts` (default now) — the day files are named by"""
+    return datetime.fromtimestamp(ts if ts is not None else time.time(), IST).strftime('%Y-%m-%d')
+
+
+def _today():
+    return _day()
+
+
+def _path(day, ext):
+    return os.path.join(TICK_STORE_DIR, f'{day}.{ext}')
+
+
+def _days_on_disk():
+    if not os.path.isdir(TICK_STORE_DIR):
+        return []
+    days = {name.split('.')[0] for name in os.listdir(TICK_STORE_DIR)
+            if name.endswith('.cols') or name.endswith('.wal')}
+    return sorted(days)
+
+
+# ═══════════════════════════════════════════
+#  WRITE PATH (today's WAL)
+# ═══════════════════════════════════════════
+
+def _read_syms(day):
+    try:
+        with open(_path(day, 'syms'), 'r') as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _open_wal(day):
+    """Switch the writer to `day`, sealing the previous day's WAL"""
+    prev = _wal['day']
+    for key in ('fh', 'syms_fh'):
+        if _wal[key]:
+            _wal[key].close()
+            _wal[key] = None
+    if prev and prev != day:
+        _seal_locked(prev)
+
+    os.makedirs(TICK_STORE_DIR, exist_ok=True)
+    _wal['day'] = day
+    _wal['syms'] = {name: i for i, name in enumerate(_read_syms(day))}
+    # Drop a torn trailing record left by a crash mid-write
+    wal_path = _path(day, 'wal')
+    if os.path.exists(wal_path):
+        size = os.path.getsize(wal_path)
+        if size % WAL_DTYPE.itemsize:
+            with open(wal_path, 'r+b') as f:
+                f.truncate(size - size % WAL_DTYPE.itemsize)
+    _wal['fh'] = open(wal_path, 'ab')
+    _wal['syms_fh'] = open(_path(day, 'syms'), 'a')
+
+
+def append(rows, ts=None):
+    """Append {symbol: (price, volume)} ticks at epoch seconds `ts` (default now)"""
+    if not rows:
+        return
+    ts = ts if ts is not None else time.time()
+    ts_ms = int(ts * 1000)
+    day = _day(ts)
+    with _lock:
+        if _wal['day'] != day:
+            _open_wal(day)
+        syms = _wal['syms']
+        records = np.zeros(len(rows), dtype=WAL_DTYPE)
+        for i, (sym, (price, volume)) in enumerate(rows.items()):
+            sid = syms.get(sym)
+            if sid is None:
+                sid = syms[sym] = len(syms)
+                _wal['syms_fh'].write(sym + '\n')
+                _wal['syms_fh'].flush()
+            records[i] = (ts_ms, sid, price, volume or 0)
+        _wal['fh'].write(records.tobytes())
+        _wal['fh'].flush()
+
+
+def _on_publish(old, new):
+    """Runs under the snapshot writer lock: only collect the ticks, the
+    tick-writer thread does the disk I/O"""
+    if new.live_prices is old.live_prices:
+        return
+    rows = {}
+    for sym, price in new.live_prices.items():
+        if price and price > 0 and old.live_prices.get(sym) != price:
+            q = new.quotes.get(sym) or {}
+            rows[sym] = (float(price), float(q.get('regularMarketVolume') or 0))
+    if rows:
+        _pending.put((time.time(), rows))
+
+
+def _write_loop():
+    while True:
+        ts, rows = _pending.get()
+        try:
+            append(rows, ts)
+        except Exception as e:
+            print(f"  ⚠ Tick store write error: {e}")
+        finally:
+            _pending.task_done()
+
+
+def _start_writer():
+    if _writer['thread'] is None:
+        _writer['thread'] = threading.Thread(target=_write_loop, name='tick-writer', daemon=True)
+        _writer['thread'].start()
+
+
+def flush():
+    """Wait until every published tick is in the WAL"""
+    if _writer['thread'] is not None:
+        _pending.join()
+
+
+# ═══════════════════════════════════════════
+#  SEALING (WAL → sorted columnar file)
+# ═══════════════════════════════════════════
+
+def _load_wal(day):
+    path = _path(day, 'wal')
+    if not os.path.exists(path) or os.path.getsize(path) < WAL_DTYPE.itemsize:
+        return np.zeros(0, dtype=WAL_DTYPE)
+    n = os.path.getsize(path) // WAL_DTYPE.itemsize
+    return np.memmap(path, dtype=WAL_DTYPE, mode='r', shape=(n,))
+
+
+def _sealed_rows(day):
+    """A day's columnar file decoded back to WAL records (copied) + its symbol names"""
+    entry = _open_day(day)
+    if not entry:
+        return np.zeros(0, dtype=WAL_DTYPE), []
+    mm, header, _ = entry
+    rows = np.zeros(header['rows'], dtype=WAL_DTYPE)
+    for name in ('sym', 'px', 'vol'):
+        rows[name] = _column(mm, header, name, 0, header['rows'])
+    for start, count, base in header['index'].values():
+        rows['ts'][start:start + count] = base + np.cumsum(
+            _column(mm, header, 'ts', start, count), dtype=np.int64)
+    return rows, header['symbols']
+
+
+def _unmap(day):
+    """Forget a day's mapping before its file is replaced"""
+    entry = _mapped.pop(day, None)
+    if entry:
+        mm, _, f = entry
+        try:
+            mm.close()
+        except BufferError:
+            pass  # views still out; GC closes it once they are gone
+        f.close()
+
+
+def _day_rows(day):
+    """Everything recorded for a day: rows already sealed (a manual save
+    mid-session seals early) + the WAL since → (records, symbol names)"""
+    wal = np.array(_load_wal(day))  # a copy: the WAL may be deleted next
+    names = _read_syms(day)
+    sealed, sealed_names = _sealed_rows(day)
+    if not len(sealed):
+        return wal, names
+    ids = {name: i for i, name in enumerate(sealed_names)}
+    for name in names:
+        ids.setdefault(name, len(ids))
+    if len(wal):
+        wal['sym'] = np.array([ids[name] for name in names], dtype='<u2')[wal['sym']]
+    return np.concatenate([sealed, wal]), list(ids)
+
+
+def _seal_locked(day):
+    if len(_load_wal(day)) == 0:
+        for ext in ('wal', 'syms'):
+            if os.path.exists(_path(day, ext)):
+                os.remove(_path(day, ext))
+        return False
+
+    wal, names = _day_rows(day)
+    order = np.lexsort((wal['ts'], wal['sym']))
+    rows = wal[order]
+    sym_ids, starts, counts = np.unique(rows['sym'], return_index=True, return_counts=True)
+
+    # Delta-encode timestamps within each symbol segment
+    deltas = np.diff(rows['ts'], prepend=rows['ts'][0])
+    deltas[starts] = 0
+    index = {names[sid]: [int(start), int(count), int(rows['ts'][start])]
+             for sid, start, count in zip(sym_ids, starts, counts)}
+
+    columns = {
+        'ts': deltas.astype('<i4'),
+        'sym': rows['sym'].astype('<u2'),
+        'px': rows['px'].astype('<f8'),
+        'vol': rows['vol'].astype('<f8'),
+    }
+
+    header = {'day': day, 'rows': int(len(rows)), 'symbols': names, 'index': index, 'offsets': {}}
+    # Offsets depend on the header length, so size the header with placeholders first
+    header_len = len(json.dumps({**header, 'offsets': {name: 10 ** 12 for name, _ in COLUMNS}}).encode())
+    pos = _align(len(COLS_MAGIC) + 4 + header_len)
+    for name, dtype in COLUMNS:
+        header['offsets'][name] = pos
+        pos = _align(pos + len(rows) * np.dtype(dtype).itemsize)
+    header_bytes = json.dumps(header).encode().ljust(header_len)
+
+    tmp = _path(day, 'cols.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(COLS_MAGIC + len(header_bytes).to_bytes(4, 'little') + header_bytes)
+        for name, _ in COLUMNS:
+            f.seek(header['offsets'][name])
+            f.write(columns[name].tobytes())
+        f.truncate(pos)
+    _unmap(day)
+    os.replace(tmp, _path(day, 'cols'))
+
+    for ext in ('wal', 'syms'):
+        if os.path.exists(_path(day, ext)):
+            os.remove(_path(day, ext))
+    print(f"  💾 Sealed tick store {day}: {len(rows)} ticks, {len(index)} symbols")
+    return True
+
+
+def _align(n, to=8):
+    return (n + to - 1) // to * to
+
+
+def seal_day(day=None):
+    """Seal a day's WAL into its columnar file (today's by default)"""
+    day = day or _today()
+    flush()
+    with _lock:
+        if _wal['day'] == day:
+            for key in ('fh', 'syms_fh'):
+                if _wal[key]:
+                    _wal[key].close()
+                    _wal[key] = None
+            _wal['day'] = None
+        return _seal_locked(day)
+
+
+def seal_stale_days():
+    """Seal WALs left behind by earlier sessions (called at startup)"""
+    today = _today()
+    sealed = 0
+    for day in _days_on_disk():
+        if day != today and os.path.exists(_path(day, 'wal')):
+            with _lock:
+                sealed += bool(_seal_locked(day))
+    return sealed
+
+
+# ═══════════════════════════════════════════
+#  READ PATH
+# ═══════════════════════════════════════════
+
+def _open_day(day):
+    entry = _mapped.get(day)
+    if entry:
+        return entry
+    path = _path(day, 'cols')
+    if not os.path.exists(path):
+        return None
+    f = open(path, 'rb')
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(COLS_MAGIC)] != COLS_MAGIC:
+        mm.close()
+        f.close()
+        return None
+    header_len = int.from_bytes(mm[len(COLS_MAGIC):len(COLS_MAGIC) + 4], 'little')
+    start = len(COLS_MAGIC) + 4
+    header = json.loads(mm[start:start + header_len])
+    if len(_mapped) >= OPEN_DAY_CACHE:
+        old_day = next(iter(_mapped))
+        _mapped.pop(old_day)  # the mmap is closed by GC once no views refer to it
+    entry = _mapped[day] = (mm, header, f)
+    return entry
+
+
+def _column(mm, header, name, start, count):
+    dtype = dict(COLUMNS)[name]
+    offset = header['offsets'][name] + start * np.dtype(dtype).itemsize
+    return np.frombuffer(mm, dtype=dtype, count=count, offset=offset)
+
+
+def day_series(sym, day):
+    """(ts ms, price view, volume view) for one symbol on one sealed day, or None"""
+    entry = _open_day(day)
+    if not entry:
+        return None
+    mm, header, _ = entry
+    seg = header['index'].get(sym)
+    if not seg:
+        return None
+    start, count, base = seg
+    ts = base + np.cumsum(_column(mm, header, 'ts', start, count), dtype=np.int64)
+    return ts, _column(mm, header, 'px', start, count), _column(mm, header, 'vol', start, count)
+
+
+def sealed_days():
+    return [d for d in _days_on_disk() if os.path.exists(_path(d, 'cols'))]
+
+
+def query(sym, days):
+    """Per-day (ts ms, price, volume) segments for the last `days` sealed days before today"""
+    past = [d for d in sealed_days() if d < _today()]
+    segments = []
+    for day in past[-days:] if days > 0 else []:
+        seg = day_series(sym, day)
+        if seg is not None:
+            segments.append(seg)
+    return segments
+
+
+def today_rows():
+    """Today's ticks — sealed earlier today, then the WAL — → {symbol: (ts ms, price, volume)}"""
+    with _lock:
+        wal, names = _day_rows(_today())
+    out = {}
+    if len(wal) == 0:
+        return out
+    order = np.lexsort((wal['ts'], wal['sym']))
+    rows = wal[order]
+    sym_ids, starts, counts = np.unique(rows['sym'], return_index=True, return_counts=True)
+    for sid, start, count in zip(sym_ids, starts, counts):
+        if sid < len(names):
+            seg = rows[start:start + count]
+            out[names[sid]] = (seg['ts'], seg['px'], seg['vol'])
+    return out
+
+
+def backfill_history():
+    """Reload today's ticks into the in-memory ring buffers after a restart"""
+    loaded = 0
+    for sym, (ts_ms, px, _) in today_rows().items():
+        history.backfill(sym, ts_ms // 1000, px)
+        loaded += len(ts_ms)
+    return loaded
+
+
+def series(sym, days=1, since=None):
+    """(epoch second, price) over `days` trading days: sealed past days + today's ring"""
+    parts_ts, parts_px = [], []
+    for ts_ms, px, _ in query(sym, days - 1):
+        parts_ts.append(ts_ms // 1000)
+        parts_px.append(px)
+    # The ring can still hold a day that was sealed while the process kept running
+    ts, px = history.series(sym, parts_ts[-1][-1] + 1 if parts_ts else None)
+    parts_ts.append(ts)
+    parts_px.append(px)
+    ts, px = np.concatenate(parts_ts), np.concatenate(parts_px)
+    if since is not None:
+        start = np.searchsorted(ts, since, side='left')
+        ts, px = ts[start:], px[start:]
+    return ts, px
+
+
+def start_tick_store():
+    """Seal leftover WALs, reload today's ticks, then start recording publishes"""
+    sealed = seal_stale_days()
+    loaded = backfill_history()
+    _start_writer()
+    snapshot.on_publish(_on_publish)
+    return sealed, loaded
@@ -1,16 +1,21 @@
 """
 BHARAT TERMINAL — Upstox API Integration
+Instrument keys come from the instrument master, so any listed symbol can be
+quoted; quotes are requested in batches of UPSTOX_QUOTE_BATCH keys, all
+batches at once on the ingest loop.
 """
 
 import os
-import requests as req_lib
+import asyncio
 from urllib.parse import quote
 from datetime import datetime
 
 from .config import (
     UPSTOX_API_KEY, UPSTOX_API_SECRET, UPSTOX_REDIRECT_URI,
-    UPSTOX_BASE_URL, UPSTOX_INDEX_KEYS, UPSTOX_STOCK_MAP,
+    UPSTOX_BASE_URL, UPSTOX_QUOTE_BATCH, INDEX_SYMBOLS,
 )
+from . import ingest
+from .instruments import vendor_keys, from_vendor, short_name
 import backend.config as cfg
 
 
@@ -25,11 +30,8 @@ def upstox_has_token():
     return bool(cfg.UPSTOX_ACCESS_TOKEN)
 
 
-def upstox_fetch_quotes(instrument_keys):
-    """Fetch market quotes from Upstox API"""
-    if not upstox_has_token():
-        return None
-
+async def _fetch_quote_batch(instrument_keys):
+    """One /market-quote/quotes call → {response key: quote}, or None"""
     try:
         keys_param = ','.join(instrument_keys)
         url = f'{UPSTOX_BASE_URL}/market-quote/quotes?instrument_key={quote(keys_param)}'
@@ -38,7 +40,7 @@ def upstox_fetch_quotes(instrument_keys):
             'Accept': 'application/json',
             'Authorization': f'Bearer {cfg.UPSTOX_ACCESS_TOKEN}',
         }
-        r = req_lib.get(url, headers=headers, timeout=10)
+        r = await ingest.get('upstox', url, headers=headers)
         if r.status_code == 200:
             data = r.json()
             if data.get('status') == 'success':
@@ -51,79 +53,65 @@ def upstox_fetch_quotes(instrument_keys):
     return None
 
 
-def upstox_fetch_indices():
-    """Fetch index data from Upstox API"""
+async def upstox_fetch_quotes(instrument_keys):
+    """Fetch market quotes from Upstox API → {instrument key: quote}, or None"""
     if not upstox_has_token():
-        return {}
+        return None
 
-    keys = list(UPSTOX_INDEX_KEYS.values())
-    data = upstox_fetch_quotes(keys)
+    keys = list(instrument_keys)
+    batches = await asyncio.gather(*(
+        _fetch_quote_batch(keys[i:i + UPSTOX_QUOTE_BATCH]) for i in range(0, len(keys), UPSTOX_QUOTE_BATCH)
+    ))
+    data = None
+    for batch in batches:
+        if batch is None:
+            continue
+        data = data or {}
+        # Responses are keyed 'NSE_EQ:RELIANCE'; instrument_token carries the request key
+        for resp_key, q in batch.items():
+            data[q.get('instrument_token') or resp_key.replace(':', '|')] = q
+    return data
+
+
+def _quote_entry(yahoo_sym, q):
+    ltp = q.get('last_price', 0)
+    ohlc = q.get('ohlc', {})
+    prev_close = ohlc.get('close', ltp)
+    net_chg = q.get('net_change', ltp - prev_close)
+    chg_pct = (net_chg / prev_close * 100) if prev_close else 0
+    return {
+        'symbol': yahoo_sym,
+        'shortName': short_name(yahoo_sym),
+        'regularMarketPrice': round(ltp, 2),
+        'regularMarketPreviousClose': round(prev_close, 2),
+        'regularMarketChange': round(net_chg, 2),
+        'regularMarketChangePercent': round(chg_pct, 2),
+    }
+
+
+async def _fetch_symbols(symbols):
+    """{yahoo_sym: quote} for the symbols Upstox has instrument keys for"""
+    keys = vendor_keys(symbols, 'upstox')
+    if not keys or not upstox_has_token():
+        return {}
+    data = await upstox_fetch_quotes(keys.values())
     if not data:
         return {}
 
     results = {}
-    for name, key in UPSTOX_INDEX_KEYS.items():
-        quote_key = key.replace('|', ':')
-        q = data.get(quote_key)
-        if not q:
-            continue
-
-        ltp = q.get('last_price', 0)
-        ohlc = q.get('ohlc', {})
-        prev_close = ohlc.get('close', ltp)
-        net_chg = q.get('net_change', ltp - prev_close)
-        chg_pct = (net_chg / prev_close * 100) if prev_close else 0
-
-        yahoo_sym_map = {
-            'nifty': '^NSEI',
-            'sensex': '^BSESN',
-            'banknifty': '^NSEBANK',
-            'vix': '^INDIAVIX',
-        }
-        yahoo_sym = yahoo_sym_map.get(name, '')
-
-        results[yahoo_sym] = {
-            'symbol': yahoo_sym,
-            'shortName': name.upper(),
-            'regularMarketPrice': round(ltp, 2),
-            'regularMarketPreviousClose': round(prev_close, 2),
-            'regularMarketChange': round(net_chg, 2),
-            'regularMarketChangePercent': round(chg_pct, 2),
-        }
-
+    for key, q in data.items():
+        yahoo_sym = from_vendor('upstox', key)
+        if yahoo_sym in keys:
+            results[yahoo_sym] = _quote_entry(yahoo_sym, q)
     return results
 
 
-def upstox_fetch_stocks():
-    """Fetch stock data from Upstox API for mapped stocks"""
-    if not upstox_has_token():
-        return {}
-
-    keys = list(UPSTOX_STOCK_MAP.values())
-    data = upstox_fetch_quotes(keys)
-    if not data:
-        return {}
-
-    results = {}
-    for yahoo_sym, upstox_key in UPSTOX_STOCK_MAP.items():
-        quote_key = upstox_key.replace('|', ':')
-        q = data.get(quote_key)
-        if not q:
-            continue
+async def upstox_fetch_indices():
+    """Fetch index data from Upstox API"""
+    return await _fetch_symbols(INDEX_SYMBOLS.values())
 
-        ltp = q.get('last_price', 0)
-        ohlc = q.get('ohlc', {})
-        prev_close = ohlc.get('close', ltp)
-        net_chg = q.get('net_change', ltp - prev_close)
-        chg_pct = (net_chg / prev_close * 100) if prev_close else 0
-
-        results[yahoo_sym] = {
-            'symbol': yahoo_sym,
-            'shortName': q.get('symbol', yahoo_sym.replace('.NS', '')),
-            'regularMarketPrice': round(ltp, 2),
-            'regularMarketPreviousClose': round(prev_close, 2),
-            'regularMarketChange': round(net_chg, 2),
-            'regularMarketChangePercent': round(chg_pct, 2),
-        }
 
-    return results
+async def upstox_fetch_stocks(symbols):
+    """Fetch stock quotes from Upstox API for any listed `symbols`"""
+    index_set = set(INDEX_SYMBOLS.values())
+    return await _fetch_symbols([s for s in symbols if s not in index_set])
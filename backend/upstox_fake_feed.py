@@ -0,0 +1,166 @@
+"""
+BHARAT TERMINAL — Fake Upstox Market-Data Feed
+Local WebSocket server that speaks the same protobuf FeedResponse frames as
+Upstox, with random-walk prices for whatever instrument keys the client
+subscribes to. Lets the streaming ingest be exercised offline.
+
+Usage:
+    python -m backend.upstox_fake_feed --port 8765 [--interval 0.2] [--drop-after 30]
+then set UPSTOX_FEED_URL=ws://127.0.0.1:8765 in .env.
+"""
+
+import json
+import time
+import base64
+import random
+import socket
+import struct
+import hashlib
+import argparse
+import threading
+
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+# ═══════════════════════════════════════════
+#  MINIMAL WEBSOCKET FRAMING (RFC 6455)
+# ═══════════════════════════════════════════
+
+def _handshake(conn):
+    data = b''
+    while b'\r\n\r\n' not in data:
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise ConnectionError('client closed during handshake')
+        data += chunk
+    key = ''
+    for line in data.decode('latin-1').split('\r\n'):
+        if line.lower().startswith('sec-websocket-key:'):
+            key = line.split(':', 1)[1].strip()
+    accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+    conn.sendall((
+        'HTTP/1.1 101 Switching Protocols\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        f'Sec-WebSocket-Accept: {accept}\r\n\r\n'
+    ).encode())
+
+
+def _recv_exact(conn, n):
+    buf = b''
+    while len(buf) < n:
+        chunk = conn.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError('client closed')
+        buf += chunk
+    return buf
+
+
+def _recv_frame(conn):
+    """Read one client frame → (opcode, payload)"""
+    b1, b2 = _recv_exact(conn, 2)
+    opcode = b1 & 0x0F
+    length = b2 & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', _recv_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', _recv_exact(conn, 8))[0]
+    mask = _recv_exact(conn, 4) if b2 & 0x80 else None
+    payload = _recv_exact(conn, length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def _send_frame(conn, payload, opcode=0x2):
+    header = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        header += bytes([n])
+    elif n < 65536:
+        header += bytes([126]) + struct.pack('>H', n)
+    else:
+        header += bytes([127]) + struct.pack('>Q', n)
+    conn.sendall(header + payload)
+
+
+# ═══════════════════════════════════════════
+#  FEED
+# ═══════════════════════════════════════════
+
+def _encode_ticks(prices, closes):
+    from upstox_client.feeder.proto import MarketDataFeedV3_pb2 as pb
+
+    resp = pb.FeedResponse()
+    resp.type = pb.live_feed
+    resp.currentTs = int(time.time() * 1000)
+    for key, ltp in prices.items():
+        feed = resp.feeds[key]
+        feed.ltpc.ltp = ltp
+        feed.ltpc.cp = closes[key]
+        feed.ltpc.ltt = resp.currentTs
+        feed.ltpc.ltq = random.randint(1, 500)
+    return resp.SerializeToString()
+
+
+def _serve_client(conn, interval, drop_after):
+    started = time.time()
+    try:
+        _handshake(conn)
+        conn.settimeout(interval)
+        keys = []
+        prices, closes = {}, {}
+        while True:
+            try:
+                opcode, payload = _recv_frame(conn)
+                if opcode == 0x8:
+                    return
+                if opcode == 0x9:
+                    _send_frame(conn, payload, opcode=0xA)
+                elif opcode in (0x1, 0x2):
+                    req = json.loads(payload.decode('utf-8'))
+                    if req.get('method') == 'sub':
+                        keys = req.get('data', {}).get('instrumentKeys', [])
+                        for k in keys:
+                            closes.setdefault(k, round(random.uniform(100, 5000), 2))
+                            prices.setdefault(k, closes[k])
+            except socket.timeout:
+                pass
+
+            if drop_after and time.time() - started > drop_after:
+                return  # simulate an upstream disconnect
+
+            if keys:
+                moved = random.sample(keys, max(1, len(keys) // 3))
+                for k in moved:
+                    prices[k] = round(prices[k] * (1 + random.gauss(0, 0.0008)), 2)
+                _send_frame(conn, _encode_ticks({k: prices[k] for k in moved}, closes))
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        conn.close()
+
+
+def serve(host='127.0.0.1', port=8765, interval=0.2, drop_after=0, ready=None):
+    """Run the fake feed until interrupted (one thread per client)"""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind((host, port))
+    srv.listen()
+    if ready:
+        ready.set()
+    print(f"  ✓ Fake Upstox feed on ws://{host}:{port}")
+    while True:
+        conn, _ = srv.accept()
+        threading.Thread(target=_serve_client, args=(conn, interval, drop_after), daemon=True).start()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake Upstox market-data feed')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--interval', type=float, default=0.2, help='seconds between tick frames')
+    parser.add_argument('--drop-after', type=float, default=0, help='disconnect clients after N seconds')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.interval, args.drop_after)
@@ -0,0 +1,278 @@
+"""
+BHARAT TERMINAL — Upstox Market-Data Feed (WebSocket push source)
+Subscribes to the configured universe (instrument keys from the instrument
+master) over the v3 market-data
+feed, decodes each protobuf message as it arrives and merges the ticks into
+the snapshot (coalesced to one publish per FEED_PUBLISH_INTERVAL).
+Reconnects with exponential backoff; while the feed is down the REST
+polling tiers in stock_data.py take over again.
+
+Offline testing: run `python -m backend.upstox_fake_feed` and set
+UPSTOX_FEED_URL=ws://127.0.0.1:8765 in .env.
+"""
+
+import json
+import time
+import uuid
+import random
+import threading
+from datetime import datetime
+
+from .config import (
+    UPSTOX_FEED_URL, UPSTOX_FEED_MODE, NIFTY50_SYMBOLS, INDEX_SYMBOLS,
+)
+from .instruments import vendor_keys, short_name
+from .upstox_api import upstox_has_token
+from . import snapshot
+import backend.config as cfg
+
+
+FEED_PUBLISH_INTERVAL = 0.25  # seconds between snapshot publishes while ticks flow
+FEED_RECV_TIMEOUT = 15        # silence before we ping the server
+FEED_BACKOFF_MAX = 60
+
+_state = {
+    'thread': None,
+    'live': False,
+    'stop': threading.Event(),
+    'connected_at': None,
+    'last_tick': None,
+    'ticks': 0,
+    'reconnects': 0,
+}
+_latest = {}    # yahoo symbol → last quote dict from the feed, this session only
+_pending = {}   # ticks received since the last publish
+_pending_lock = threading.Lock()
+
+_key_map = {}   # instrument key → yahoo symbol, built on first use
+
+
+def _feed_keys():
+    if not _key_map:
+        keys = vendor_keys(NIFTY50_SYMBOLS + list(INDEX_SYMBOLS.values()), 'upstox')
+        _key_map.update({key: sym for sym, key in keys.items()})
+    return _key_map
+
+
+def upstox_feed_is_live():
+    """True while the WebSocket session is connected and subscribed"""
+    return _state['live']
+
+
+def upstox_feed_covers():
+    """Yahoo symbols the feed streams (used to skip the REST tiers)"""
+    return set(_feed_keys().values())
+
+
+def upstox_feed_latest(symbols=None):
+    """Last quote streamed this session per Yahoo symbol (only `symbols`, if given)"""
+    with _pending_lock:
+        if symbols is None:
+            return dict(_latest)
+        return {sym: _latest[sym] for sym in symbols if sym in _latest}
+
+
+def upstox_feed_status():
+    return {
+        'live': _state['live'],
+        'url': UPSTOX_FEED_URL,
+        'connected_at': _state['connected_at'],
+        'last_tick': _state['last_tick'],
+        'ticks': _state['ticks'],
+        'reconnects': _state['reconnects'],
+    }
+
+
+def _is_local_feed():
+    return UPSTOX_FEED_URL.startswith('ws://127.0.0.1') or UPSTOX_FEED_URL.startswith('ws://localhost')
+
+
+# ═══════════════════════════════════════════
+#  DECODING
+# ═══════════════════════════════════════════
+
+def _decode(message):
+    """Protobuf FeedResponse → {instrument_key: (ltp, prev_close)}"""
+    from upstox_client.feeder.proto import MarketDataFeedV3_pb2 as pb
+
+    resp = pb.FeedResponse()
+    resp.ParseFromString(message)
+
+    ticks = {}
+    for key, feed in resp.feeds.items():
+        if feed.HasField('ltpc'):
+            ltpc = feed.ltpc
+        elif feed.HasField('fullFeed'):
+            ff = feed.fullFeed
+            ltpc = ff.marketFF.ltpc if ff.HasField('marketFF') else ff.indexFF.ltpc
+        else:
+            continue
+        if ltpc.ltp:
+            ticks[key] = (ltpc.ltp, ltpc.cp or ltpc.ltp)
+    return ticks
+
+
+def _tick_quote(sym, display_name, ltp, prev_close):
+    net_chg = ltp - prev_close
+    chg_pct = (net_chg / prev_close * 100) if prev_close else 0
+    return {
+        'symbol': sym,
+        'shortName': display_name,
+        'regularMarketPrice': round(ltp, 2),
+        'regularMarketPreviousClose': round(prev_close, 2),
+        'regularMarketChange': round(net_chg, 2),
+        'regularMarketChangePercent': round(chg_pct, 2),
+    }
+
+
+def _on_ticks(ticks):
+    with _pending_lock:
+        key_map = _feed_keys()
+        for key, (ltp, prev_close) in ticks.items():
+            sym = key_map.get(key)
+            if sym is None:
+                continue
+            q = _tick_quote(sym, short_name(sym), ltp, prev_close)
+            _pending[sym] = q
+            _latest[q['symbol']] = q
+    _state['ticks'] += len(ticks)
+    _state['last_tick'] = datetime.now().isoformat()
+
+
+# ═══════════════════════════════════════════
+#  SNAPSHOT MERGE
+# ═══════════════════════════════════════════
+
+def merge_ticks(quotes, indices, live_prices, ticks):
+    """Overlay feed quotes on cache sections → new {quotes, indices, live_prices}"""
+    idx_sym_to_name = {v: k for k, v in INDEX_SYMBOLS.items()}
+    quotes = dict(quotes)
+    indices = dict(indices)
+    live_prices = dict(live_prices)
+
+    for sym, q in ticks.items():
+        if sym in idx_sym_to_name:
+            indices[idx_sym_to_name[sym]] = {
+                'val': q['regularMarketPrice'],
+                'prev': q['regularMarketPreviousClose'],
+                'chg': q['regularMarketChange'],
+                'chgP': q['regularMarketChangePercent'],
+            }
+        else:
+            quotes[sym] = {**quotes.get(sym, {}), **q}
+        live_prices[sym] = q['regularMarketPrice']
+
+    return {'quotes': quotes, 'indices': indices, 'live_prices': live_prices}
+
+
+def _flush():
+    with _pending_lock:
+        if not _pending:
+            return
+        ticks = dict(_pending)
+        _pending.clear()
+    snapshot.update(lambda snap: {
+        **merge_ticks(snap.quotes, snap.indices, snap.live_prices, ticks),
+        'last_stock_update': datetime.now().isoformat(),
+    })
+
+
+def _publisher_loop():
+    while not _state['stop'].is_set():
+        _flush()
+        time.sleep(FEED_PUBLISH_INTERVAL)
+
+
+# ═══════════════════════════════════════════
+#  CONNECTION LOOP
+# ═══════════════════════════════════════════
+
+def _subscribe_request():
+    return json.dumps({
+        'guid': str(uuid.uuid4()),
+        'method': 'sub',
+        'data': {'mode': UPSTOX_FEED_MODE, 'instrumentKeys': list(_feed_keys())},
+    }).encode('utf-8')
+
+
+def _run_session():
+    """One connect → subscribe → receive cycle; returns when the socket dies"""
+    import websocket
+
+    headers = []
+    if cfg.UPSTOX_ACCESS_TOKEN:
+        headers.append(f'Authorization: Bearer {cfg.UPSTOX_ACCESS_TOKEN}')
+
+    ws = websocket.create_connection(UPSTOX_FEED_URL, header=headers, timeout=10)
+    try:
+        ws.send(_subscribe_request(), opcode=websocket.ABNF.OPCODE_BINARY)
+        ws.settimeout(FEED_RECV_TIMEOUT)
+        with _pending_lock:
+            _latest.clear()  # quotes from an earlier session may have gone stale while down
+        _state['live'] = True
+        _state['connected_at'] = datetime.now().isoformat()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 📡 Upstox feed connected ({len(_feed_keys())} instruments)")
+
+        while not _state['stop'].is_set():
+            try:
+                message = ws.recv()
+            except websocket.WebSocketTimeoutException:
+                ws.ping()  # quiet market — make sure the socket is still alive
+                continue
+            if not message:
+                break
+            if isinstance(message, str):
+                message = message.encode('latin-1')
+            try:
+                ticks = _decode(message)
+            except Exception as e:
+                print(f"  ⚠ Upstox feed decode error: {e}")
+                continue
+            if ticks:
+                _on_ticks(ticks)
+    finally:
+        _state['live'] = False
+        with _pending_lock:
+            _latest.clear()  # REST polling is the source again until the next session
+        try:
+            ws.close()
+        except Exception:
+            pass
+
+
+def _feed_loop():
+    backoff = 1
+    while not _state['stop'].is_set():
+        if not (upstox_has_token() or _is_local_feed()):
+            _state['stop'].wait(30)
+            continue
+
+        started = time.time()
+        try:
+            _run_session()
+        except Exception as e:
+            print(f"  ⚠ Upstox feed disconnected: {e} — REST polling resumes")
+
+        if _state['stop'].is_set():
+            break
+        if time.time() - started > 60:
+            backoff = 1  # the last session was healthy; start over
+        _state['reconnects'] += 1
+        delay = backoff + random.uniform(0, backoff / 2)
+        _state['stop'].wait(delay)
+        backoff = min(backoff * 2, FEED_BACKOFF_MAX)
+
+
+def start_upstox_feed():
+    """Start the feed + publisher threads (idempotent)"""
+    if _state['thread'] and _state['thread'].is_alive():
+        return False
+    _state['stop'].clear()
+    _state['thread'] = threading.Thread(target=_feed_loop, daemon=True, name='upstox-feed')
+    _state['thread'].start()
+    threading.Thread(target=_publisher_loop, daemon=True, name='upstox-feed-publish').start()
+    return True
+
+
+def stop_upstox_feed():
+    _state['stop'].set()
@@ -0,0 +1,148 @@
+"""
+BHARAT TERMINAL — Warm Start
+The full published snapshot (quotes with their 52-week/market-cap fields,
+indices, commodities, news, live prices) is written to WARM_SNAPSHOT_FILE
+periodically and at shutdown, and swapped back in at boot — so every
+endpoint answers with the last known state within milliseconds of starting,
+market open or not.
+
+File layout: MAGIC, the Python major/minor that wrote it, then one
+marshal blob {'version', 'saved_at', 'updated', 'sections'}. marshal only
+carries plain data (dicts, lists, str, float…), loads in one read, and is
+several times faster than JSON; a file from another Python version is
+ignored (the ledger closes are used instead).
+
+Each section's last update time is tracked across restarts, so /api/status
+can say how stale it is and whether it still holds restored data.
+"""
+
+import os
+import sys
+import time
+import marshal
+import threading
+from dataclasses import fields
+from datetime import datetime
+from types import MappingProxyType
+
+from .config import WARM_SNAPSHOT_FILE
+from . import snapshot
+
+
+MAGIC = b'BTSNAP01'
+_PY = bytes(sys.version_info[:2])
+
+SECTIONS = tuple(f.name for f in fields(snapshot.Snapshot) if f.name not in ('version', 'versions'))
+
+_lock = threading.Lock()
+_updated = {}               # section → epoch seconds of its last publish
+_restored = set()           # sections still holding warm-start data
+_state = {'saved_version': None, 'saved_at': None, 'restored_from': None, 'load_ms': None}
+
+
+def _track(old, new):
+    now = time.time()
+    for name in SECTIONS:
+        if getattr(new, name) is not getattr(old, name):
+            _updated[name] = now
+            _restored.discard(name)
+
+
+snapshot.on_publish(_track)
+
+
+def _plain(value):
+    """Snapshot data → marshal-able builtins (read-only mappings → dicts,
+    numpy scalars → float/int)"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, bool) or value is None or type(value) in (str, int, float):
+        return value
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, int):
+        return int(value)
+    if hasattr(value, 'item'):  # numpy scalar
+        return value.item()
+    return str(value)
+
+
+# ═══════════════════════════════════════════
+#  SAVE / RESTORE
+# ═══════════════════════════════════════════
+
+def save_warm_snapshot(force=False):
+    """Write the current snapshot if it changed since the last save → True if written"""
+    with _lock:
+        snap = snapshot.current()
+        if snap.version == 0 or (snap.version == _state['saved_version'] and not force):
+            return False
+        saved_at = datetime.now().isoformat(timespec='seconds')
+        blob = marshal.dumps({
+            'version': snap.version,
+            'saved_at': saved_at,
+            'updated': dict(_updated),
+            'sections': {name: _plain(getattr(snap, name)) for name in SECTIONS},
+        })
+        tmp = WARM_SNAPSHOT_FILE + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(MAGIC + _PY + blob)
+            os.replace(tmp, WARM_SNAPSHOT_FILE)
+        except OSError as e:
+            print(f"  ⚠ Warm snapshot not saved: {e}")
+            return False
+        _state['saved_version'] = snap.version
+        _state['saved_at'] = saved_at
+        return True
+
+
+def restore_warm_snapshot():
+    """Load WARM_SNAPSHOT_FILE into the cache → number of quotes restored (0 = none)"""
+    start = time.perf_counter()
+    try:
+        with open(WARM_SNAPSHOT_FILE, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return 0
+    head = len(MAGIC) + len(_PY)
+    if raw[:len(MAGIC)] != MAGIC or raw[len(MAGIC):head] != _PY:
+        print("  ⚠ Warm snapshot from another format/Python version — ignored")
+        return 0
+    try:
+        data = marshal.loads(raw[head:])
+    except (EOFError, ValueError, TypeError) as e:
+        print(f"  ⚠ Warm snapshot unreadable: {e}")
+        return 0
+
+    sections = {name: value for name, value in data['sections'].items() if name in SECTIONS}
+    snap = snapshot.restore(data['version'], **sections)
+    with _lock:
+        _updated.update(data.get('updated') or {})
+        _restored.update(sections)
+        _state['saved_version'] = snap.version
+        _state['restored_from'] = data['saved_at']
+        _state['load_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    print(f"  ⚡ Warm start: {len(snap.quotes)} quotes, {len(snap.indices)} indices, {len(snap.news)} articles "
+          f"from {data['saved_at']} ({len(raw) // 1024} KB in {_state['load_ms']} ms)")
+    return len(snap.quotes) or len(snap.indices)
+
+
+def warm_status():
+    """When each section was last updated, and whether it is still restored data"""
+    now = time.time()
+    return {
+        'restored_from': _state['restored_from'],
+        'load_ms': _state['load_ms'],
+        'last_saved': _state['saved_at'],
+        'sections': {
+            name: {
+                'updated': datetime.fromtimestamp(_updated[name]).isoformat(timespec='seconds'),
+                'age_s': round(now - _updated[name]),
+                'restored': name in _restored,
+            }
+            for name in SECTIONS if name in _updated and not name.startswith('last_')
+        },
+    }